@@ -1,2 +1 @@
 # app/__init__.py
-from . import api, database, models, schemas, config
\ No newline at end of file
@@ -0,0 +1,237 @@
+# app/admission.py
+"""
+Admission control for the write routes, ahead of authentication and the database.
+
+`AdmissionMiddleware` looks at the method and path only. A request for a bid
+write (POST /bids/bids/, PUT and DELETE /bids/bids/{id}) must take a token
+from two buckets:
+
+    user    keyed on the username, from the principal already cached for the
+            bearer token (app/services/principals.py, a dict lookup) or else
+            from the token after its signature and expiry are checked (an
+            HMAC, no database). Every token of a user shares one bucket.
+    plate   keyed on `plate_id` from the JSON body (POST and PUT), which is
+            read here and replayed to the route
+
+A bid write without a valid token takes from a separate `anonymous` bucket
+keyed on the client address instead, and never from a user or plate bucket:
+it is going to get 401 anyway, and must not use up a real user's or a plate's
+tokens.
+
+Then every write route, plate writes included, needs one of
+ADMISSION_MAX_CONCURRENT_WRITES slots for as long as it runs. A request that
+fails any check gets 429 with Retry-After straight away: no JWT decode, no
+session, no plate lock. The middleware runs on the event loop thread only,
+so the buckets need no lock. The least recently used keys are dropped past
+ADMISSION_MAX_KEYS; a dropped key starts again with a full bucket.
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+
+from app.services.principals import decode_token, principal_cache
+
+MAX_BODY_BYTES = 16 * 1024
+
+# (metod, yo'l, shablon, bid yozuvimi)
+_WRITE_ROUTES = [
+    ("POST", re.compile(r"^/bids/bids/$"), "/bids/bids/", True),
+    ("PUT", re.compile(r"^/bids/bids/\d+$"), "/bids/bids/{bid_id}", True),
+    ("DELETE", re.compile(r"^/bids/bids/\d+$"), "/bids/bids/{bid_id}", True),
+    ("POST", re.compile(r"^/plates/plates/$"), "/plates/plates/", False),
+    ("PUT", re.compile(r"^/plates/plates/\d+$"), "/plates/plates/{plate_id}", False),
+    ("DELETE", re.compile(r"^/plates/plates/\d+$"), "/plates/plates/{plate_id}", False),
+]
+
+
+class TokenBuckets:
+    """`rate` tokens a second up to `burst`, per key."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[object, list]" = OrderedDict()  # kalit -> [tokenlar, vaqt]
+
+    def take(self, key, now: float) -> float:
+        """0 if a token was taken, else the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    def __init__(self):
+        self.configure()
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed_user = 0
+        self.shed_plate = 0
+        self.shed_anonymous = 0
+        self.shed_concurrency = 0
+
+    def configure(self, user_rate: float = 0, user_burst: float = 1, plate_rate: float = 0,
+                  plate_burst: float = 1, max_concurrent: int = 0, max_keys: int = 100000):
+        self.users = TokenBuckets(user_rate, user_burst, max_keys)
+        self.plates = TokenBuckets(plate_rate, plate_burst, max_keys)
+        self.anonymous = TokenBuckets(user_rate, user_burst, max_keys)
+        self.max_concurrent = max_concurrent
+
+    def admit(self, user_key, plate_id: Optional[int], bid_write: bool, client=None) -> Optional[float]:
+        """None if admitted (a slot is taken, call `release`), else Retry-After seconds.
+
+        `user_key` is the verified username of a bid write, None when it has no valid token;
+        `client` is the client address, used for those.
+        """
+        now = time.monotonic()
+        if bid_write and user_key is None:
+            wait = self.anonymous.take(client, now)
+            if wait:
+                self.shed_anonymous += 1
+                return wait
+        elif bid_write:
+            wait = self.users.take(user_key, now)
+            if wait:
+                self.shed_user += 1
+                return wait
+            if plate_id is not None:
+                wait = self.plates.take(plate_id, now)
+                if wait:
+                    self.shed_plate += 1
+                    return wait
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            self.shed_concurrency += 1
+            return 1.0
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"admitted": self.admitted, "shed_user": self.shed_user, "shed_plate": self.shed_plate,
+                "shed_anonymous": self.shed_anonymous, "shed_concurrency": self.shed_concurrency,
+                "in_flight": self.in_flight, "user_keys": len(self.users), "plate_keys": len(self.plates),
+                "anonymous_keys": len(self.anonymous)}
+
+
+admission = AdmissionController()
+
+
+def _match(method: str, path: str) -> Optional[Tuple[str, bool]]:
+    for route_method, pattern, template, bid_write in _WRITE_ROUTES:
+        if method == route_method and pattern.match(path):
+            return template, bid_write
+    return None
+
+
+def _user_key(scope) -> Optional[str]:
+    """Username of a valid bearer token, or None."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            token = value.decode("latin-1").partition(" ")[2].strip()
+            if not token:
+                return None
+            principal = principal_cache.peek(token)
+            if principal is not None:
+                return principal.username
+            # Imzo va muddat tekshiriladi: soxta `sub` boshqa foydalanuvchining bucketiga tegmasin
+            try:
+                return decode_token(token)["sub"]
+            except HTTPException:
+                return None
+    return None
+
+
+def _client(scope):
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _plate_id(body: bytes) -> Optional[int]:
+    try:
+        plate_id = orjson.loads(body).get("plate_id")
+    except (orjson.JSONDecodeError, AttributeError):
+        return None
+    return plate_id if isinstance(plate_id, int) else None
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        match = _match(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+        template, bid_write = match
+        user_key = _user_key(scope) if bid_write else None
+        plate_id = None
+        # Plate bucketi faqat haqiqiy foydalanuvchi uchun: anonim so'rov raqamni band qila olmaydi
+        if user_key is not None and scope["method"] != "DELETE" and self.controller.plates.rate > 0:
+            body, receive = await _buffer_body(receive)
+            if body is not None:
+                plate_id = _plate_id(body)
+        wait = self.controller.admit(user_key, plate_id, bid_write, _client(scope))
+        if wait is not None:
+            # Metrika uchun: rad etilgan so'rov route ga yetmaydi
+            scope["route_template"] = template
+            await _too_many_requests(send, wait)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+
+async def _buffer_body(receive):
+    """Read the request body (up to MAX_BODY_BYTES) and a `receive` that replays it."""
+    messages, size = [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        size += len(message.get("body", b""))
+        if not message.get("more_body", False) or size > MAX_BODY_BYTES:
+            break
+    complete = messages[-1]["type"] == "http.request" and not messages[-1].get("more_body", False)
+    body = b"".join(message.get("body", b"") for message in messages) if complete else None
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return body, replay
+
+
+async def _too_many_requests(send, wait: float):
+    body = b'{"detail":"Too many requests"}'
+    await send({"type": "http.response.start", "status": 429, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(wait))).encode())]})
+    await send({"type": "http.response.body", "body": body})
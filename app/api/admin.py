@@ -0,0 +1,81 @@
+# app/api/admin.py
+# Adminlar uchun ommaviy amallar: raqamlarni import qilish, bidlar tarixini eksport qilish
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from app import database
+from app.api.auto_plate import parse_deadline
+from app.config import settings
+from app.dependencies import get_current_admin
+from app.services.bid_export import ExportFilter, csv_chunks, iter_batches, ndjson_chunks
+from app.services.plate_import import CsvRows, LineTooLong, PlateImporter, iter_lines, parse_ndjson
+from app.services.principals import Principal
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def _upload_format(request: Request, format: Optional[str]) -> str:
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        if "csv" in content_type:
+            format = "csv"
+        elif "ndjson" in content_type or "json" in content_type:
+            format = "ndjson"
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=415, detail="Upload must be text/csv or application/x-ndjson")
+    return format
+
+@router.post("/plates/import")
+async def import_plates(request: Request, format: Optional[str] = Query(None),
+                        current_user: Principal = Depends(get_current_admin)):
+    """
+    CSV yoki NDJSON oqimidan avtomobil raqamlarini ommaviy yaratadi. Faqat adminlar uchun.
+    Har bir xato qator hisobotda qaytariladi.
+    """
+    format = _upload_format(request, format)
+    importer = PlateImporter(database.SessionLocal, current_user.id,
+                             settings.IMPORT_BATCH_SIZE, settings.IMPORT_MAX_ERRORS)
+    csv_rows = CsvRows()
+    line_no = 0
+    try:
+        async for line in iter_lines(request.stream()):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = csv_rows.parse(line) if format == "csv" else parse_ndjson(line)
+            except ValueError as ve:
+                importer.reject(line_no, str(ve))
+                continue
+            if record is not None and importer.add(line_no, record):
+                await run_in_threadpool(importer.flush)
+        await run_in_threadpool(importer.flush)
+    except LineTooLong as exc:
+        importer.reject(line_no + 1, str(exc))
+        # Uzun qatordan oldingi yaroqli qatorlar ham yoziladi
+        await run_in_threadpool(importer.flush)
+    report = importer.report()
+    logger.info("Plate import by %s: %d inserted, %d failed", current_user.username, report["inserted"], report["failed"])
+    return report
+
+@router.get("/bids/export")
+def export_bids(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), plate_id: Optional[int] = None,
+                since: Optional[datetime] = None, until: Optional[datetime] = None, closed: Optional[bool] = None,
+                current_user: Principal = Depends(get_current_admin)):
+    """
+    Bidlar tarixini raqam va foydalanuvchi ma'lumotlari bilan oqim sifatida qaytaradi. Faqat adminlar uchun.
+    `since`/`until` - created_at oralig'i, `closed=true` - faqat yopilgan auksionlar.
+    """
+    filters = ExportFilter(plate_id=plate_id, since=parse_deadline(since) if since else None,
+                           until=parse_deadline(until) if until else None, closed=closed)
+    batches = iter_batches(database.SessionLocal, filters, settings.EXPORT_BATCH_SIZE)
+    logger.info("Bid export (%s) started by %s: %s", format, current_user.username, filters)
+    if format == "csv":
+        return StreamingResponse(csv_chunks(batches), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="bids.csv"'})
+    return StreamingResponse(ndjson_chunks(batches), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="bids.ndjson"'})
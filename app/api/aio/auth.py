@@ -0,0 +1,42 @@
+# app/api/aio/auth.py
+# Async variant of app/api/auth.py, used when Settings.ASYNC_MODE is on
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import database, models, schemas
+from app.api.auth import create_access_token, oauth2_scheme
+from app.services.passwords import hasher
+from app.services.principals import Principal, resolve_async
+
+router = APIRouter()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)) -> Principal:
+    return await resolve_async(
+        token, lambda username: db.scalar(select(models.User).where(models.User.username == username).limit(1)))
+
+@router.post("/login/", response_model=schemas.Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.username == form_data.username).limit(1))
+    if not user or not await hasher.verify_async(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    access_token = create_access_token(data={"sub": user.username})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/register/", response_model=schemas.User)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
+    if await db.scalar(select(models.User.id).where(models.User.username == user.username).limit(1)):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    if await db.scalar(select(models.User.id).where(models.User.email == user.email).limit(1)):
+        raise HTTPException(status_code=400, detail="Email already exists")
+
+    hashed_password = await hasher.hash_async(user.password)
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password,
+        is_staff=user.is_staff
+    )
+    db.add(db_user)
+    await db.commit()
+    return db_user
@@ -0,0 +1,246 @@
+# app/api/aio/auto_plate.py
+# Async variant of app/api/auto_plate.py, used when Settings.ASYNC_MODE is on
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app import database, models, pagination, schemas
+from app.cache import LISTING_TAG, as_response, plate_tag, response_cache, serialize
+from app.fastjson import plate_rows
+from app.api.auto_plate import PLATE_ORDERINGS, SEARCH_MAX_STALENESS_SECONDS, parse_deadline
+from app.services import idempotency
+from app.services.auction_scheduler import auction_scheduler
+from app.services.order_book import order_book
+from app.services.plate_search import QUERY_PATTERN, plate_index
+from datetime import datetime
+from app.services.principals import Principal
+from .auth import get_current_user
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/plates", tags=["plates"])
+
+@router.get("/", response_model=schemas.AutoPlatePage)
+async def get_plates(request: Request, db: AsyncSession = Depends(database.get_async_read_db), ordering: str = "deadline",
+                     cursor: Optional[str] = None,
+                     limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT)):
+    """
+    Faol avtomobil raqamlarini sahifalab qaytaradi (keyset pagination).
+    """
+    try:
+        if ordering not in PLATE_ORDERINGS:
+            logger.warning("Invalid ordering parameter: %s", ordering)
+            raise HTTPException(status_code=400, detail="Invalid ordering parameter")
+        sort_column, descending = PLATE_ORDERINGS[ordering]
+        key = ("plates", ordering, cursor, limit)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return as_response(request, cached)
+        since = response_cache.version()
+        after = pagination.decode_cursor(cursor, ordering) if cursor else None
+
+        query = select(*plate_rows.columns).where(models.AutoPlate.is_active == True)
+        query = pagination.keyset(query, sort_column, models.AutoPlate.id, descending, after)
+        plates = (await db.execute(query.limit(limit + 1))).all()
+        result = pagination.page(plates, limit, ordering, sort_column.key)
+        tags = [LISTING_TAG, *(plate_tag(plate.id) for plate in result["items"])]
+        entry = response_cache.put(key, plate_rows.page(result), tags, since)
+        logger.info("Fetched %d active plates", len(result['items']))
+        return as_response(request, entry)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching plates: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.post("/", response_model=schemas.AutoPlate, status_code=status.HTTP_201_CREATED)
+async def create_plate(plate: schemas.AutoPlateCreate, db: AsyncSession = Depends(database.get_async_db),
+                       current_user: Principal = Depends(get_current_user),
+                       idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
+    """
+    Yangi avtomobil raqamini yaratadi. Faqat adminlar uchun.
+    """
+    return await idempotency.run_async(idempotency_key, current_user.id, "create_plate", plate.model_dump_json(),
+                                       schemas.AutoPlate, lambda: _create_plate(plate, db, current_user),
+                                       status.HTTP_201_CREATED)
+
+async def _create_plate(plate: schemas.AutoPlateCreate, db: AsyncSession, current_user: Principal):
+    try:
+        if not current_user.is_staff:
+            logger.warning("User %s attempted to create plate without admin privileges", current_user.username)
+            raise HTTPException(status_code=403, detail="Only admins can create plates")
+
+        if await db.scalar(select(models.AutoPlate.id).where(models.AutoPlate.plate_number == plate.plate_number)):
+            logger.warning("Plate number %s already exists", plate.plate_number)
+            raise HTTPException(status_code=400, detail="Plate number already exists")
+
+        try:
+            deadline = parse_deadline(plate.deadline)
+        except ValueError as ve:
+            logger.error("Invalid deadline format: %s, error: %s", plate.deadline, ve)
+            raise HTTPException(status_code=400, detail="Invalid deadline format")
+
+        if deadline <= datetime.utcnow():
+            logger.warning("Deadline %s is not in the future", deadline)
+            raise HTTPException(status_code=400, detail="Deadline must be in the future")
+
+        db_plate = models.AutoPlate(
+            plate_number=plate.plate_number,
+            description=plate.description,
+            deadline=deadline,
+            created_by_id=current_user.id,
+            is_active=True
+        )
+        db.add(db_plate)
+        await db.commit()
+        await run_in_threadpool(order_book.upsert_plate, db_plate)
+        response_cache.invalidate_plate(db_plate.id, listing=True)
+        plate_index.upsert(db_plate.id, db_plate.plate_number, db_plate.is_active)
+        if db_plate.is_active:
+            auction_scheduler.schedule(db_plate.id, db_plate.deadline)
+        logger.info("Plate %s created successfully by user %s", plate.plate_number, current_user.username)
+        return db_plate
+
+    except IntegrityError as ie:
+        await db.rollback()
+        logger.error("Database integrity error while creating plate: %s", ie, exc_info=True)
+        raise HTTPException(status_code=400, detail=f"Database error: {str(ie)}")
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error creating plate: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.get("/search", response_model=schemas.AutoPlateSearchPage)
+async def search_plates(q: str = Query(..., max_length=20, pattern=QUERY_PATTERN),
+                        mode: str = Query("contains", pattern="^(contains|prefix|exact)$"),
+                        offset: int = Query(0, ge=0),
+                        limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+                        db: AsyncSession = Depends(database.async_read_db(max_staleness=SEARCH_MAX_STALENESS_SECONDS))):
+    """
+    Faol raqamlarni raqam bo'yicha qidiradi: # - istalgan raqam, ? - istalgan belgi, * - istalgan ketma-ketlik.
+    """
+    try:
+        plate_ids = plate_index.search(q, mode)
+        page_ids = plate_ids[offset:offset + limit]
+        plates = {plate.id: plate for plate in
+                  await db.scalars(select(models.AutoPlate).where(models.AutoPlate.id.in_(page_ids)))}
+        next_offset = offset + limit if offset + limit < len(plate_ids) else None
+        logger.info("Search %r (%s) matched %d plates", q, mode, len(plate_ids))
+        return {"items": [plates[plate_id] for plate_id in page_ids if plate_id in plates],
+                "total": len(plate_ids), "next_offset": next_offset}
+    except Exception as e:
+        logger.error("Error searching plates: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.get("/{plate_id}", response_model=schemas.AutoPlate)
+async def get_plate(plate_id: int, request: Request, db: AsyncSession = Depends(database.get_async_read_db)):
+    """
+    Muayyan avtomobil raqami haqida ma'lumot qaytaradi.
+    """
+    try:
+        key = ("plate", plate_id)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return as_response(request, cached)
+        since = response_cache.version()
+        plate = await db.get(models.AutoPlate, plate_id)
+        if not plate:
+            logger.warning("Plate with ID %d not found", plate_id)
+            raise HTTPException(status_code=404, detail="Plate not found")
+        entry = response_cache.put(key, serialize(schemas.AutoPlate, plate), [plate_tag(plate_id)], since)
+        return as_response(request, entry)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching plate %d: %s", plate_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.put("/{plate_id}", response_model=schemas.AutoPlate)
+async def update_plate(plate_id: int, plate: schemas.AutoPlateCreate, db: AsyncSession = Depends(database.get_async_db),
+                       current_user: Principal = Depends(get_current_user)):
+    """
+    Muayyan avtomobil raqamini yangilaydi. Faqat adminlar uchun.
+    """
+    try:
+        if not current_user.is_staff:
+            logger.warning("User %s attempted to update plate without admin privileges", current_user.username)
+            raise HTTPException(status_code=403, detail="Only admins can update plates")
+
+        db_plate = await db.get(models.AutoPlate, plate_id)
+        if not db_plate:
+            logger.warning("Plate with ID %d not found", plate_id)
+            raise HTTPException(status_code=404, detail="Plate not found")
+
+        existing_id = await db.scalar(
+            select(models.AutoPlate.id).where(models.AutoPlate.plate_number == plate.plate_number))
+        if existing_id and existing_id != db_plate.id:
+            logger.warning("Plate number %s already exists", plate.plate_number)
+            raise HTTPException(status_code=400, detail="Plate number already exists")
+
+        try:
+            deadline = parse_deadline(plate.deadline)
+        except ValueError as ve:
+            logger.error("Invalid deadline format: %s, error: %s", plate.deadline, ve)
+            raise HTTPException(status_code=400, detail="Invalid deadline format")
+
+        if deadline <= datetime.utcnow():
+            logger.warning("Deadline %s is not in the future", deadline)
+            raise HTTPException(status_code=400, detail="Deadline must be in the future")
+
+        db_plate.plate_number = plate.plate_number
+        db_plate.description = plate.description
+        db_plate.deadline = deadline
+        await db.commit()
+        await run_in_threadpool(order_book.upsert_plate, db_plate)
+        response_cache.invalidate_plate(db_plate.id, listing=True)
+        plate_index.upsert(db_plate.id, db_plate.plate_number, db_plate.is_active)
+        if db_plate.is_active:
+            auction_scheduler.schedule(db_plate.id, db_plate.deadline)
+        logger.info("Plate %d updated successfully by user %s", plate_id, current_user.username)
+        return db_plate
+
+    except IntegrityError as ie:
+        await db.rollback()
+        logger.error("Database integrity error while updating plate: %s", ie, exc_info=True)
+        raise HTTPException(status_code=400, detail=f"Database error: {str(ie)}")
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error updating plate %d: %s", plate_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.delete("/{plate_id}", status_code=status.HTTP_200_OK)
+async def delete_plate(plate_id: int, db: AsyncSession = Depends(database.get_async_db),
+                       current_user: Principal = Depends(get_current_user)):
+    """
+    Muayyan avtomobil raqamini o'chiradi. Faqat adminlar uchun.
+    """
+    try:
+        if not current_user.is_staff:
+            logger.warning("User %s attempted to delete plate without admin privileges", current_user.username)
+            raise HTTPException(status_code=403, detail="Only admins can delete plates")
+
+        db_plate = await db.get(models.AutoPlate, plate_id)
+        if not db_plate:
+            logger.warning("Plate with ID %d not found", plate_id)
+            raise HTTPException(status_code=404, detail="Plate not found")
+
+        if await db.scalar(select(models.Bid.id).where(models.Bid.plate_id == plate_id).limit(1)):
+            logger.warning("Plate %d has active bids and cannot be deleted", plate_id)
+            raise HTTPException(status_code=400, detail="Cannot delete plate with active bids")
+
+        await db.delete(db_plate)
+        await db.commit()
+        order_book.drop_plate(plate_id)
+        response_cache.invalidate_plate(plate_id, listing=True)
+        auction_scheduler.cancel(plate_id)
+        plate_index.remove(plate_id)
+        logger.info("Plate %d deleted successfully by user %s", plate_id, current_user.username)
+        return {"detail": "Plate deleted"}
+
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error deleting plate %d: %s", plate_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -0,0 +1,102 @@
+# app/api/aio/bid.py
+# Async variant of app/api/bid.py, used when Settings.ASYNC_MODE is on
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app import database, models, pagination, schemas
+from app.cache import response_cache
+from app.fastjson import bid_rows
+from app.services.bid_hub import BID_PLACED, BID_RAISED, BID_WITHDRAWN, bid_hub
+from app.services.bid_ledger import bid_ledger
+from app.services import idempotency
+from app.services.bid_writer import bid_writer, stage_bid
+from app.services.order_book import hold, order_book
+from app.services.plate_stats import plate_stats_update
+from app.services.principals import Principal
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/bids/", response_model=schemas.BidPage)
+async def get_bids(db: AsyncSession = Depends(database.get_async_read_db), current_user: Principal = Depends(get_current_user),
+                   cursor: Optional[str] = None,
+                   limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT)):
+    after = pagination.decode_cursor(cursor, "id") if cursor else None
+    query = select(*bid_rows.columns).where(models.Bid.user_id == current_user.id)
+    query = pagination.keyset(query, models.Bid.id, models.Bid.id, False, after)
+    bids = (await db.execute(query.limit(limit + 1))).all()
+    return Response(bid_rows.page(pagination.page(bids, limit, "id", "id")), media_type="application/json")
+
+@router.post("/bids/", response_model=schemas.Bid)
+async def create_bid(bid: schemas.BidCreate, db: AsyncSession = Depends(database.get_async_db), current_user: Principal = Depends(get_current_user),
+                     idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
+    return await idempotency.run_async(idempotency_key, current_user.id, "create_bid", bid.model_dump_json(),
+                                       schemas.Bid, lambda: _create_bid(bid, db, current_user))
+
+async def _create_bid(bid: schemas.BidCreate, db: AsyncSession, current_user: Principal):
+    if bid_writer.running:
+        return await bid_writer.result_async(bid_writer.submit(current_user.id, bid.plate_id, bid.amount))
+    book = await db.run_sync(order_book.get, bid.plate_id)
+    if book is None:
+        raise HTTPException(status_code=400, detail="Bidding is closed")
+    async with hold(book.lock):
+        entry = await db.run_sync(stage_bid, book, current_user.id, bid.amount)
+        await db.execute(plate_stats_update(book.plate_id))
+        await db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        entry = order_book.place(book, entry)
+        bid_ledger.append(BID_PLACED, entry)
+        bid_hub.publish_bid(BID_PLACED, book, entry)
+        return entry
+
+@router.get("/bids/{bid_id}", response_model=schemas.Bid)
+async def get_bid(bid_id: int, db: AsyncSession = Depends(database.get_async_read_db), current_user: Principal = Depends(get_current_user)):
+    bid = await db.scalar(select(models.Bid).where(models.Bid.id == bid_id, models.Bid.user_id == current_user.id))
+    if not bid:
+        raise HTTPException(status_code=403, detail="Not authorized to view this bid")
+    return bid
+
+@router.put("/bids/{bid_id}", response_model=schemas.Bid)
+async def update_bid(bid_id: int, bid: schemas.BidCreate, db: AsyncSession = Depends(database.get_async_db), current_user: Principal = Depends(get_current_user),
+                     idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
+    return await idempotency.run_async(idempotency_key, current_user.id, f"update_bid:{bid_id}", bid.model_dump_json(),
+                                       schemas.Bid, lambda: _update_bid(bid_id, bid, db, current_user))
+
+async def _update_bid(bid_id: int, bid: schemas.BidCreate, db: AsyncSession, current_user: Principal):
+    book, entry = await db.run_sync(order_book.find_bid, bid_id, current_user.id)
+    if not entry:
+        raise HTTPException(status_code=403, detail="Not authorized to update this bid")
+    async with hold(book.lock):
+        entry = book.bids.get(current_user.id)
+        if entry is None or entry.id != bid_id:
+            raise HTTPException(status_code=403, detail="Not authorized to update this bid")
+        book.check_raise(entry, bid.amount)
+        await db.run_sync(order_book.confirm, book, current_user.id, bid.amount, True)
+        await db.execute(update(models.Bid).where(models.Bid.id == bid_id).values(amount=bid.amount))
+        await db.execute(plate_stats_update(book.plate_id))
+        await db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        entry = order_book.raise_bid(book, entry, bid.amount)
+        bid_ledger.append(BID_RAISED, entry)
+        bid_hub.publish_bid(BID_RAISED, book, entry)
+        return entry
+
+@router.delete("/bids/{bid_id}")
+async def delete_bid(bid_id: int, db: AsyncSession = Depends(database.get_async_db), current_user: Principal = Depends(get_current_user)):
+    book, entry = await db.run_sync(order_book.find_bid, bid_id, current_user.id)
+    if not entry:
+        raise HTTPException(status_code=403, detail="Not authorized to delete this bid")
+    async with hold(book.lock):
+        entry = book.bids.get(current_user.id)
+        if entry is None or entry.id != bid_id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this bid")
+        book.check_withdraw()
+        await db.execute(delete(models.Bid).where(models.Bid.id == bid_id))
+        await db.execute(plate_stats_update(book.plate_id))
+        await db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        order_book.withdraw(book, entry)
+        bid_ledger.append(BID_WITHDRAWN, entry)
+        bid_hub.publish_bid(BID_WITHDRAWN, book, entry)
+    return {"detail": "Bid deleted"}
@@ -1,15 +1,16 @@
 # app/api/auth.py
 # app/api/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm  # Add this import
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from jose import jwt
 from datetime import datetime, timedelta
 from app import database, models, schemas, config
-from passlib.context import CryptContext
+from app.services.passwords import hasher
+from app.services.principals import Principal, resolve
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login/")
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -19,50 +20,42 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, config.settings.SECRET_KEY, algorithm=config.settings.ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, config.settings.SECRET_KEY, algorithms=[config.settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    return user
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
+    return resolve(token, lambda username: db.query(models.User).filter(models.User.username == username).first())
+
+def _first_user(db: Session, condition) -> models.User:
+    return db.query(models.User).filter(condition).first()
 
+def _save_user(db: Session, db_user: models.User) -> models.User:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+# bcrypt pulda kutiladi (await): kutish paytida threadpool oqimi band bo'lmaydi, faqat qisqa DB so'rovlari unda
 @router.post("/login/", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    user = await run_in_threadpool(_first_user, db, models.User.username == form_data.username)
+    if not user or not await hasher.verify_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register/", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    if db.query(models.User).filter(models.User.username == user.username).first():
+async def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    if await run_in_threadpool(_first_user, db, models.User.username == user.username):
         raise HTTPException(status_code=400, detail="Username already exists")
-    if db.query(models.User).filter(models.User.email == user.email).first():
+    if await run_in_threadpool(_first_user, db, models.User.email == user.email):
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await hasher.hash_async(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password,
         is_staff=user.is_staff
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return await run_in_threadpool(_save_user, db, db_user)
 # # app/api/auth.py
 # from fastapi import APIRouter, Depends, HTTPException, status
 # from fastapi.security import OAuth2PasswordRequestForm
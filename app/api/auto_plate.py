@@ -1,64 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from app import database, models, schemas
-from datetime import datetime
+from typing import Optional
+from app import database, models, pagination, schemas
+from app.cache import LISTING_TAG, as_response, plate_tag, response_cache, serialize
+from app.fastjson import plate_rows
+from app.services import idempotency
+from app.services.auction_scheduler import auction_scheduler
+from app.services.order_book import order_book
+from app.services.plate_search import QUERY_PATTERN, plate_index
+from datetime import datetime, timezone
+from app.services.principals import Principal
 from .auth import get_current_user
 import logging
 
 # Logging sozlamalari
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Router ni aniq prefiks va teglar bilan sozlash
 router = APIRouter(prefix="/plates", tags=["plates"])
 
-@router.get("/", response_model=list[schemas.AutoPlate])
-def get_plates(db: Session = Depends(database.get_db), ordering: str = "deadline"):
+def parse_deadline(value) -> datetime:
+    """ISO satr yoki datetime ni UTC bo'yicha naive datetime ga keltiradi."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Qidiruv indeksi xotirada va doim yangi; bazada hali ko'rinmagan raqamlar sahifadan tushib qoladi
+SEARCH_MAX_STALENESS_SECONDS = 5.0
+
+# ordering qiymati -> (saralash ustuni, kamayish tartibida)
+PLATE_ORDERINGS = {
+    "deadline": (models.AutoPlate.deadline, False),
+    "-deadline": (models.AutoPlate.deadline, True),
+    "plate_number": (models.AutoPlate.plate_number, False),
+    "-plate_number": (models.AutoPlate.plate_number, True),
+}
+
+@router.get("/", response_model=schemas.AutoPlatePage)
+def get_plates(request: Request, db: Session = Depends(database.get_read_db), ordering: str = "deadline",
+               cursor: Optional[str] = None,
+               limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT)):
     """
-    Faol avtomobil raqamlarini ro'yxatini qaytaradi.
+    Faol avtomobil raqamlarini sahifalab qaytaradi (keyset pagination).
     """
     try:
         # `ordering` parametri xavfsizligini tekshirish
-        valid_orderings = ["deadline", "-deadline", "plate_number", "-plate_number"]
-        if ordering not in valid_orderings:
-            logger.warning(f"Invalid ordering parameter: {ordering}")
+        if ordering not in PLATE_ORDERINGS:
+            logger.warning("Invalid ordering parameter: %s", ordering)
             raise HTTPException(status_code=400, detail="Invalid ordering parameter")
+        sort_column, descending = PLATE_ORDERINGS[ordering]
+        key = ("plates", ordering, cursor, limit)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return as_response(request, cached)
+        since = response_cache.version()
+        after = pagination.decode_cursor(cursor, ordering) if cursor else None
 
-        query = db.query(models.AutoPlate).filter(models.AutoPlate.is_active == True)
-        plates = query.order_by(ordering).all()
-        logger.info(f"Fetched {len(plates)} active plates")
-        return plates
+        query = db.query(*plate_rows.columns).filter(models.AutoPlate.is_active == True)
+        query = pagination.keyset(query, sort_column, models.AutoPlate.id, descending, after)
+        plates = query.limit(limit + 1).all()
+        result = pagination.page(plates, limit, ordering, sort_column.key)
+        tags = [LISTING_TAG, *(plate_tag(plate.id) for plate in result["items"])]
+        entry = response_cache.put(key, plate_rows.page(result), tags, since)
+        logger.info("Fetched %d active plates", len(result['items']))
+        return as_response(request, entry)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching plates: {str(e)}", exc_info=True)
+        logger.error("Error fetching plates: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @router.post("/", response_model=schemas.AutoPlate, status_code=status.HTTP_201_CREATED)
 def create_plate(plate: schemas.AutoPlateCreate, db: Session = Depends(database.get_db),
-                current_user: models.User = Depends(get_current_user)):
+                current_user: Principal = Depends(get_current_user),
+                idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
     """
     Yangi avtomobil raqamini yaratadi. Faqat adminlar uchun.
     """
+    return idempotency.run(idempotency_key, current_user.id, "create_plate", plate.model_dump_json(),
+                           schemas.AutoPlate, lambda: _create_plate(plate, db, current_user), status.HTTP_201_CREATED)
+
+def _create_plate(plate: schemas.AutoPlateCreate, db: Session, current_user: Principal):
     try:
         # Admin huquqlarini tekshirish
         if not current_user.is_staff:
-            logger.warning(f"User {current_user.username} attempted to create plate without admin privileges")
+            logger.warning("User %s attempted to create plate without admin privileges", current_user.username)
             raise HTTPException(status_code=403, detail="Only admins can create plates")
 
         # Plate nomerining noyobligini tekshirish
         if db.query(models.AutoPlate).filter(models.AutoPlate.plate_number == plate.plate_number).first():
-            logger.warning(f"Plate number {plate.plate_number} already exists")
+            logger.warning("Plate number %s already exists", plate.plate_number)
             raise HTTPException(status_code=400, detail="Plate number already exists")
 
         # Deadline ni tekshirish va parse qilish
         try:
-            deadline = datetime.fromisoformat(plate.deadline.replace("Z", "+00:00"))
+            deadline = parse_deadline(plate.deadline)
         except ValueError as ve:
-            logger.error(f"Invalid deadline format: {plate.deadline}, error: {str(ve)}")
+            logger.error("Invalid deadline format: %s, error: %s", plate.deadline, ve)
             raise HTTPException(status_code=400, detail="Invalid deadline format")
 
         if deadline <= datetime.utcnow():
-            logger.warning(f"Deadline {deadline} is not in the future")
+            logger.warning("Deadline %s is not in the future", deadline)
             raise HTTPException(status_code=400, detail="Deadline must be in the future")
 
         # Yangi plate yaratish
@@ -72,64 +117,99 @@ def create_plate(plate: schemas.AutoPlateCreate, db: Session = Depends(database.
         db.add(db_plate)
         db.commit()
         db.refresh(db_plate)
-        logger.info(f"Plate {plate.plate_number} created successfully by user {current_user.username}")
+        order_book.upsert_plate(db_plate)
+        response_cache.invalidate_plate(db_plate.id, listing=True)
+        plate_index.upsert(db_plate.id, db_plate.plate_number, db_plate.is_active)
+        if db_plate.is_active:
+            auction_scheduler.schedule(db_plate.id, db_plate.deadline)
+        logger.info("Plate %s created successfully by user %s", plate.plate_number, current_user.username)
         return db_plate
 
     except IntegrityError as ie:
         db.rollback()
-        logger.error(f"Database integrity error while creating plate: {str(ie)}", exc_info=True)
+        logger.error("Database integrity error while creating plate: %s", ie, exc_info=True)
         raise HTTPException(status_code=400, detail=f"Database error: {str(ie)}")
     except Exception as e:
         db.rollback()
-        logger.error(f"Error creating plate: {str(e)}", exc_info=True)
+        logger.error("Error creating plate: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@router.get("/search", response_model=schemas.AutoPlateSearchPage)
+def search_plates(q: str = Query(..., max_length=20, pattern=QUERY_PATTERN),
+                  mode: str = Query("contains", pattern="^(contains|prefix|exact)$"),
+                  offset: int = Query(0, ge=0),
+                  limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+                  db: Session = Depends(database.read_db(max_staleness=SEARCH_MAX_STALENESS_SECONDS))):
+    """
+    Faol raqamlarni raqam bo'yicha qidiradi: # - istalgan raqam, ? - istalgan belgi, * - istalgan ketma-ketlik.
+    """
+    try:
+        plate_ids = plate_index.search(q, mode)
+        page_ids = plate_ids[offset:offset + limit]
+        plates = {plate.id: plate for plate in
+                  db.query(models.AutoPlate).filter(models.AutoPlate.id.in_(page_ids))}
+        next_offset = offset + limit if offset + limit < len(plate_ids) else None
+        logger.info("Search %r (%s) matched %d plates", q, mode, len(plate_ids))
+        return {"items": [plates[plate_id] for plate_id in page_ids if plate_id in plates],
+                "total": len(plate_ids), "next_offset": next_offset}
+    except Exception as e:
+        logger.error("Error searching plates: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @router.get("/{plate_id}", response_model=schemas.AutoPlate)
-def get_plate(plate_id: int, db: Session = Depends(database.get_db)):
+def get_plate(plate_id: int, request: Request, db: Session = Depends(database.get_read_db)):
     """
     Muayyan avtomobil raqami haqida ma'lumot qaytaradi.
     """
     try:
+        key = ("plate", plate_id)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return as_response(request, cached)
+        since = response_cache.version()
         plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == plate_id).first()
         if not plate:
-            logger.warning(f"Plate with ID {plate_id} not found")
+            logger.warning("Plate with ID %d not found", plate_id)
             raise HTTPException(status_code=404, detail="Plate not found")
-        return plate
+        entry = response_cache.put(key, serialize(schemas.AutoPlate, plate), [plate_tag(plate_id)], since)
+        return as_response(request, entry)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching plate {plate_id}: {str(e)}", exc_info=True)
+        logger.error("Error fetching plate %d: %s", plate_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @router.put("/{plate_id}", response_model=schemas.AutoPlate)
 def update_plate(plate_id: int, plate: schemas.AutoPlateCreate, db: Session = Depends(database.get_db),
-                current_user: models.User = Depends(get_current_user)):
+                current_user: Principal = Depends(get_current_user)):
     """
     Muayyan avtomobil raqamini yangilaydi. Faqat adminlar uchun.
     """
     try:
         if not current_user.is_staff:
-            logger.warning(f"User {current_user.username} attempted to update plate without admin privileges")
+            logger.warning("User %s attempted to update plate without admin privileges", current_user.username)
             raise HTTPException(status_code=403, detail="Only admins can update plates")
 
         db_plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == plate_id).first()
         if not db_plate:
-            logger.warning(f"Plate with ID {plate_id} not found")
+            logger.warning("Plate with ID %d not found", plate_id)
             raise HTTPException(status_code=404, detail="Plate not found")
 
         # Plate nomerining noyobligini tekshirish
         existing_plate = db.query(models.AutoPlate).filter(models.AutoPlate.plate_number == plate.plate_number).first()
         if existing_plate and existing_plate.id != db_plate.id:
-            logger.warning(f"Plate number {plate.plate_number} already exists")
+            logger.warning("Plate number %s already exists", plate.plate_number)
             raise HTTPException(status_code=400, detail="Plate number already exists")
 
         # Deadline ni tekshirish va parse qilish
         try:
-            deadline = datetime.fromisoformat(plate.deadline.replace("Z", "+00:00"))
+            deadline = parse_deadline(plate.deadline)
         except ValueError as ve:
-            logger.error(f"Invalid deadline format: {plate.deadline}, error: {str(ve)}")
+            logger.error("Invalid deadline format: %s, error: %s", plate.deadline, ve)
             raise HTTPException(status_code=400, detail="Invalid deadline format")
 
         if deadline <= datetime.utcnow():
-            logger.warning(f"Deadline {deadline} is not in the future")
+            logger.warning("Deadline %s is not in the future", deadline)
             raise HTTPException(status_code=400, detail="Deadline must be in the future")
 
         # Plate ma'lumotlarini yangilash
@@ -138,46 +218,55 @@ def update_plate(plate_id: int, plate: schemas.AutoPlateCreate, db: Session = De
         db_plate.deadline = deadline
         db.commit()
         db.refresh(db_plate)
-        logger.info(f"Plate {plate_id} updated successfully by user {current_user.username}")
+        order_book.upsert_plate(db_plate)
+        response_cache.invalidate_plate(db_plate.id, listing=True)
+        plate_index.upsert(db_plate.id, db_plate.plate_number, db_plate.is_active)
+        if db_plate.is_active:
+            auction_scheduler.schedule(db_plate.id, db_plate.deadline)
+        logger.info("Plate %d updated successfully by user %s", plate_id, current_user.username)
         return db_plate
 
     except IntegrityError as ie:
         db.rollback()
-        logger.error(f"Database integrity error while updating plate: {str(ie)}", exc_info=True)
+        logger.error("Database integrity error while updating plate: %s", ie, exc_info=True)
         raise HTTPException(status_code=400, detail=f"Database error: {str(ie)}")
     except Exception as e:
         db.rollback()
-        logger.error(f"Error updating plate {plate_id}: {str(e)}", exc_info=True)
+        logger.error("Error updating plate %d: %s", plate_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @router.delete("/{plate_id}", status_code=status.HTTP_200_OK)
 def delete_plate(plate_id: int, db: Session = Depends(database.get_db),
-                current_user: models.User = Depends(get_current_user)):
+                current_user: Principal = Depends(get_current_user)):
     """
     Muayyan avtomobil raqamini o'chiradi. Faqat adminlar uchun.
     """
     try:
         if not current_user.is_staff:
-            logger.warning(f"User {current_user.username} attempted to delete plate without admin privileges")
+            logger.warning("User %s attempted to delete plate without admin privileges", current_user.username)
             raise HTTPException(status_code=403, detail="Only admins can delete plates")
 
         db_plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == plate_id).first()
         if not db_plate:
-            logger.warning(f"Plate with ID {plate_id} not found")
+            logger.warning("Plate with ID %d not found", plate_id)
             raise HTTPException(status_code=404, detail="Plate not found")
 
         if db.query(models.Bid).filter(models.Bid.plate_id == plate_id).first():
-            logger.warning(f"Plate {plate_id} has active bids and cannot be deleted")
+            logger.warning("Plate %d has active bids and cannot be deleted", plate_id)
             raise HTTPException(status_code=400, detail="Cannot delete plate with active bids")
 
         db.delete(db_plate)
         db.commit()
-        logger.info(f"Plate {plate_id} deleted successfully by user {current_user.username}")
+        order_book.drop_plate(plate_id)
+        response_cache.invalidate_plate(plate_id, listing=True)
+        auction_scheduler.cancel(plate_id)
+        plate_index.remove(plate_id)
+        logger.info("Plate %d deleted successfully by user %s", plate_id, current_user.username)
         return {"detail": "Plate deleted"}
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error deleting plate {plate_id}: {str(e)}", exc_info=True)
+        logger.error("Error deleting plate %d: %s", plate_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 # from fastapi import APIRouter, Depends, HTTPException, status
@@ -1,71 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from app import database, models, schemas
-from datetime import datetime
+from typing import Optional
+from app import database, models, pagination, schemas
+from app.cache import response_cache
+from app.fastjson import bid_rows
+from app.services.bid_hub import BID_PLACED, BID_RAISED, BID_WITHDRAWN, bid_hub
+from app.services.bid_ledger import bid_ledger
+from app.services import idempotency
+from app.services.bid_writer import bid_writer, stage_bid
+from app.services.order_book import order_book
+from app.services.plate_stats import refresh_plate_stats
+from app.services.principals import Principal
 from .auth import get_current_user
 
 router = APIRouter()
 
-@router.get("/bids/", response_model=list[schemas.Bid])
-def get_bids(db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
-    bids = db.query(models.Bid).filter(models.Bid.user_id == current_user.id).all()
-    return bids
+@router.get("/bids/", response_model=schemas.BidPage)
+def get_bids(db: Session = Depends(database.get_read_db), current_user: Principal = Depends(get_current_user),
+             cursor: Optional[str] = None,
+             limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT)):
+    after = pagination.decode_cursor(cursor, "id") if cursor else None
+    query = db.query(*bid_rows.columns).filter(models.Bid.user_id == current_user.id)
+    query = pagination.keyset(query, models.Bid.id, models.Bid.id, False, after)
+    bids = query.limit(limit + 1).all()
+    return Response(bid_rows.page(pagination.page(bids, limit, "id", "id")), media_type="application/json")
 
 @router.post("/bids/", response_model=schemas.Bid)
-def create_bid(bid: schemas.BidCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
-    plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == bid.plate_id).first()
-    if not plate or not plate.is_active or plate.deadline <= datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Bidding is closed")
-    if db.query(models.Bid).filter(models.Bid.user_id == current_user.id, models.Bid.plate_id == bid.plate_id).first():
-        raise HTTPException(status_code=400, detail="You already have a bid on this plate")
-    if bid.amount <= 0:
-        raise HTTPException(status_code=400, detail="Bid amount must be positive")
-    highest_bid = db.query(models.Bid).filter(models.Bid.plate_id == bid.plate_id).order_by(models.Bid.amount.desc()).first()
-    if highest_bid and bid.amount <= highest_bid.amount:
-        raise HTTPException(status_code=400, detail="Bid must exceed current highest bid")
+def create_bid(bid: schemas.BidCreate, db: Session = Depends(database.get_db), current_user: Principal = Depends(get_current_user),
+               idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
+    return idempotency.run(idempotency_key, current_user.id, "create_bid", bid.model_dump_json(), schemas.Bid,
+                           lambda: _create_bid(bid, db, current_user))
 
-    db_bid = models.Bid(amount=bid.amount, user_id=current_user.id, plate_id=bid.plate_id)
-    db.add(db_bid)
-    db.commit()
-    db.refresh(db_bid)
-    return db_bid
+def _create_bid(bid: schemas.BidCreate, db: Session, current_user: Principal):
+    if bid_writer.running:
+        return bid_writer.result(bid_writer.submit(current_user.id, bid.plate_id, bid.amount))
+    book = order_book.get(db, bid.plate_id)
+    if book is None:
+        raise HTTPException(status_code=400, detail="Bidding is closed")
+    with book.lock:
+        entry = stage_bid(db, book, current_user.id, bid.amount)
+        refresh_plate_stats(db, book.plate_id)
+        db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        entry = order_book.place(book, entry)
+        bid_ledger.append(BID_PLACED, entry)
+        bid_hub.publish_bid(BID_PLACED, book, entry)
+        return entry
 
 @router.get("/bids/{bid_id}", response_model=schemas.Bid)
-def get_bid(bid_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+def get_bid(bid_id: int, db: Session = Depends(database.get_read_db), current_user: Principal = Depends(get_current_user)):
     bid = db.query(models.Bid).filter(models.Bid.id == bid_id, models.Bid.user_id == current_user.id).first()
     if not bid:
         raise HTTPException(status_code=403, detail="Not authorized to view this bid")
     return bid
 
 @router.put("/bids/{bid_id}", response_model=schemas.Bid)
-def update_bid(bid_id: int, bid: schemas.BidCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
-    db_bid = db.query(models.Bid).filter(models.Bid.id == bid_id, models.Bid.user_id == current_user.id).first()
-    if not db_bid:
-        raise HTTPException(status_code=403, detail="Not authorized to update this bid")
-    plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == db_bid.plate_id).first()
-    if not plate.is_active or plate.deadline <= datetime.utcnow():
-        raise HTTPException(status_code=403, detail="Bidding period has ended")
-    if bid.amount <= 0:
-        raise HTTPException(status_code=400, detail="Bid amount must be positive")
-    highest_bid = db.query(models.Bid).filter(models.Bid.plate_id == db_bid.plate_id).order_by(models.Bid.amount.desc()).first()
-    if highest_bid and bid.amount <= highest_bid.amount and db_bid.id != highest_bid.id:
-        raise HTTPException(status_code=400, detail="Bid must exceed current highest bid")
+def update_bid(bid_id: int, bid: schemas.BidCreate, db: Session = Depends(database.get_db), current_user: Principal = Depends(get_current_user),
+               idempotency_key: Optional[str] = Header(None, max_length=idempotency.KEY_MAX_LENGTH)):
+    return idempotency.run(idempotency_key, current_user.id, f"update_bid:{bid_id}", bid.model_dump_json(),
+                           schemas.Bid, lambda: _update_bid(bid_id, bid, db, current_user))
 
-    db_bid.amount = bid.amount
-    db.commit()
-    db.refresh(db_bid)
-    return db_bid
+def _update_bid(bid_id: int, bid: schemas.BidCreate, db: Session, current_user: Principal):
+    book, entry = order_book.find_bid(db, bid_id, current_user.id)
+    if not entry:
+        raise HTTPException(status_code=403, detail="Not authorized to update this bid")
+    with book.lock:
+        entry = book.bids.get(current_user.id)
+        if entry is None or entry.id != bid_id:
+            raise HTTPException(status_code=403, detail="Not authorized to update this bid")
+        book.check_raise(entry, bid.amount)
+        order_book.confirm(db, book, current_user.id, bid.amount, raising=True)
+        db.query(models.Bid).filter(models.Bid.id == bid_id).update(
+            {models.Bid.amount: bid.amount}, synchronize_session=False)
+        refresh_plate_stats(db, book.plate_id)
+        db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        entry = order_book.raise_bid(book, entry, bid.amount)
+        bid_ledger.append(BID_RAISED, entry)
+        bid_hub.publish_bid(BID_RAISED, book, entry)
+        return entry
 
 @router.delete("/bids/{bid_id}")
-def delete_bid(bid_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
-    db_bid = db.query(models.Bid).filter(models.Bid.id == bid_id, models.Bid.user_id == current_user.id).first()
-    if not db_bid:
+def delete_bid(bid_id: int, db: Session = Depends(database.get_db), current_user: Principal = Depends(get_current_user)):
+    book, entry = order_book.find_bid(db, bid_id, current_user.id)
+    if not entry:
         raise HTTPException(status_code=403, detail="Not authorized to delete this bid")
-    plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == db_bid.plate_id).first()
-    if not plate.is_active or plate.deadline <= datetime.utcnow():
-        raise HTTPException(status_code=403, detail="Bidding period has ended")
-    db.delete(db_bid)
-    db.commit()
+    with book.lock:
+        entry = book.bids.get(current_user.id)
+        if entry is None or entry.id != bid_id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this bid")
+        book.check_withdraw()
+        db.query(models.Bid).filter(models.Bid.id == bid_id).delete(synchronize_session=False)
+        refresh_plate_stats(db, book.plate_id)
+        db.commit()
+        response_cache.invalidate_plate(book.plate_id)
+        order_book.withdraw(book, entry)
+        bid_ledger.append(BID_WITHDRAWN, entry)
+        bid_hub.publish_bid(BID_WITHDRAWN, book, entry)
     return {"detail": "Bid deleted"}
 # from fastapi import APIRouter, Depends, HTTPException, status
 # from sqlalchemy.orm import Session
@@ -0,0 +1,13 @@
+# app/api/metrics.py
+# Prometheus uchun o'lchovlar (app/metrics.py)
+from fastapi import APIRouter, Response
+from app import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Prometheus text formatidagi o'lchovlar.
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
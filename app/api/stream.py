@@ -0,0 +1,65 @@
+# app/api/stream.py
+# Server-Sent Events: bidlar haqida real vaqtda xabar (app/services/bid_hub.py)
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import List
+from app import database, models
+from app.config import settings
+from app.services.bid_hub import bid_hub
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/plates", tags=["stream"])
+
+def _existing_plate_ids(plate_ids: List[int]) -> set:
+    # Qisqa sessiya: oqim davomida pool ulanishini ushlab turmaslik uchun
+    db = database.SessionLocal()
+    try:
+        return set(db.scalars(select(models.AutoPlate.id).where(models.AutoPlate.id.in_(plate_ids))))
+    finally:
+        db.close()
+
+async def _stream(request: Request, plate_ids: List[int]) -> StreamingResponse:
+    found = await run_in_threadpool(_existing_plate_ids, plate_ids)
+    missing = [plate_id for plate_id in plate_ids if plate_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Plate not found: {missing[0]}")
+    subscription = bid_hub.subscribe(plate_ids, settings.STREAM_QUEUE_SIZE)
+
+    async def frames():
+        try:
+            yield f"retry: {settings.STREAM_RETRY_MS}\n\n"
+            while not subscription.dropped or not subscription.queue.empty():
+                frame = await subscription.next_frame(settings.STREAM_HEARTBEAT_SECONDS)
+                if frame is None:
+                    if await request.is_disconnected():
+                        break
+                    frame = ": ping\n\n"
+                yield frame
+        finally:
+            bid_hub.unsubscribe(subscription)
+            if subscription.dropped:
+                logger.warning("Dropped slow stream subscriber for plates %s", sorted(subscription.plate_ids))
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/{plate_id}")
+async def stream_plate(plate_id: int, request: Request):
+    """
+    Bitta avtomobil raqami bo'yicha bidlar oqimi (text/event-stream).
+    """
+    return await _stream(request, [plate_id])
+
+@router.get("/")
+async def stream_watchlist(request: Request, ids: List[int] = Query(..., alias="id")):
+    """
+    Kuzatuv ro'yxatidagi bir nechta raqam bo'yicha bidlar oqimi: /stream/plates/?id=1&id=2
+    """
+    plate_ids = list(dict.fromkeys(ids))
+    if len(plate_ids) > settings.STREAM_MAX_PLATES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.STREAM_MAX_PLATES} plates per stream")
+    return await _stream(request, plate_ids)
@@ -0,0 +1,168 @@
+# app/cache.py
+"""
+Versioned response cache for the public plate reads.
+
+Entries hold the serialized JSON body and its ETag, keyed by route and query
+parameters, and are evicted LRU-first once `RESPONSE_CACHE_MAX_BYTES` is
+exceeded. Every entry carries tags: "plate:<id>" for each plate in the body,
+and "plates" for listing pages. Writers invalidate by tag after they commit:
+a bid invalidates only the plate it touched (its detail and the pages showing
+it), while a plate create, update or delete also invalidates every listing page.
+
+Each tag has a version. A reader records `version()` before it queries the
+database, and `put` skips storing the entry if any of its tags was invalidated in
+the meantime, so a slow reader cannot cache data that is already stale. Tag
+versions older than the last PRUNE_EVERY invalidations are forgotten; a reader
+that started before them does not store its entry at all.
+
+Invalidation is per process: a write in another worker is not seen here. Entries
+therefore also expire `RESPONSE_CACHE_TTL_SECONDS` after they were stored, which
+bounds how long a worker serves a stale `highest_bid` or `is_active`.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+LISTING_TAG = "plates"
+PRUNE_EVERY = 1024
+
+
+def plate_tag(plate_id: int) -> str:
+    return f"plate:{plate_id}"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    tags: frozenset
+    expires: float = math.inf
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, enabled: bool = True, ttl_seconds: float = 0.0):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._keys_by_tag = {}
+        self._invalidated_at = {}
+        self._pruned_through = 0
+        self._version = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, body: bytes, tags: Iterable[str], since: int) -> CachedResponse:
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else math.inf
+        entry = CachedResponse(body=body, etag=make_etag(body), tags=frozenset(tags), expires=expires)
+        if not self.enabled or len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            # O'qish davomida shu teglardan biri bekor qilingan bo'lsa, javob eskirgan
+            if since < self._pruned_through or any(self._invalidated_at.get(tag, 0) > since for tag in entry.tags):
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            for tag in entry.tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            self._version += 1
+            for tag in tags:
+                self._invalidated_at[tag] = self._version
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+            if self._version % PRUNE_EVERY == 0:
+                # Eski versiyalar unutiladi; undan oldin boshlangan o'qishlar put da rad etiladi
+                self._pruned_through = self._version - PRUNE_EVERY
+                self._invalidated_at = {tag: version for tag, version in self._invalidated_at.items()
+                                        if version > self._pruned_through}
+
+    def invalidate_plate(self, plate_id: int, listing: bool = False):
+        """A plate's bids changed; `listing=True` when its listing position may have changed too."""
+        if listing:
+            self.invalidate(plate_tag(plate_id), LISTING_TAG)
+        else:
+            self.invalidate(plate_tag(plate_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+def serialize(schema, data) -> bytes:
+    """JSON body exactly as FastAPI would render `data` through `schema`."""
+    return schema.model_validate(data, from_attributes=True).model_dump_json().encode()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def as_response(request: Request, entry: CachedResponse) -> Response:
+    """200 with the cached body, or 304 when the client already has this ETag."""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_ENABLED,
+                               settings.RESPONSE_CACHE_TTL_SECONDS)
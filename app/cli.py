@@ -0,0 +1,81 @@
+# app/cli.py
+"""
+Maintenance commands.
+
+    python -m app.cli init-db
+    python -m app.cli repair-plate-stats
+    python -m app.cli bid-ledger [--path bids.ledger] [--plate-id 5] [--after-seq 0] [--replay]
+"""
+import argparse
+import json
+import logging
+
+from app import database
+
+
+def init_db(args):
+    from app import migrations
+
+    print("applied:", migrations.init_db(database.engine) or "nothing to do")
+    problems = migrations.check_schema(database.engine)
+    if problems:
+        raise SystemExit("; ".join(problems))
+
+
+def repair_plate_stats(args):
+    from app.services.plate_stats import repair_plate_stats as repair
+
+    db = database.SessionLocal()
+    try:
+        print(f"recomputed bid stats for {repair(db)} plates")
+    finally:
+        db.close()
+
+
+def bid_ledger(args):
+    from app.config import settings
+    from app.services import bid_ledger as ledger_module
+
+    path = args.path or ledger_module.ledger_path(settings)
+    if path is None:
+        raise SystemExit("no ledger path: pass --path or set BID_LEDGER_PATH")
+    ledger = ledger_module.BidLedger()
+    ledger.open(path, snapshot_every=0, owner=False)
+    try:
+        ledger.scan()
+        # Snapshotsiz: faqat ledgerdagi hodisalar qayta o'ynaladi
+        state = {}
+        for record in ledger.records(args.after_seq):
+            if args.plate_id is not None and record[4] != args.plate_id:
+                continue
+            if args.replay:
+                ledger_module.fold(state, record)
+            else:
+                print(json.dumps(ledger_module.event_dict(record), default=str))
+        if args.replay:
+            for entry in ledger_module.entries(state):
+                print(json.dumps(vars(entry), default=str))
+    finally:
+        ledger.close()
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init-db", help="create missing tables and apply pending migrations") \
+        .set_defaults(handler=init_db)
+    commands.add_parser("repair-plate-stats", help="recompute highest_bid/bid_count/leader_user_id from bids") \
+        .set_defaults(handler=repair_plate_stats)
+    ledger = commands.add_parser("bid-ledger", help="print bid events from the ledger, or the bids they replay to")
+    ledger.add_argument("--path", help="ledger file (default: BID_LEDGER_PATH or next to the database)")
+    ledger.add_argument("--plate-id", type=int)
+    ledger.add_argument("--after-seq", type=int, default=0)
+    ledger.add_argument("--replay", action="store_true", help="print the live bids after folding the events")
+    ledger.set_defaults(handler=bid_ledger)
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
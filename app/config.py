@@ -1,14 +1,129 @@
 # app/config.py
-from pydantic_settings import BaseSettings
-from pydantic_settings import BaseSettings
+import os
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     SECRET_KEY: str = ""  # JWT uchun maxfiy kalit
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60  # Token muddati (daqiqa)
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    # Ma'lumotlar bazasi ulanishi va connection pool
+    DATABASE_URL: str = "sqlite:///./Auto.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # bo'sh bo'lsa DATABASE_URL dan olinadi
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Faqat o'qish routerlari uchun engine (app/database.py, get_read_db): bo'sh bo'lsa
+    # DATABASE_URL dagi SQLite fayli mode=ro bilan ochiladi. LAG - replika ortda qolishi mumkin bo'lgan vaqt
+    READ_DB_ENABLED: bool = True
+    READ_DATABASE_URL: Optional[str] = None
+    READ_ASYNC_DATABASE_URL: Optional[str] = None
+    READ_DB_POOL_SIZE: int = 10
+    READ_DB_MAX_OVERFLOW: int = 10
+    READ_DB_LAG_SECONDS: float = 0.0
+    READ_MAX_STALENESS_SECONDS: float = 0.0
+
+    # SQLite PRAGMA profili: "default", "wal" yoki "durable" (app.database.SQLITE_PROFILES).
+    # "wal" tezroq, lekin synchronous=NORMAL: elektr uzilsa oxirgi commit qilingan bidlar yo'qolishi mumkin.
+    # "durable" - WAL va har commit da fsync. Quyidagi qiymatlar berilsa, profildagi mos qiymatni almashtiradi.
+    SQLITE_PROFILE: str = "default"
+    SQLITE_JOURNAL_MODE: Optional[str] = None
+    SQLITE_SYNCHRONOUS: Optional[str] = None
+    SQLITE_CACHE_SIZE: Optional[int] = None  # manfiy qiymat KiB da
+    SQLITE_MMAP_SIZE: Optional[int] = None  # baytlarda
+    SQLITE_BUSY_TIMEOUT_MS: Optional[int] = None
+
+    # GET /plates/ va /plates/{id} javoblari keshi (app/cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # Boshqa worker yozuvlari bu keshni bekor qilmaydi: yozuv shuncha soniyadan keyin eskiradi (0 - cheksiz)
+    RESPONSE_CACHE_TTL_SECONDS: float = 2.0
+
+    # get_current_user uchun token -> foydalanuvchi keshi (app/services/principals.py)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    # bcrypt uchun alohida jarayonlar puli (app/services/passwords.py); 0 - inline
+    PASSWORD_POOL_WORKERS: int = 2
+    PASSWORD_POOL_MAX_PENDING: int = 32
+
+    # /stream/plates SSE oqimlari (app/services/bid_hub.py)
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_MAX_PLATES: int = 50
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    STREAM_RETRY_MS: int = 3000
+
+    # Muddati o'tgan auksionlarni yopuvchi fon oqimi (app/services/auction_scheduler.py)
+    AUCTION_SCHEDULER_ENABLED: bool = True
+
+    # POST /admin/plates/import (app/services/plate_import.py)
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+
+    # GET /admin/bids/export partiya hajmi (app/services/bid_export.py)
+    EXPORT_BATCH_SIZE: int = 5000
+
+    # GET /metrics, so'rov va SQL o'lchovlari (app/metrics.py)
+    METRICS_ENABLED: bool = True
+
+    # So'rov bo'yicha SQL profiler (app/profiler.py): X-SQL-Profile sarlavhasi va/yoki aylanma log
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_PROFILER_SLOW_MS: float = 50.0
+    SQL_PROFILER_REPEAT_THRESHOLD: int = 3  # bir xil fingerprint shuncha marta - N+1 belgisi
+    SQL_PROFILER_HEADER: bool = True
+    SQL_PROFILER_LOG_PATH: Optional[str] = None
+    SQL_PROFILER_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SQL_PROFILER_LOG_BACKUPS: int = 3
+
+    # Loglar (app/logs.py): JSON, navbat orqali fon oqimida yoziladi; 0 - sinxron
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" yoki "text"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_RATE_LIMIT_PER_SECOND: float = 50.0  # WARNING dan past, bitta shablon uchun; 0 - cheklovsiz
+    LOG_SAMPLE_RATE: float = 1.0
+
+    # Yozish routerlariga kirish nazorati (app/admission.py): foydalanuvchi va plate bo'yicha
+    # token chelaklari (soniyadagi tezlik, zaxira), yozuvlar uchun umumiy parallellik chegarasi; 0 - cheklovsiz
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_USER_RATE: float = 5.0
+    ADMISSION_USER_BURST: int = 10
+    ADMISSION_PLATE_RATE: float = 100.0
+    ADMISSION_PLATE_BURST: int = 200
+    ADMISSION_MAX_CONCURRENT_WRITES: int = 64
+    ADMISSION_MAX_KEYS: int = 100000
+
+    # Idempotency-Key bo'yicha bid va plate yozuvlari natijasi (app/services/idempotency.py)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_MAX_KEYS: int = 100000
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    # Takroriy so'rov birinchisini shuncha kutadi, keyin 409
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+
+    # Bid hodisalari ledgeri va snapshotlar (app/services/bid_ledger.py); snapshot BID_LEDGER_PATH + ".snap".
+    # Bo'sh PATH - DATABASE_URL dagi SQLite fayli yonida (Auto.db -> Auto.ledger)
+    BID_LEDGER_ENABLED: bool = False
+    BID_LEDGER_PATH: Optional[str] = None
+    BID_LEDGER_SNAPSHOT_EVERY: int = 10000
+
+    # Sxema: ishga tushishda jadvallar yaratiladi va migratsiyalar qo'llanadi; False - faqat tekshiriladi
+    # (oldindan `python -m app.cli init-db`)
+    SCHEMA_AUTO_CREATE: bool = True
+
+    # Async DB va async routerlar (app/api/aio)
+    ASYNC_MODE: bool = False
+
+    # Bid yozuvlarini guruhlab commit qilish (group commit)
+    BID_GROUP_COMMIT: bool = False
+    BID_BATCH_SIZE: int = 100
+    BID_BATCH_LINGER_MS: float = 2.0
+    # So'rov yozuvchi javobini shuncha kutadi, keyin 503
+    BID_WRITER_WAIT_SECONDS: float = 10.0
+
+    # APP_ENV_FILE="" - .env o'qilmaydi (muhit o'zgaruvchilari yetarli bo'lgan workerlar uchun)
+    model_config = SettingsConfigDict(env_file=os.environ.get("APP_ENV_FILE", ".env") or None,
+                                      env_file_encoding="utf-8")
 
 settings = Settings()
\ No newline at end of file
@@ -1,15 +1,186 @@
 # app/database.py
-from sqlalchemy import create_engine
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./Auto.db"
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Har bir yangi ulanishda qo'llaniladigan PRAGMA to'plamlari
+SQLITE_PROFILES = {
+    # SQLite standart sozlamalari (rollback journal, synchronous=FULL)
+    "default": {},
+    # O'quvchilar yozuvchilarni kutmaydi; commit da fsync faqat checkpoint da
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+    },
+    # WAL, lekin har bir commit diskka yoziladi
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+    },
+}
+
+def sqlite_pragmas(config=settings) -> dict:
+    """PRAGMAs for `config.SQLITE_PROFILE` with the individual SQLITE_* overrides applied."""
+    if config.SQLITE_PROFILE not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {config.SQLITE_PROFILE}")
+    pragmas = dict(SQLITE_PROFILES[config.SQLITE_PROFILE])
+    overrides = {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+    }
+    pragmas.update({name: value for name, value in overrides.items() if value is not None})
+    return pragmas
+
+def apply_pragmas(engine: Engine, pragmas: dict):
+    """Run `pragmas` on every new DBAPI connection of `engine`."""
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _pool_args(url: str, config, pool_size: int = None, max_overflow: int = None) -> dict:
+    # In-memory SQLite bitta ulanishda yashaydi, pool o'lchami ma'nosiz
+    if make_url(url).database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": config.DB_POOL_SIZE if pool_size is None else pool_size,
+            "max_overflow": config.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            "pool_timeout": config.DB_POOL_TIMEOUT}
+
+def create_db_engine(url: str, config=settings, pragmas: dict = None, name: str = "primary",
+                     pool_size: int = None, max_overflow: int = None) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    pool_args = _pool_args(url, config, pool_size, max_overflow)
+    if pool_args:
+        pool_args["poolclass"] = metrics.TimedQueuePool
+    db_engine = create_engine(url, connect_args=connect_args, pool_logging_name=name, **pool_args)
+    apply_pragmas(db_engine, sqlite_pragmas(config) if pragmas is None else pragmas)
+    if config.METRICS_ENABLED:
+        metrics.instrument_engine(db_engine, name)
+    return db_engine
+
+def create_async_db_engine(url: str, config=settings, pragmas: dict = None, name: str = "primary_async",
+                           pool_size: int = None, max_overflow: int = None):
+    pool_args = _pool_args(url, config, pool_size, max_overflow)
+    if pool_args:
+        # aiosqlite standart holda NullPool ishlatadi: har so'rovda yangi ulanish va PRAGMA lar
+        pool_args["poolclass"] = metrics.TimedAsyncAdaptedQueuePool
+    db_engine = create_async_engine(url, pool_logging_name=name, **pool_args)
+    apply_pragmas(db_engine.sync_engine, sqlite_pragmas(config) if pragmas is None else pragmas)
+    if config.METRICS_ENABLED:
+        metrics.instrument_engine(db_engine.sync_engine, name)
+    return db_engine
+
+def async_url(url: str) -> str:
+    return url.replace("sqlite://", "sqlite+aiosqlite://", 1) if url.startswith("sqlite://") else url
+
+def read_only_url(url: str) -> Optional[str]:
+    """The same SQLite file opened with mode=ro, or None if `url` is not a SQLite file."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:") \
+            or parsed.database.startswith("file:"):
+        return None
+    return parsed.set(database=f"file:{parsed.database}",
+                      query={**parsed.query, "mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+def read_pragmas(config=settings) -> dict:
+    # journal_mode ni faqat yozuvchi o'zgartiradi; query_only replika fayliga ham yozishni taqiqlaydi
+    pragmas = {name: value for name, value in sqlite_pragmas(config).items() if name != "journal_mode"}
+    pragmas["query_only"] = "ON"
+    return pragmas
+
+class ReadRouting:
+    """
+    Chooses the read engine or the primary for a read that tolerates `max_staleness` seconds.
+
+    The read engine may miss the writes of the last READ_DB_LAG_SECONDS (0 for
+    the same SQLite file). A read goes there when it tolerates that much, or
+    when nothing was committed on the primary for that long; otherwise it
+    reads the primary. Writers always use the primary.
+    """
+
+    def __init__(self, lag_seconds: float):
+        self.lag_seconds = lag_seconds
+        self._last_write = float("-inf")
+        self.replica = 0
+        self.primary = 0
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    def note_write(self, conn=None):
+        self._last_write = time.monotonic()
+
+    def use_replica(self, max_staleness: float) -> bool:
+        if max_staleness >= self.lag_seconds or time.monotonic() - self._last_write >= self.lag_seconds:
+            self.replica += 1
+            return True
+        self.primary += 1
+        return False
+
+    def stats(self) -> dict:
+        return {"replica": self.replica, "primary": self.primary, "lag_seconds": self.lag_seconds}
+
+def effective_settings(db_engine: Engine) -> dict:
+    """What the engine actually runs with, read back from a live connection."""
+    report = {"url": db_engine.url.render_as_string(hide_password=True), "pool": db_engine.pool.status()}
+    if db_engine.dialect.name == "sqlite":
+        with db_engine.connect() as connection:
+            for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+                report[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return report
+
+def log_effective_settings(db_engine: Engine):
+    logger.info("Database settings (profile=%s): %s", settings.SQLITE_PROFILE, effective_settings(db_engine))
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_url(SQLALCHEMY_DATABASE_URL)
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async rejim uchun (Settings.ASYNC_MODE)
+async_engine = create_async_db_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Faqat o'qish uchun engine: replika yoki shu SQLite fayli mode=ro bilan (Settings.READ_DB_*)
+READ_SQLALCHEMY_DATABASE_URL = settings.READ_DATABASE_URL or read_only_url(SQLALCHEMY_DATABASE_URL)
+read_routing = ReadRouting(settings.READ_DB_LAG_SECONDS)
+if settings.READ_DB_ENABLED and READ_SQLALCHEMY_DATABASE_URL:
+    read_engine = create_db_engine(READ_SQLALCHEMY_DATABASE_URL, pragmas=read_pragmas(), name="read",
+                                   pool_size=settings.READ_DB_POOL_SIZE, max_overflow=settings.READ_DB_MAX_OVERFLOW)
+    async_read_engine = create_async_db_engine(
+        settings.READ_ASYNC_DATABASE_URL or async_url(READ_SQLALCHEMY_DATABASE_URL), pragmas=read_pragmas(),
+        name="read_async", pool_size=settings.READ_DB_POOL_SIZE, max_overflow=settings.READ_DB_MAX_OVERFLOW)
+    if settings.READ_DB_LAG_SECONDS > 0:
+        event.listen(engine, "commit", read_routing.note_write)
+        event.listen(async_engine.sync_engine, "commit", read_routing.note_write)
+else:
+    read_engine, async_read_engine = engine, async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +188,32 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def read_db(max_staleness: Optional[float] = None):
+    """Dependency for read-only routes; `max_staleness` defaults to READ_MAX_STALENESS_SECONDS."""
+    tolerance = settings.READ_MAX_STALENESS_SECONDS if max_staleness is None else max_staleness
+
+    def get_read_db():
+        db = (ReadSessionLocal if read_routing.use_replica(tolerance) else SessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+    return get_read_db
+
+def async_read_db(max_staleness: Optional[float] = None):
+    """`read_db` for the async routes."""
+    tolerance = settings.READ_MAX_STALENESS_SECONDS if max_staleness is None else max_staleness
+
+    async def get_async_read_db():
+        async with (AsyncReadSessionLocal if read_routing.use_replica(tolerance) else AsyncSessionLocal)() as db:
+            yield db
+    return get_async_read_db
+
+get_read_db = read_db()
+get_async_read_db = async_read_db()
@@ -0,0 +1,57 @@
+# app/fastjson.py
+"""
+Fast JSON bodies for the list routes.
+
+FastAPI renders a page of ORM objects by loading full entities, validating
+each through the response schema and dumping the result. For a page of rows
+that only needs copying, `RowEncoder` does instead:
+
+    select(*encoder.columns)           plain column tuples, no identity map
+    encoder.page(result) -> bytes      dicts in schema field order -> orjson
+
+The columns and their order come from the pydantic schema, so the bytes are
+the same as `schema.model_validate(...).model_dump_json()`: orjson and pydantic
+both render naive datetimes as ISO 8601 and floats as the shortest round-trip
+repr, and int values read from a float column are converted like pydantic
+does. `benchmarks/fast_json.py` checks that the bytes match and times both
+paths.
+"""
+import typing
+from typing import Iterable, List
+
+import orjson
+from pydantic import BaseModel
+
+from app import models, schemas
+
+
+def _is_float(annotation) -> bool:
+    return annotation is float or float in typing.get_args(annotation)
+
+
+class RowEncoder:
+    def __init__(self, schema: typing.Type[BaseModel], model):
+        self.names = tuple(schema.model_fields)
+        self.columns = tuple(getattr(model, name) for name in self.names)
+        self._floats = tuple(i for i, field in enumerate(schema.model_fields.values()) if _is_float(field.annotation))
+
+    def rows(self, rows: Iterable) -> List[dict]:
+        names, floats = self.names, self._floats
+        items = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for i in floats:
+                value = row[i]
+                # SQLite REAL ustunidan ham butun son kelishi mumkin; pydantic uni float ga aylantiradi
+                if value is not None and type(value) is not float:
+                    item[names[i]] = float(value)
+            items.append(item)
+        return items
+
+    def page(self, result: dict) -> bytes:
+        """Body of a keyset page as built by `pagination.page` from column rows."""
+        return orjson.dumps({"items": self.rows(result["items"]), "next_cursor": result["next_cursor"]})
+
+
+plate_rows = RowEncoder(schemas.AutoPlate, models.AutoPlate)
+bid_rows = RowEncoder(schemas.Bid, models.Bid)
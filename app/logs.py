@@ -0,0 +1,168 @@
+# app/logs.py
+"""
+Non-blocking structured logging.
+
+`configure_logging` puts one `NonBlockingQueueHandler` on the root logger.
+A request thread only runs the level check, the rate limit and a
+`put_nowait` on a bounded queue. The message is never formatted there:
+`getMessage()`, the JSON encoding and any `exc_info` traceback are rendered by
+the `QueueListener` writer thread. When the queue is full the record is
+dropped and counted instead of blocking the request.
+
+High-volume messages are limited per call site: records below WARNING with
+the same logger and message template pass at most LOG_RATE_LIMIT_PER_SECOND
+times a second, and a LOG_SAMPLE_RATE below 1 keeps only that share of them.
+WARNING and above always pass. Call sites must use %-style arguments
+(`logger.info("Plate %d", plate_id)`), not f-strings, so that nothing is
+built when the level is disabled and the template is stable for the limit.
+
+With LOG_QUEUE_SIZE=0 records are written synchronously on the calling thread,
+as `logging.basicConfig` did.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# LogRecord ning standart atributlari; qolganlari `extra=` orqali kelgan maydonlar
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Per (logger, template) limit of records below WARNING, plus optional sampling."""
+
+    def __init__(self, per_second: float, sample_rate: float = 1.0):
+        super().__init__()
+        self.per_second = per_second
+        self.sample_rate = sample_rate
+        self._windows: Dict[Tuple[str, str], list] = {}  # kalit -> [oyna boshi, soni]
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+        if self.per_second <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            # Oyna almashishi poygasi ba'zan bitta ortiqcha yozuv o'tkazadi, qulf shundan arzon
+            self._windows[key] = [now, 1]
+            return True
+        window[1] += 1
+        if window[1] > self.per_second:
+            self.suppressed += 1
+            return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare xabarni shu oqimda formatlaydi; bu ish yozuvchi oqimga qoladi
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # To'la navbatda put_nowait xato beradi; yozuvchi oqim navbatni bo'shatib turadi
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handler: Optional[logging.Handler] = None
+        self._queue_handler: Optional[NonBlockingQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._filter: Optional[RateLimitFilter] = None
+
+    def configure(self, level: str = "INFO", json_format: bool = True, queue_size: int = 10000,
+                  rate_limit: float = 0.0, sample_rate: float = 1.0, stream=None):
+        """Replace the root handlers with the pipeline; safe to call again."""
+        with self._lock:
+            self._stop()
+            self._queue_handler = None
+            handler = logging.StreamHandler(stream or sys.stderr)
+            handler.setFormatter(JsonFormatter() if json_format else
+                                 logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+            self._filter = RateLimitFilter(rate_limit, sample_rate)
+            root = logging.getLogger()
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            if queue_size > 0:
+                self._queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+                self._queue_handler.addFilter(self._filter)
+                self._listener = _Listener(self._queue_handler.queue, handler)
+                self._listener.start()
+                root.addHandler(self._queue_handler)
+            else:
+                handler.addFilter(self._filter)
+                root.addHandler(handler)
+            self._handler = handler
+            root.setLevel(level.upper())
+
+    def stop(self):
+        """Flush the queue, stop the writer thread and keep logging synchronously."""
+        with self._lock:
+            self._stop()
+            if self._queue_handler is not None and self._handler is not None:
+                root = logging.getLogger()
+                root.removeHandler(self._queue_handler)
+                self._handler.addFilter(self._filter)
+                root.addHandler(self._handler)
+                self._queue_handler = None
+
+    def _stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def stats(self) -> dict:
+        queue_handler = self._queue_handler
+        return {"queued": queue_handler.queue.qsize() if queue_handler else 0,
+                "dropped": queue_handler.dropped if queue_handler else 0,
+                "suppressed": self._filter.suppressed if self._filter else 0}
+
+
+log_pipeline = LogPipeline()
+
+
+def configure_logging(config, stream=None):
+    log_pipeline.configure(config.LOG_LEVEL, config.LOG_FORMAT == "json", config.LOG_QUEUE_SIZE,
+                           config.LOG_RATE_LIMIT_PER_SECOND, config.LOG_SAMPLE_RATE, stream)
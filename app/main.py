@@ -1,11 +1,182 @@
 # app/main.py
+"""
+Application factory.
+
+    uvicorn --factory app.main:create_app
+    uvicorn app.main:app
+
+`app.main:app` is built on first access, so the factory form builds it once.
+
+`create_app` builds the FastAPI object. It imports only the routers of the
+selected mode (sync, or async from app/api/aio) and does not touch the
+database. The lifespan hook then creates and migrates the schema
+(SCHEMA_AUTO_CREATE), or only checks it when `python -m app.cli init-db` ran
+before the deploy, and starts the services. Import time and every startup
+phase are logged once and exported on /metrics as `startup_*_ms`.
+"""
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+
 from fastapi import FastAPI
-from app.database import Base, engine
-from app.api import auth, auto_plate, bid
+from app import metrics, migrations, profiler
+from app.admission import AdmissionMiddleware, admission
+from app.cache import response_cache
+from app.config import settings
+from app.logs import configure_logging, log_pipeline
+from app.database import (async_engine, async_read_engine, engine, read_engine, read_routing, SessionLocal,
+                          log_effective_settings)
+from app.services.auction_scheduler import auction_scheduler
+from app.services.bid_hub import bid_hub
+from app.services.bid_ledger import bid_ledger, ledger_path
+from app.services.bid_writer import bid_writer
+from app.services.order_book import order_book
+from app.services.idempotency import idempotency_store
+from app.services.passwords import hasher
+from app.services.plate_search import plate_index
+from app.services.principals import principal_cache
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimings:
+    """Milliseconds spent importing app.main, in `create_app` and in each lifespan phase."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        return {f"{name}_ms": round(ms, 1) for name, ms in self.phases.items()}
+
+
+startup_timings = StartupTimings()
+startup_timings.phases["import"] = (time.perf_counter() - _IMPORT_STARTED) * 1000
+
+
+def start_services(config=settings):
+    phase = startup_timings.phase
+    with phase("schema"):
+        if config.SCHEMA_AUTO_CREATE:
+            migrations.init_db(engine)
+        else:
+            problems = migrations.check_schema(engine)
+            if problems:
+                raise RuntimeError("Database schema is out of date, run `python -m app.cli init-db`: "
+                                   + "; ".join(problems))
+    # Jarayonlar puli birinchi: fork boshqa oqimlar ishga tushishidan oldin bo'lsin
+    with phase("password_pool"):
+        hasher.start(config.PASSWORD_POOL_WORKERS, config.PASSWORD_POOL_MAX_PENDING)
+    log_effective_settings(engine)
+    db = SessionLocal()
+    try:
+        with phase("order_book"):
+            if config.BID_LEDGER_ENABLED:
+                path = ledger_path(config)
+                if path is None:
+                    logger.warning("Bid ledger is off: DATABASE_URL is not a SQLite file and BID_LEDGER_PATH is empty")
+                else:
+                    bid_ledger.open(path, config.BID_LEDGER_SNAPSHOT_EVERY)
+            order_book.warm(db, bid_ledger.recover if bid_ledger.enabled else None)
+        with phase("plate_index"):
+            plate_index.rebuild(db)
+    finally:
+        db.close()
+    with phase("workers"):
+        if config.BID_GROUP_COMMIT:
+            bid_writer.start(SessionLocal, config.BID_BATCH_SIZE, config.BID_BATCH_LINGER_MS,
+                             config.BID_WRITER_WAIT_SECONDS)
+        if config.AUCTION_SCHEDULER_ENABLED:
+            auction_scheduler.start(SessionLocal)
+        bid_ledger.start()
+
+
+def stop_services():
+    auction_scheduler.stop()
+    bid_writer.stop()
+    bid_ledger.stop()
+    hasher.stop()
+    log_pipeline.stop()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI, config=settings):
+    with startup_timings.phase("lifespan"):
+        start_services(config)
+    logger.info("Startup timings: %s", startup_timings.stats())
+    try:
+        yield
+    finally:
+        stop_services()
+
+
+def create_app(config=settings) -> FastAPI:
+    with startup_timings.phase("create_app"):
+        configure_logging(config)
+        app = FastAPI(title="Auto Plate Bidding API", lifespan=partial(lifespan, config=config))
+
+        # Faqat tanlangan rejim routerlari import qilinadi
+        if config.ASYNC_MODE:
+            from app.api.aio import auth, auto_plate, bid
+        else:
+            from app.api import auth, auto_plate, bid
+        from app.api import admin, stream
+
+        app.include_router(auth.router, prefix="/auth", tags=["auth"])
+        app.include_router(auto_plate.router, prefix="/plates", tags=["plates"])
+        app.include_router(bid.router, prefix="/bids", tags=["bids"])
+        app.include_router(stream.router, prefix="/stream", tags=["stream"])
+        app.include_router(admin.router, prefix="/admin", tags=["admin"])
+
+        if config.ADMISSION_ENABLED:
+            # Metrika middleware dan ichkarida: rad etilgan 429 lar ham sanaladi
+            admission.configure(config.ADMISSION_USER_RATE, config.ADMISSION_USER_BURST,
+                                config.ADMISSION_PLATE_RATE, config.ADMISSION_PLATE_BURST,
+                                config.ADMISSION_MAX_CONCURRENT_WRITES, config.ADMISSION_MAX_KEYS)
+            app.add_middleware(AdmissionMiddleware)
+
+        if config.METRICS_ENABLED:
+            from app.api import metrics as metrics_api
+
+            app.add_middleware(metrics.MetricsMiddleware)
+            app.include_router(metrics_api.router, tags=["metrics"])
+            for name, service in (("response_cache", response_cache), ("principal_cache", principal_cache),
+                                  ("password_hasher", hasher), ("bid_hub", bid_hub),
+                                  ("auction_scheduler", auction_scheduler), ("plate_index", plate_index),
+                                  ("logging", log_pipeline), ("admission", admission),
+                                  ("idempotency", idempotency_store), ("read_routing", read_routing),
+                                  ("bid_ledger", bid_ledger), ("startup", startup_timings)):
+                metrics.register_stats(name, service.stats)
+
+        if config.SQL_PROFILER_ENABLED:
+            profiler.install(engine)
+            profiler.install(async_engine.sync_engine)
+            if read_engine is not engine:
+                profiler.install(read_engine)
+                profiler.install(async_read_engine.sync_engine)
+            if config.SQL_PROFILER_LOG_PATH:
+                profiler.configure_log(config.SQL_PROFILER_LOG_PATH, config.SQL_PROFILER_LOG_MAX_BYTES,
+                                       config.SQL_PROFILER_LOG_BACKUPS)
+            app.add_middleware(profiler.ProfilerMiddleware, repeat_threshold=config.SQL_PROFILER_REPEAT_THRESHOLD,
+                               slow_ms=config.SQL_PROFILER_SLOW_MS, header=config.SQL_PROFILER_HEADER)
+    return app
 
-app = FastAPI(title="Auto Plate Bidding API")
-Base.metadata.create_all(bind=engine)
 
-app.include_router(auth.router, prefix="/auth", tags=["auth"])
-app.include_router(auto_plate.router, prefix="/plates", tags=["plates"])
-app.include_router(bid.router, prefix="/bids", tags=["bids"])
\ No newline at end of file
+def __getattr__(name: str):
+    # `uvicorn app.main:app` va `from app.main import app` uchun; --factory da chaqirilmaydi
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,312 @@
+# app/metrics.py
+"""
+Process metrics in the Prometheus text format, served at GET /metrics.
+
+Counters and histograms are sharded per thread: every thread increments its
+own dict, so the hot path takes no lock, and a scrape sums the shards. The
+shard of a finished thread is folded into a base value, so threadpools that
+replace their threads do not grow the shard list.
+Requests are measured by `MetricsMiddleware`, a plain ASGI middleware that
+labels them with the matched route template (`/plates/plates/{plate_id}`, not
+the raw path), so label cardinality stays bounded. A streaming response
+(SSE, export) counts until its last byte.
+
+Every SQL statement is timed through engine events (`instrument_engine`) and
+also added to the current request's totals through a context variable, which
+follows the request into the threadpool and into async greenlets. Pool
+checkouts are timed in `TimedQueuePool`. Services with a `stats()` dict
+(caches, hasher, bid hub, ...) are exported as gauges at scrape time through
+`register_stats`.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Bid yozuvchi routelar: 2xx - qabul qilindi, 4xx - rad etildi
+BID_ROUTES = {
+    ("POST", "/bids/bids/"): "place",
+    ("PUT", "/bids/bids/{bid_id}"): "raise",
+    ("DELETE", "/bids/bids/{bid_id}"): "withdraw",
+}
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._base: dict = {}
+        self._shards_lock = threading.Lock()
+        registry.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            # Har bir oqim uchun bir marta: keyingi yozuvlar qulfsiz
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._fold_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_finished(self):
+        # Tugagan oqim endi yozmaydi: uning shardi base ga qo'shilib ro'yxatdan olinadi
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._merge(self._base, shard)
+        self._shards = alive
+
+    def _totals(self) -> dict:
+        totals = {}
+        with self._shards_lock:
+            self._fold_finished()
+            self._merge(totals, self._base)
+            for _, shard in self._shards:
+                self._merge(totals, shard)
+        return totals
+
+    def _merge(self, totals: dict, shard: dict):
+        raise NotImplementedError
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, totals: dict, shard: dict):
+        for labels, value in list(shard.items()):
+            totals[labels] = totals.get(labels, 0) + value
+
+    def values(self) -> Dict[tuple, float]:
+        return self._totals()
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._label_text(labels)} {_number(value)}"
+                for labels, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """A counter that may go down; per-thread shards sum to the current value."""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: tuple = ()):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Oxirgi ikki element: +Inf bucket va yig'indi
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _merge(self, totals: dict, shard: dict):
+        for labels, series in list(shard.items()):
+            total = totals.setdefault(labels, [0] * len(series))
+            for i, value in enumerate(list(series)):
+                total[i] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, series in sorted(self._totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry: List[_Metric] = []
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+http_requests = Histogram("http_request_duration_seconds", "HTTP request latency by route and status",
+                          ("method", "route", "status"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+db_queries = Histogram("db_query_duration_seconds", "SQL statement execution time", ("engine",),
+                       buckets=QUERY_BUCKETS)
+request_queries = Histogram("http_request_db_queries", "SQL statements per HTTP request", ("method", "route"),
+                            buckets=COUNT_BUCKETS)
+request_query_time = Histogram("http_request_db_seconds", "Time in SQL statements per HTTP request",
+                               ("method", "route"))
+pool_waits = Histogram("db_pool_checkout_seconds", "Time to check a connection out of the pool", ("engine",),
+                       buckets=QUERY_BUCKETS)
+bids = Counter("bids_total", "Bid writes by action and outcome", ("action", "outcome"))
+
+# Joriy so'rovning [so'rovlar soni, SQL vaqti]; fon oqimlarida None
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+def register_stats(prefix: str, stats: Callable[[], dict]):
+    """Export the numeric values of `stats()` as gauges `<prefix>_<key>` on every scrape."""
+    _collectors[prefix] = stats
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for prefix, stats in list(_collectors.items()):
+        for key, value in stats().items():
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def pop_started(exception_context, key: str):
+    """`handle_error` helper: drop the start time pushed under `key` for a statement that failed."""
+    connection = exception_context.connection
+    started = connection.info.get(key) if connection is not None else None
+    # Xato before_cursor_execute dan oldin yoki after_cursor_execute dan keyin bo'lsa, yozuv bu so'rovniki emas
+    if started and started[-1][0] is exception_context.execution_context:
+        started.pop()
+
+
+def instrument_engine(engine: Engine, name: str):
+    """Time every statement run on `engine` (the sync engine of an async one too)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()[1]
+        db_queries.observe(elapsed, (name,))
+        totals = _request_db.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def drop_timer(exception_context):
+        pop_started(exception_context, "query_started")
+
+    register_stats(f"db_pool_{name}", lambda: {
+        "size": engine.pool.size() if hasattr(engine.pool, "size") else 0,
+        "checked_out": engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0,
+        "overflow": engine.pool.overflow() if hasattr(engine.pool, "overflow") else 0,
+    })
+
+
+class _TimedPool:
+    """Pool mixin timing `_do_get`, i.e. the wait for a free connection; labelled by pool_logging_name."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_waits.observe(time.perf_counter() - started, (self._orig_logging_name or "default",))
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Callable, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # Routerga yetmagan so'rov (masalan app/admission.py rad etgan) shablonni o'zi qo'yadi
+            return scope.get("route_template", "unmatched")
+        route = self._routes.get(endpoint)
+        if route is None:
+            # Endpoint -> shablon jadvali birinchi murojaatda to'ldiriladi
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = self._routes[endpoint] = getattr(candidate, "path_format", candidate.path)
+                    break
+            else:
+                route = "unmatched"
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        totals = [0, 0.0]
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _request_db.set(totals)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            _request_db.reset(token)
+            method, route = scope["method"], self._route(scope)
+            http_requests.observe(elapsed, (method, route, str(status)))
+            request_queries.observe(totals[0], (method, route))
+            request_query_time.observe(totals[1], (method, route))
+            action = BID_ROUTES.get((method, route))
+            if action is not None and status < 500:
+                bids.inc((action, "accepted" if status < 400 else "rejected"))
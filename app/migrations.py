@@ -0,0 +1,221 @@
+# app/migrations.py
+"""
+Lightweight versioned schema migrations.
+
+`Base.metadata.create_all` creates missing tables but never changes existing
+ones, so anything a deployed database needs beyond that is a numbered step in
+MIGRATIONS. Applied versions are recorded in the `schema_migrations` table and
+each step runs in its own transaction. Steps must be idempotent, because a
+fresh database created by `create_all` already has the current schema.
+
+Several workers may start at once. A step's transaction first inserts its
+`schema_migrations` row, which takes the database write lock. A worker that
+loses the race waits on that lock and then fails the insert, and it skips the
+step. `init_db` retries for MIGRATION_WAIT_SECONDS while another worker holds
+the lock.
+
+    python -m app.migrations status
+    python -m app.migrations upgrade
+    python -m app.migrations check-plans
+
+The application does not run any of this at import time: its lifespan hook
+calls `init_db` (SCHEMA_AUTO_CREATE) or only `check_schema`, and
+`python -m app.cli init-db` does the same as `upgrade` before a deploy.
+"""
+import logging
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_WAIT_SECONDS = 60.0
+
+
+def _bids_indexes(connection: Connection):
+    # Eski bazalarda takroriy (user_id, plate_id) bo'lishi mumkin: eng yuqori summali taklif qoladi,
+    # qolganlari bids_removed_duplicates jadvaliga ko'chiriladi
+    duplicates = (
+        "FROM bids WHERE id NOT IN ("
+        " SELECT (SELECT b2.id FROM bids b2 WHERE b2.user_id = b1.user_id AND b2.plate_id = b1.plate_id"
+        "         ORDER BY b2.amount DESC, b2.id LIMIT 1)"
+        " FROM bids b1 GROUP BY b1.user_id, b1.plate_id)")
+    rows = connection.execute(text(f"SELECT id, user_id, plate_id, amount {duplicates}")).all()
+    if rows:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS bids_removed_duplicates AS SELECT * FROM bids WHERE 0"))
+        connection.execute(text(f"INSERT INTO bids_removed_duplicates SELECT * {duplicates}"))
+        connection.execute(text(f"DELETE {duplicates}"))
+        logger.warning("Moved %d duplicate bids to bids_removed_duplicates before adding uq_bids_user_id_plate_id:"
+                       " %s", len(rows), [tuple(row) for row in rows])
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_bids_user_id_plate_id ON bids (user_id, plate_id)"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_bids_plate_id_amount ON bids (plate_id, amount DESC)"))
+
+
+def _plate_bid_stats(connection: Connection):
+    from app.services.plate_stats import plate_stats_update
+
+    columns = {column["name"] for column in inspect(connection).get_columns("auto_plates")}
+    for name, ddl in (("highest_bid", "FLOAT"),
+                      ("bid_count", "INTEGER NOT NULL DEFAULT 0"),
+                      ("leader_user_id", "INTEGER REFERENCES users (id)")):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE auto_plates ADD COLUMN {name} {ddl}"))
+    connection.execute(plate_stats_update())
+
+
+def _keyset_indexes(connection: Connection):
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_auto_plates_deadline ON auto_plates (deadline)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_bids_user_id_id ON bids (user_id, id)"))
+
+
+def _auction_results(connection: Connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("auto_plates")}
+    for name, ddl in (("winning_bid_id", "INTEGER"), ("closed_at", "DATETIME")):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE auto_plates ADD COLUMN {name} {ddl}"))
+
+
+# (versiya, nomi, funksiya) - faqat oxiriga qo'shiladi, mavjudlari o'zgartirilmaydi
+MIGRATIONS = [
+    (1, "bids composite indexes and one bid per user per plate", _bids_indexes),
+    (2, "auto_plates highest_bid, bid_count and leader_user_id", _plate_bid_stats),
+    (3, "indexes for keyset pagination of plates and bids", _keyset_indexes),
+    (4, "auto_plates winning_bid_id and closed_at", _auction_results),
+]
+
+
+def _ensure_table(engine: Engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"))
+
+
+def applied_versions(engine: Engine) -> set:
+    _ensure_table(engine)
+    with engine.connect() as connection:
+        return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def pending(engine: Engine) -> list:
+    done = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in done]
+
+
+def upgrade(engine: Engine) -> list:
+    """Apply every pending migration in order; returns the versions applied by this call."""
+    applied = []
+    for version, name, step in pending(engine):
+        try:
+            with engine.begin() as connection:
+                # Avval versiya yoziladi: yozish qulfi olinadi, parallel worker shu yerda kutadi
+                connection.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at)"
+                         " VALUES (:version, :name, :applied_at)"),
+                    {"version": version, "name": name, "applied_at": datetime.utcnow()})
+                step(connection)
+        except IntegrityError:
+            logger.info("Migration %d was applied by another process", version)
+            continue
+        logger.info("Applied migration %d: %s", version, name)
+        applied.append(version)
+    return applied
+
+
+def init_db(engine: Engine) -> list:
+    """Create missing tables, then apply pending migrations; returns the versions applied."""
+    from app.database import Base
+    import app.models  # noqa: F401  jadvallar metadata ga ro'yxatdan o'tishi uchun
+
+    deadline = time.monotonic() + MIGRATION_WAIT_SECONDS
+    while True:
+        try:
+            Base.metadata.create_all(bind=engine)
+            return upgrade(engine)
+        except OperationalError:
+            # Boshqa worker jadval yaratyapti yoki migratsiyani qo'llayapti (database is locked)
+            if time.monotonic() > deadline:
+                raise
+            logger.info("Schema is being changed by another process; retrying")
+            time.sleep(0.5)
+
+
+def check_schema(engine: Engine) -> list:
+    """Missing tables and pending migrations, without writing anything; an empty list means up to date."""
+    from app.database import Base
+    import app.models  # noqa: F401
+
+    tables = set(inspect(engine).get_table_names())
+    problems = [f"missing table {name}" for name in Base.metadata.tables if name not in tables]
+    done = set()
+    if "schema_migrations" in tables:
+        with engine.connect() as connection:
+            done = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+    problems += [f"pending migration {version}: {name}" for version, name, _ in MIGRATIONS if version not in done]
+    return problems
+
+
+# Issiq so'rovlar va ular ishlatishi kerak bo'lgan indeks
+HOT_QUERIES = [
+    ("bid by user and plate",
+     "SELECT id FROM bids WHERE user_id = 1 AND plate_id = 1", "uq_bids_user_id_plate_id"),
+    ("bids of user, next page",
+     "SELECT id FROM bids WHERE user_id = 1 AND id > 10 ORDER BY id LIMIT 51", "ix_bids_user_id_id"),
+    ("plates by deadline, next page",
+     "SELECT id FROM auto_plates WHERE is_active = 1 AND (deadline, id) > ('2030-01-01 00:00:00.000000', 10)"
+     " ORDER BY deadline, id LIMIT 51", "ix_auto_plates_deadline"),
+    ("plates by plate number, next page",
+     "SELECT id FROM auto_plates WHERE is_active = 1 AND (plate_number, id) < ('01A', 10)"
+     " ORDER BY plate_number DESC, id DESC LIMIT 51", "ix_auto_plates_plate_number"),
+    ("highest bid on plate",
+     "SELECT id, amount FROM bids WHERE plate_id = 1 ORDER BY amount DESC LIMIT 1", "ix_bids_plate_id_amount"),
+]
+
+
+def explain(connection: Connection, sql: str) -> list:
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def check_query_plans(engine: Engine) -> list:
+    """Problems found in the plans of HOT_QUERIES; an empty list means every query uses its index."""
+    problems = []
+    with engine.connect() as connection:
+        for label, sql, index in HOT_QUERIES:
+            plan = explain(connection, sql)
+            if not any(index in detail for detail in plan):
+                problems.append(f"{label}: expected {index}, got {plan}")
+            elif any("TEMP B-TREE" in detail for detail in plan):
+                problems.append(f"{label}: sorts in a temp b-tree: {plan}")
+    return problems
+
+
+def main(argv=None):
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    command = (argv or sys.argv[1:] or ["upgrade"])[0]
+    if command == "status":
+        done = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:4d} {'applied' if version in done else 'pending'}  {name}")
+    elif command == "upgrade":
+        print("applied:", init_db(engine) or "nothing to do")
+    elif command == "check-plans":
+        problems = check_query_plans(engine)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print("all hot queries use their indexes")
+    else:
+        sys.exit(f"unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -8,11 +8,21 @@ class AutoPlate(Base):
     id = Column(Integer, primary_key=True, index=True)
     plate_number = Column(String(10), unique=True, index=True)
     description = Column(Text)
-    deadline = Column(DateTime)
+    deadline = Column(DateTime, index=True)
     created_by_id = Column(Integer, ForeignKey("users.id"))
     is_active = Column(Boolean, default=True)
 
-    created_by = relationship("User", back_populates="plates_created")
+    # bids jadvalidan hisoblanadigan denormallashgan ustunlar (app/services/plate_stats.py)
+    highest_bid = Column(Float, nullable=True)
+    bid_count = Column(Integer, nullable=False, default=0, server_default="0")
+    leader_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # Auksion yopilganda yoziladi (app/services/auction_scheduler.py).
+    # bids -> auto_plates FK bor, shuning uchun bu yerda FK qo'yilmagan (jadval sikli bo'lmasin)
+    winning_bid_id = Column(Integer, nullable=True)
+    closed_at = Column(DateTime, nullable=True)
+
+    created_by = relationship("User", back_populates="plates_created", foreign_keys=[created_by_id])
     bids = relationship("Bid", back_populates="plate")
 # from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
 # from sqlalchemy.orm import relationship
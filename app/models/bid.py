@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -13,6 +13,13 @@ class Bid(Base):
 
     user = relationship("User", back_populates="bids")
     plate = relationship("AutoPlate", back_populates="bids")
+
+# Bitta foydalanuvchi bitta plate ga bitta taklif; (user_id, plate_id) qidiruvi ham shu indeksdan
+Index("uq_bids_user_id_plate_id", Bid.user_id, Bid.plate_id, unique=True)
+# Plate bo'yicha eng yuqori taklif: WHERE plate_id = ? ORDER BY amount DESC
+Index("ix_bids_plate_id_amount", Bid.plate_id, Bid.amount.desc())
+# Foydalanuvchi takliflari ro'yxati: WHERE user_id = ? AND id > ? ORDER BY id
+Index("ix_bids_user_id_id", Bid.user_id, Bid.id)
 # from datetime import datetime
 #
 # from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
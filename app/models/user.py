@@ -10,5 +10,5 @@ class User(Base):
     hashed_password = Column(String)
     is_staff = Column(Boolean, default=False)
 
-    plates_created = relationship("AutoPlate", back_populates="created_by")
+    plates_created = relationship("AutoPlate", back_populates="created_by", foreign_keys="AutoPlate.created_by_id")
     bids = relationship("Bid", back_populates="user")
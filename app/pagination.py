@@ -0,0 +1,67 @@
+# app/pagination.py
+"""
+Keyset (cursor) pagination shared by the sync and async list routes.
+
+A page is `ORDER BY <key>, id LIMIT limit + 1` starting strictly after the
+(key, id) of the previous page's last row, so page N costs the same as page 1.
+The cursor is an opaque url-safe string holding the ordering name, the last
+sort key and the last id.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, literal, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+def encode_cursor(ordering: str, key, row_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([ordering, key, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, ordering: str):
+    """(key, id) stored in `cursor`; 400 if it is malformed or belongs to another ordering."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_ordering, key, row_id = json.loads(raw)
+        if cursor_ordering != ordering or not isinstance(row_id, int):
+            raise ValueError(cursor)
+        return key, row_id
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset(statement, sort_column, id_column, descending: bool, after=None):
+    """Order `statement` by (sort_column, id_column) and start after the (key, id) in `after`."""
+    if after is not None:
+        key, row_id = after
+        if isinstance(sort_column.type, DateTime) and key is not None:
+            try:
+                key = datetime.fromisoformat(key)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Qiymat ustun turi bilan bog'lanadi, aks holda SQLite da sana satr sifatida noto'g'ri solishtiriladi
+        if sort_column is id_column:
+            row, bound = id_column, literal(row_id, id_column.type)
+        else:
+            row = tuple_(sort_column, id_column)
+            bound = tuple_(literal(key, sort_column.type), literal(row_id, id_column.type))
+        statement = statement.where(row < bound if descending else row > bound)
+    if sort_column is id_column:
+        return statement.order_by(id_column.desc() if descending else id_column)
+    if descending:
+        return statement.order_by(sort_column.desc(), id_column.desc())
+    return statement.order_by(sort_column, id_column)
+
+def page(rows: list, limit: int, ordering: str, sort_attr: str) -> dict:
+    """Split the `limit + 1` fetched rows into items and the cursor for the next page."""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(ordering, getattr(last, sort_attr), last.id)
+    return {"items": items, "next_cursor": next_cursor}
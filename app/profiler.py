@@ -0,0 +1,225 @@
+# app/profiler.py
+"""
+Opt-in per-request SQL profiler (Settings.SQL_PROFILER_ENABLED).
+
+`ProfilerMiddleware` gives every HTTP request a `RequestProfile` through a
+context variable; the engine events installed by `install` append each
+statement run on behalf of that request, with its time and a fingerprint
+(literals, bound parameters and IN lists collapsed, whitespace normalized).
+When the request ends the profile flags
+
+    repeated   a fingerprint run SQL_PROFILER_REPEAT_THRESHOLD times or more,
+               the usual shape of an N+1 loop
+    slow       statements slower than SQL_PROFILER_SLOW_MS
+
+and is reported as an `X-SQL-Profile` response header
+(`queries=4; time_ms=1.9; repeated=0; slow=0`) and/or one JSON line per
+request in the rotating log at SQL_PROFILER_LOG_PATH. Flagged requests are
+also logged as warnings.
+
+`assert_max_queries` is the test helper: it counts the statements run on the
+app's engines while the block runs, from any thread, and fails with the
+statement list when there are more than allowed:
+
+    with assert_max_queries(3):
+        client.put(f"/bids/bids/{bid_id}", json=..., headers=...)
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+profile_logger = logging.getLogger("app.sql_profile")
+_log_handler: Optional[RotatingFileHandler] = None
+
+HEADER = "x-sql-profile"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """The statement with its literals replaced by `?`, so repeats of one query compare equal."""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(?...)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+@dataclass
+class Statement:
+    sql: str
+    seconds: float
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.sql)
+
+
+@dataclass
+class RequestProfile:
+    method: str = ""
+    path: str = ""
+    statements: List[Statement] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def repeated(self, threshold: int) -> dict:
+        counts = Counter(statement.fingerprint for statement in self.statements)
+        return {sql: count for sql, count in counts.most_common() if count >= threshold}
+
+    def slow(self, threshold_ms: float) -> List[Statement]:
+        return [statement for statement in self.statements if statement.seconds * 1000 >= threshold_ms]
+
+    def report(self, repeat_threshold: int, slow_ms: float) -> dict:
+        return {
+            "method": self.method, "path": self.path, "queries": len(self.statements),
+            "time_ms": round(self.seconds * 1000, 3),
+            "repeated": self.repeated(repeat_threshold),
+            "slow": [{"sql": statement.fingerprint, "ms": round(statement.seconds * 1000, 3)}
+                     for statement in self.slow(slow_ms)],
+            "statements": [{"sql": statement.fingerprint, "ms": round(statement.seconds * 1000, 3)}
+                           for statement in self.statements],
+        }
+
+
+# Joriy so'rov profili; middleware tashqarisida None
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+# assert_max_queries bloklari: har qanday oqimdagi so'rovlarni yig'adi
+_captures: List[List[Statement]] = []
+_captures_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiler_started", []).append((context, time.perf_counter()))
+
+
+def _handle_error(exception_context):
+    metrics.pop_started(exception_context, "profiler_started")
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = Statement(statement, time.perf_counter() - conn.info["profiler_started"].pop()[1])
+    profile = _profile.get()
+    if profile is not None:
+        profile.statements.append(record)
+    for capture in list(_captures):
+        capture.append(record)
+
+
+def install(engine: Engine):
+    """Record the statements of `engine` (the sync engine of an async one). Idempotent."""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def uninstall(engine: Engine):
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+        event.remove(engine, "handle_error", _handle_error)
+
+
+def configure_log(path: str, max_bytes: int, backups: int):
+    """Send profiles to a rotating file; a second call replaces the handler of the first."""
+    global _log_handler
+    if _log_handler is not None:
+        profile_logger.removeHandler(_log_handler)
+        _log_handler.close()
+    _log_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    _log_handler.setFormatter(logging.Formatter("%(message)s"))
+    profile_logger.addHandler(_log_handler)
+    profile_logger.setLevel(logging.INFO)
+    profile_logger.propagate = False
+
+
+def _default_engines() -> List[Engine]:
+    from app import database
+
+    engines = [database.engine, database.async_engine.sync_engine,
+               database.read_engine, database.async_read_engine.sync_engine]
+    # Replika sozlanmagan bo'lsa o'qish engine lari yozish engine larining o'zi
+    return list(dict.fromkeys(engines))
+
+
+@contextmanager
+def assert_max_queries(limit: int, engines: Optional[Iterable[Engine]] = None):
+    """Fail if more than `limit` statements run on `engines` (default: the app's) inside the block."""
+    engines = list(engines) if engines is not None else _default_engines()
+    added = [engine for engine in engines if not event.contains(engine, "after_cursor_execute", _after_cursor_execute)]
+    for engine in added:
+        install(engine)
+    captured: List[Statement] = []
+    with _captures_lock:
+        _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with _captures_lock:
+            _captures.remove(captured)
+        for engine in added:
+            uninstall(engine)
+    if len(captured) > limit:
+        listing = "\n".join(f"  {i}. {statement.fingerprint}" for i, statement in enumerate(captured, 1))
+        raise AssertionError(f"expected at most {limit} queries, got {len(captured)}:\n{listing}")
+
+
+class ProfilerMiddleware:
+    def __init__(self, app, repeat_threshold: int = 3, slow_ms: float = 50.0, header: bool = True):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.slow_ms = slow_ms
+        self.header = header
+
+    def _summary(self, profile: RequestProfile) -> str:
+        return (f"queries={len(profile.statements)}; time_ms={profile.seconds * 1000:.1f}; "
+                f"repeated={len(profile.repeated(self.repeat_threshold))}; "
+                f"slow={len(profile.slow(self.slow_ms))}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            # Oddiy javoblarda barcha so'rovlar shu paytgacha bajarilgan bo'ladi
+            if message["type"] == "http.response.start" and self.header:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (HEADER.encode(), self._summary(profile).encode())]
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+            self._finish(profile)
+
+    def _finish(self, profile: RequestProfile):
+        report = profile.report(self.repeat_threshold, self.slow_ms)
+        if report["repeated"] or report["slow"]:
+            logger.warning("%s %s: %d queries in %.1f ms, repeated %s, slow %s", profile.method, profile.path,
+                           report["queries"], report["time_ms"], report["repeated"],
+                           [statement["sql"] for statement in report["slow"]])
+        if profile_logger.handlers:
+            profile_logger.info(json.dumps(report))
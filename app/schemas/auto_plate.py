@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class AutoPlateBase(BaseModel):
     plate_number: str
@@ -14,9 +14,23 @@ class AutoPlate(AutoPlateBase):
     id: int
     created_by_id: int
     is_active: bool
+    highest_bid: Optional[float] = None
+    bid_count: int = 0
+    leader_user_id: Optional[int] = None
+    winning_bid_id: Optional[int] = None
+    closed_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
+
+class AutoPlatePage(BaseModel):
+    items: List[AutoPlate]
+    next_cursor: Optional[str] = None
+
+class AutoPlateSearchPage(BaseModel):
+    items: List[AutoPlate]
+    total: int
+    next_offset: Optional[int] = None
 # from pydantic import BaseModel
 # from datetime import datetime
 # from typing import Optional, List
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 class BidBase(BaseModel):
     amount: float
@@ -14,4 +15,8 @@ class Bid(BidBase):
     user_id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class BidPage(BaseModel):
+    items: List[Bid]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,161 @@
+# app/services/auction_scheduler.py
+"""
+Closes auctions when their deadline passes.
+
+A single thread sleeps on a min-heap of (deadline, plate_id) and wakes exactly
+when the earliest deadline is due. Closing a plate takes its order book lock,
+so no bid can commit in between, then sets `is_active = False`, records the
+winning bid (highest amount, earliest on ties, as OrderBook._elect) and
+`closed_at`, and publishes `auction.closed` on the bid hub.
+
+Plate create and update call `schedule`, delete calls `cancel`. Rescheduling
+does not search the heap: the newest deadline per plate is kept in a dict and
+stale heap entries are skipped when they surface. On startup the heap is
+rebuilt from one query over the active plates; plates whose deadline passed
+while the app was down are closed straight away.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import response_cache
+from app.services.bid_hub import bid_hub
+from app.services.order_book import order_book
+from app.services.plate_search import plate_index
+from app.services.plate_stats import refresh_plate_stats
+
+logger = logging.getLogger(__name__)
+
+AUCTION_CLOSED = "auction.closed"
+RETRY_SECONDS = 5
+
+
+def close_auction(db: Session, plate_id: int, now: Optional[datetime] = None) -> Optional[dict]:
+    """Close `plate_id` if it is active and due; returns the published result or None."""
+    now = now or datetime.utcnow()
+    book = order_book.get(db, plate_id)
+    if book is None:
+        return None
+    with book.lock:
+        plate = db.get(models.AutoPlate, plate_id)
+        # Muddat surilgan yoki raqam allaqachon yopilgan bo'lishi mumkin
+        if plate is None or not plate.is_active or plate.deadline > now:
+            return None
+        winner = db.query(models.Bid.id, models.Bid.user_id, models.Bid.amount) \
+            .filter(models.Bid.plate_id == plate_id) \
+            .order_by(models.Bid.amount.desc(), models.Bid.id).first()
+        plate.is_active = False
+        plate.closed_at = now
+        plate.winning_bid_id = winner.id if winner else None
+        refresh_plate_stats(db, plate_id)
+        db.commit()
+        book.is_active = False
+        plate_index.remove(plate_id)
+        response_cache.invalidate_plate(plate_id, listing=True)
+        result = {"plate_id": plate_id, "closed_at": now.isoformat(),
+                  "winning_bid_id": winner.id if winner else None,
+                  "winner_user_id": winner.user_id if winner else None,
+                  "amount": winner.amount if winner else None}
+        bid_hub.publish(plate_id, AUCTION_CLOSED, result)
+    logger.info("Auction for plate %d closed, winning bid %s", plate_id, result["winning_bid_id"])
+    return result
+
+
+class AuctionScheduler:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._thread = None
+        self._stopping = False
+        self._session_factory = None
+        self.closed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory):
+        if self.running:
+            return
+        self._session_factory = session_factory
+        db = session_factory()
+        try:
+            rows = db.query(models.AutoPlate.id, models.AutoPlate.deadline) \
+                .filter(models.AutoPlate.is_active == True).all()
+        finally:
+            db.close()
+        with self._cond:
+            self._deadlines = {row.id: row.deadline for row in rows if row.deadline is not None}
+            self._heap = [(deadline, plate_id) for plate_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="auction-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Auction scheduler started with %d open plates", len(self._deadlines))
+
+    def stop(self, timeout: float = 5.0):
+        if not self.running:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def schedule(self, plate_id: int, deadline: datetime):
+        with self._cond:
+            self._deadlines[plate_id] = deadline
+            heapq.heappush(self._heap, (deadline, plate_id))
+            # Yangi muddat eng yaqini bo'lsa, oqim uyg'onib kutish vaqtini qayta hisoblaydi
+            if self._heap[0] == (deadline, plate_id):
+                self._cond.notify()
+
+    def cancel(self, plate_id: int):
+        with self._cond:
+            self._deadlines.pop(plate_id, None)
+
+    def stats(self) -> dict:
+        return {"scheduled": len(self._deadlines), "heap": len(self._heap), "closed": self.closed}
+
+    def _next_due(self) -> Optional[int]:
+        """Wait for the earliest live deadline; returns its plate, or None when stopping."""
+        with self._cond:
+            while not self._stopping:
+                while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, plate_id = self._heap[0]
+                delay = (deadline - datetime.utcnow()).total_seconds()
+                if delay <= 0:
+                    heapq.heappop(self._heap)
+                    del self._deadlines[plate_id]
+                    return plate_id
+                self._cond.wait(delay)
+            return None
+
+    def _run(self):
+        while True:
+            plate_id = self._next_due()
+            if plate_id is None:
+                return
+            db = self._session_factory()
+            try:
+                if close_auction(db, plate_id) is not None:
+                    self.closed += 1
+            except Exception:
+                db.rollback()
+                logger.exception("Closing auction for plate %d failed, retrying in %ds", plate_id, RETRY_SECONDS)
+                self.schedule(plate_id, datetime.utcnow() + timedelta(seconds=RETRY_SECONDS))
+            finally:
+                db.close()
+
+
+auction_scheduler = AuctionScheduler()
@@ -0,0 +1,93 @@
+# app/services/bid_export.py
+"""
+Streaming export of bid history joined with plate and user data.
+
+Rows are read in keyset batches of `EXPORT_BATCH_SIZE` ordered by bid id,
+each batch in its own short session, so an export of any size holds one batch
+in memory and never keeps a read transaction (or SQLite's read lock) open
+between batches. Only plain column tuples are fetched, no ORM objects, and
+every batch is rendered to one chunk of CSV or NDJSON text.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import case, select
+
+from app import models
+
+COLUMNS = ("bid_id", "amount", "created_at", "plate_id", "plate_number", "deadline",
+           "plate_active", "closed_at", "is_winning", "user_id", "username")
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    plate_id: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    closed: Optional[bool] = None
+
+
+def _statement(filters: ExportFilter, after_id: int, limit: int):
+    bid, plate, user = models.Bid, models.AutoPlate, models.User
+    statement = (
+        select(bid.id, bid.amount, bid.created_at, plate.id, plate.plate_number, plate.deadline,
+               plate.is_active, plate.closed_at, case((plate.winning_bid_id == bid.id, True), else_=False),
+               user.id, user.username)
+        .join(plate, plate.id == bid.plate_id)
+        .join(user, user.id == bid.user_id)
+        .where(bid.id > after_id)
+    )
+    if filters.plate_id is not None:
+        statement = statement.where(bid.plate_id == filters.plate_id)
+    if filters.since is not None:
+        statement = statement.where(bid.created_at >= filters.since)
+    if filters.until is not None:
+        statement = statement.where(bid.created_at < filters.until)
+    if filters.closed is not None:
+        statement = statement.where(plate.is_active == (not filters.closed))
+    return statement.order_by(bid.id).limit(limit)
+
+
+def iter_batches(session_factory, filters: ExportFilter, batch_size: int) -> Iterator[list]:
+    """Yield lists of up to `batch_size` row tuples in bid id order."""
+    after_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(_statement(filters, after_id, batch_size)).all()
+        finally:
+            db.close()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1][0]
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(batches: Iterator[list]) -> Iterator[str]:
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(COLUMNS, map(_value, row))), separators=(",", ":")) + "\n" for row in rows)
+
+
+def csv_chunks(batches: Iterator[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
@@ -0,0 +1,144 @@
+# app/services/bid_hub.py
+"""
+In-process pub/sub hub that pushes committed bid changes to stream clients.
+
+The bid routes and the group-commit writer call `publish_bid` after the
+commit, while they still hold the plate's lock, so every subscriber sees a
+plate's events in commit order. Each event is rendered once as a Server-Sent
+Events frame and handed to the subscribers' event loops with
+`call_soon_threadsafe`, so publishing never blocks the writer.
+
+Every subscriber has its own queue of `STREAM_QUEUE_SIZE` frames. A
+subscriber whose queue is full is dropped on the spot: its queue is replaced
+by a single "dropped" frame and it is removed from the hub. The client can
+reconnect and re-read the plate; one stuck client never holds up the others.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from app.services.order_book import BookEntry, PlateBook
+
+BID_PLACED = "bid.placed"
+BID_RAISED = "bid.raised"
+BID_WITHDRAWN = "bid.withdrawn"
+
+_DROPPED = "event: dropped\ndata: {\"reason\": \"slow consumer\"}\n\n"
+
+
+def sse_frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, hub: "BidHub", plate_ids: Iterable[int], queue_size: int):
+        self.hub = hub
+        self.plate_ids = frozenset(plate_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, frame: str):
+        """Runs on the subscriber's loop."""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Sekin mijoz: navbatini tashlab, faqat "dropped" xabarini qoldiramiz
+            self.dropped = True
+            self.hub.unsubscribe(self)
+            self.hub.dropped += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_DROPPED)
+
+    async def next_frame(self, timeout: float) -> Optional[str]:
+        """Next frame, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BidHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_plate: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.subscribers = 0
+        self.published = 0
+        self.fanout = 0
+        self.dropped = 0
+
+    def subscribe(self, plate_ids: Iterable[int], queue_size: int) -> Subscription:
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, plate_ids, queue_size)
+        with self._lock:
+            for plate_id in subscription.plate_ids:
+                self._by_plate[plate_id].add(subscription)
+            self.subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            removed = False
+            for plate_id in subscription.plate_ids:
+                subscribers = self._by_plate.get(plate_id)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._by_plate[plate_id]
+            if removed:
+                self.subscribers -= 1
+
+    def publish(self, plate_id: int, event: str, data: dict):
+        """Fan `data` out to every subscriber of `plate_id`; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._by_plate.get(plate_id, ()))
+            self.published += 1
+            self.fanout += len(subscribers)
+        if not subscribers:
+            return
+        frame = sse_frame(event, data)
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, group, frame)
+            except RuntimeError:
+                # Loop yopilgan - obunachilar baribir o'chib ketgan
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+    def publish_bid(self, event: str, book: PlateBook, entry: BookEntry):
+        """Publish a committed bid change together with the plate's new leader."""
+        self.publish(book.plate_id, event, bid_payload(book, entry))
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers, "published": self.published,
+                "fanout": self.fanout, "dropped": self.dropped}
+
+
+def bid_payload(book: PlateBook, entry: BookEntry) -> dict:
+    """Event body for `entry` with the leader and bid count the book has right now."""
+    leader = book.leader
+    return {
+        "plate_id": book.plate_id,
+        "bid": {"id": entry.id, "user_id": entry.user_id, "amount": entry.amount,
+                "created_at": entry.created_at.isoformat() if entry.created_at else None},
+        "highest_bid": leader.amount if leader else None,
+        "leader_user_id": leader.user_id if leader else None,
+        "bid_count": len(book.bids),
+    }
+
+
+def _deliver(subscriptions, frame: str):
+    for subscription in subscriptions:
+        subscription.offer(frame)
+
+
+bid_hub = BidHub()
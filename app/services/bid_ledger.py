@@ -0,0 +1,454 @@
+# app/services/bid_ledger.py
+"""
+Append-only binary ledger of bid events with snapshot-based recovery.
+
+Every committed bid change (placed, raised, withdrawn) is appended to a
+memory-mapped file as one fixed-size 64-byte record, right after the ORM
+commit and while the plate's order book lock is still held. A record carries
+a sequence number, the full bid (id, user, plate, amount, created_at), the
+time it was logged and a CRC32. Records are never rewritten. A torn record at
+the end (crash mid-write) fails its CRC and is treated as the end of the
+ledger.
+
+Every worker process maps the same file and appends to it. An append takes
+an exclusive flock on the file for the few microseconds it needs to read the
+last seq from the header, write the record and store the new seq. Records of
+all workers therefore share one sequence.
+
+One process owns the snapshots (an exclusive flock on `<path>.lock`). Its
+background thread wakes every BID_LEDGER_SNAPSHOT_EVERY own events, or once a
+second to look at the shared seq. It folds the new records into the per-plate
+state (live bids by user) and writes that state to `<path>.snap`, with the
+ledger offset it covers (temp file + rename).
+
+On startup `recover` loads the snapshot, replays only the ledger tail and
+hands the active plates to `OrderBook.warm` instead of scanning the `bids`
+table. The result is checked against `count(*)`, `max(id)` and the sum of the
+amounts in cents of `bids`. The sum catches raises that never reached the
+ledger (a crash between the commit and the append) and raises that two
+workers appended out of commit order. If anything disagrees, or there is no
+snapshot yet, the state is loaded from the table. The owner then writes a new
+snapshot at the current end of the ledger.
+
+The ledger is the audit trail from its first snapshot on:
+`python -m app.cli bid-ledger` prints the events and `--replay` folds them
+with `fold`, the same function recovery uses.
+
+The ledger is opt-in (BID_LEDGER_ENABLED). Its files live next to the SQLite
+database unless BID_LEDGER_PATH says otherwise. Locks use `fcntl.flock`;
+where there is no fcntl (Windows) the files are not locked, so run a single
+worker there.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.bid_hub import BID_PLACED, BID_RAISED, BID_WITHDRAWN
+from app.services.order_book import BookEntry
+
+logger = logging.getLogger(__name__)
+
+LEDGER_MAGIC = b"AUTOBIDL"
+SNAPSHOT_MAGIC = b"AUTOBIDS"
+VERSION = 1
+HEADER = struct.Struct("<8sI4xq40x")  # magic, versiya, oxirgi yozilgan seq
+# tur, seq, bid_id, user_id, plate_id, amount, created_at (us), yozilgan vaqt (us); keyin CRC32
+RECORD_BODY = struct.Struct("<B3xqqqqdqq")
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD_BODY.size + CRC.size
+SNAPSHOT_HEADER = struct.Struct("<8sIqqq")  # magic, versiya, ledger offseti, seq, bidlar soni
+SNAPSHOT_ENTRY = struct.Struct("<qqqdq")  # bid_id, user_id, plate_id, amount, created_at (us)
+SEQ = struct.Struct("<q")
+SEQ_OFFSET = 16
+GROW_BYTES = 4 * 1024 * 1024
+READ_BATCH = 4096
+SNAPSHOT_POLL_SECONDS = 1.0
+
+KINDS = {BID_PLACED: 1, BID_RAISED: 2, BID_WITHDRAWN: 3}
+EVENTS = {code: event for event, code in KINDS.items()}
+_EPOCH = datetime(1970, 1, 1)
+_NO_TIME = -(2 ** 63)
+
+# plate_id -> user_id -> (bid_id, amount, created_at us)
+State = Dict[int, Dict[int, Tuple[int, float, int]]]
+
+
+def _micros(value: Optional[datetime]) -> int:
+    return _NO_TIME if value is None else (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _datetime(micros: int) -> Optional[datetime]:
+    return None if micros == _NO_TIME else _EPOCH + timedelta(microseconds=micros)
+
+
+def ledger_path(config) -> Optional[str]:
+    """BID_LEDGER_PATH, or `<database>.ledger` next to the SQLite file of DATABASE_URL; None otherwise."""
+    if config.BID_LEDGER_PATH:
+        return config.BID_LEDGER_PATH
+    url = make_url(config.DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:") \
+            or url.database.startswith("file:"):
+        return None
+    return os.path.splitext(url.database)[0] + ".ledger"
+
+
+def _lock(handle, blocking: bool = True) -> bool:
+    """Exclusive flock on `handle`; False if `blocking` is off and another process holds it."""
+    try:
+        import fcntl
+    except ImportError:
+        # fcntl yo'q (Windows): qulf yo'q, bitta worker bilan ishlatiladi
+        return True
+    if blocking:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return True
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(handle):
+    try:
+        import fcntl
+    except ImportError:
+        return
+    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def fold(state: State, record: tuple):
+    """Apply one ledger record to `state`. Idempotent, so a replay may overlap the snapshot."""
+    kind, seq, bid_id, user_id, plate_id, amount, created_at, logged_at = record
+    bids = state.setdefault(plate_id, {})
+    if kind == KINDS[BID_WITHDRAWN]:
+        current = bids.get(user_id)
+        if current is not None and current[0] == bid_id:
+            del bids[user_id]
+    else:
+        bids[user_id] = (bid_id, amount, created_at)
+
+
+def entries(state: State, plate_ids=None) -> Iterator[BookEntry]:
+    for plate_id, bids in state.items():
+        if plate_ids is not None and plate_id not in plate_ids:
+            continue
+        for user_id, (bid_id, amount, created_at) in bids.items():
+            yield BookEntry(id=bid_id, user_id=user_id, plate_id=plate_id, amount=amount,
+                            created_at=_datetime(created_at))
+
+
+def event_dict(record: tuple) -> dict:
+    kind, seq, bid_id, user_id, plate_id, amount, created_at, logged_at = record
+    return {"seq": seq, "event": EVENTS[kind], "bid_id": bid_id, "user_id": user_id, "plate_id": plate_id,
+            "amount": amount, "created_at": _datetime(created_at), "logged_at": _datetime(logged_at)}
+
+
+def _cents(amount: float) -> int:
+    # SQL dagi CAST(amount * 100 + 0.5 AS INTEGER) bilan bir xil
+    return int(amount * 100 + 0.5)
+
+
+def _keyed(query):
+    # Foydalanuvchisi yoki plate i yo'q qatorlar kitobga ham, snapshotga ham tushmaydi
+    return query.filter(models.Bid.user_id.isnot(None), models.Bid.plate_id.isnot(None),
+                        models.Bid.amount.isnot(None))
+
+
+def _valid(data, offset: int) -> Optional[tuple]:
+    body = bytes(data[offset:offset + RECORD_BODY.size])
+    if len(body) < RECORD_BODY.size or body[0] not in EVENTS:
+        return None
+    if CRC.unpack_from(data, offset + RECORD_BODY.size)[0] != zlib.crc32(body):
+        return None
+    return RECORD_BODY.unpack(body)
+
+
+class BidLedger:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._owner_file = None
+        self._map: Optional[mmap.mmap] = None
+        self._end = HEADER.size
+        self.seq = 0
+        self.path: Optional[str] = None
+        self.snapshot_every = 0
+        self._since_snapshot = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # Oxirgi snapshotdagi holat; recover dan keyin faqat snapshot oqimi o'zgartiradi
+        self._state: State = {}
+        self._state_seq = 0
+        self.appended = 0
+        self.snapshots = 0
+        self.snapshot_ms = 0.0
+        self.recovered_from = None
+        self.recovery_ms = 0.0
+        self.replayed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._map is not None
+
+    @property
+    def owner(self) -> bool:
+        return self._owner_file is not None
+
+    @property
+    def snapshot_path(self) -> str:
+        return self.path + ".snap"
+
+    def open(self, path: str, snapshot_every: int = 10000, owner: bool = True) -> bool:
+        """Map the ledger file, creating it if needed; True if this process writes the snapshots."""
+        self.close()
+        handle = open(path, "a+b")
+        _lock(handle)
+        try:
+            if os.fstat(handle.fileno()).st_size == 0:
+                handle.write(HEADER.pack(LEDGER_MAGIC, VERSION, 0))
+                handle.truncate(GROW_BYTES)
+                handle.flush()
+            self._file = handle
+            self._map = mmap.mmap(handle.fileno(), 0)
+            magic, version, seq = HEADER.unpack_from(self._map, 0)
+            if magic != LEDGER_MAGIC or version != VERSION:
+                self.close()
+                raise ValueError(f"{path} is not a bid ledger (version {VERSION})")
+            # Yozuvi tugab, sarlavhasi yangilanmay qolgan seq lar (jarayon qulagan) qayta tiklanadi
+            while HEADER.size + (seq + 1) * RECORD_SIZE <= len(self._map):
+                record = _valid(self._map, HEADER.size + seq * RECORD_SIZE)
+                if record is None or record[1] != seq + 1:
+                    break
+                seq += 1
+            SEQ.pack_into(self._map, SEQ_OFFSET, seq)
+        finally:
+            _unlock(handle)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._end, self.seq = HEADER.size, 0
+        if owner:
+            owner_file = open(path + ".lock", "a+b")
+            if _lock(owner_file, blocking=False):
+                self._owner_file = owner_file
+            else:
+                owner_file.close()
+                logger.info("Bid ledger %s snapshots are written by another process", path)
+        return self.owner
+
+    def append(self, event: str, entry: BookEntry):
+        """Log a committed change of `entry`. Caller holds the plate's order book lock."""
+        if self._map is None:
+            return
+        with self._lock:
+            _lock(self._file)
+            try:
+                seq = SEQ.unpack_from(self._map, SEQ_OFFSET)[0] + 1
+                end = HEADER.size + seq * RECORD_SIZE
+                if end > len(self._map):
+                    self._remap(end)
+                body = RECORD_BODY.pack(KINDS[event], seq, entry.id, entry.user_id, entry.plate_id, entry.amount,
+                                        _micros(entry.created_at), _micros(datetime.utcnow()))
+                self._map[end - RECORD_SIZE:end] = body + CRC.pack(zlib.crc32(body))
+                SEQ.pack_into(self._map, SEQ_OFFSET, seq)
+            finally:
+                _unlock(self._file)
+            self._end, self.seq = end, seq
+            self.appended += 1
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self._since_snapshot = 0
+                self._wake.set()
+
+    def scan(self, start: int = HEADER.size, seq: int = 0, state: Optional[State] = None) -> int:
+        """Find the end of the ledger from `start` (record `seq` + 1), folding into `state`; returns the count."""
+        offset, scanned = start, 0
+        with self._lock:
+            self._remap(HEADER.size + SEQ.unpack_from(self._map, SEQ_OFFSET)[0] * RECORD_SIZE)
+        # Birinchi yaroqsiz yozuv - ledger oxiri
+        while offset + RECORD_SIZE <= len(self._map):
+            record = _valid(self._map, offset)
+            if record is None or record[1] != seq + 1:
+                break
+            if state is not None:
+                fold(state, record)
+            seq, offset, scanned = record[1], offset + RECORD_SIZE, scanned + 1
+        with self._lock:
+            self._end, self.seq = offset, seq
+        return scanned
+
+    def records(self, after_seq: int = 0, end: Optional[int] = None) -> Iterator[tuple]:
+        """Records with seq > `after_seq`; seq n is at a fixed offset, so no scan is needed."""
+        offset = HEADER.size + after_seq * RECORD_SIZE
+        while True:
+            with self._lock:
+                if self._map is None:
+                    return
+                stop = min(self._end if end is None else end, offset + READ_BATCH * RECORD_SIZE)
+                chunk = self._map[offset:stop]
+            if not chunk:
+                return
+            for start in range(0, len(chunk), RECORD_SIZE):
+                yield RECORD_BODY.unpack_from(chunk, start)
+            offset = stop
+
+    def recover(self, db: Session, active_plate_ids) -> List[BookEntry]:
+        """Bids of `active_plate_ids`, from the snapshot and the ledger tail, or from `bids` if they disagree."""
+        started = time.perf_counter()
+        snapshot = self._read_snapshot()
+        state, start, seq = snapshot if snapshot is not None else ({}, HEADER.size, 0)
+        replayed = self.scan(start, seq, state)
+        offset, seq = self._end, self.seq
+        table = _keyed(db.query(func.count(models.Bid.id), func.max(models.Bid.id),
+                                func.sum(cast(models.Bid.amount * 100 + 0.5, Integer)))).one()
+        table = (table[0], table[1], table[2] or 0)
+        live = [bid for bids in state.values() for bid in bids.values()]
+        ledger = (len(live), max((bid[0] for bid in live), default=None), sum(_cents(bid[1]) for bid in live))
+        if snapshot is None or ledger != table:
+            if snapshot is not None:
+                logger.warning("Bid ledger disagrees with the bids table (count/max id/cents %s vs %s); "
+                               "reloading from the table", ledger, table)
+            state = self._load_table(db)
+            self.recovered_from = "database"
+        else:
+            self.recovered_from = "snapshot"
+        self._state, self._state_seq = state, seq
+        if self.owner and (self.recovered_from == "database" or replayed):
+            self._write_snapshot(state, offset, seq)
+        self.replayed = replayed
+        self.recovery_ms = (time.perf_counter() - started) * 1000
+        logger.info("Bid ledger recovered from %s: %d events replayed in %.1f ms",
+                    self.recovered_from, replayed, self.recovery_ms)
+        return list(entries(state, set(active_plate_ids)))
+
+    def start(self):
+        if not self.owner or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="bid-ledger-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Write a final snapshot, stop the snapshot thread and unmap the file."""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._owner_file is not None:
+                self._owner_file.close()  # flock ham bo'shaydi
+                self._owner_file = None
+
+    def snapshot(self):
+        """Fold the records since the last snapshot and write a new one."""
+        started = time.perf_counter()
+        with self._lock:
+            seq = SEQ.unpack_from(self._map, SEQ_OFFSET)[0]
+            end = HEADER.size + seq * RECORD_SIZE
+            self._remap(end)
+            if seq == self._state_seq:
+                return
+            self._map.flush()
+        for record in self.records(self._state_seq, end):
+            fold(self._state, record)
+        self._state_seq = seq
+        self._write_snapshot(self._state, end, seq)
+        self.snapshot_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        return {"enabled": int(self.enabled), "seq": self.seq, "appended": self.appended,
+                "size_bytes": self._end, "snapshots": self.snapshots, "snapshot_ms": self.snapshot_ms,
+                "snapshot_lag": self.seq - self._state_seq, "recovery_ms": self.recovery_ms,
+                "recovery_replayed": self.replayed}
+
+    def _run(self):
+        while True:
+            self._wake.wait(SNAPSHOT_POLL_SECONDS)
+            self._wake.clear()
+            try:
+                # Boshqa workerlar yozgan hodisalar ham hisobga olinadi
+                lag = SEQ.unpack_from(self._map, SEQ_OFFSET)[0] - self._state_seq
+                if self._stopping or (self.snapshot_every and lag >= self.snapshot_every):
+                    self.snapshot()
+            except Exception:
+                logger.error("Bid ledger snapshot failed", exc_info=True)
+            if self._stopping:
+                return
+
+    def _remap(self, needed: int):
+        """Map at least `needed` bytes; another worker may have grown the file already. Caller holds `_lock`."""
+        if needed <= len(self._map):
+            return
+        size = os.fstat(self._file.fileno()).st_size
+        if size < needed:
+            size = needed + GROW_BYTES
+            self._file.truncate(size)
+        self._map.flush()
+        self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _read_snapshot(self) -> Optional[Tuple[State, int, int]]:
+        try:
+            with open(self.snapshot_path, "rb") as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < SNAPSHOT_HEADER.size + CRC.size \
+                or CRC.unpack_from(data, len(data) - CRC.size)[0] != zlib.crc32(memoryview(data)[:-CRC.size]):
+            logger.warning("Bid ledger snapshot %s is damaged; ignoring it", self.snapshot_path)
+            return None
+        magic, version, offset, seq, count = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != VERSION or offset != HEADER.size + seq * RECORD_SIZE \
+                or seq > SEQ.unpack_from(self._map, SEQ_OFFSET)[0]:
+            return None
+        state: State = {}
+        for bid_id, user_id, plate_id, amount, created_at in SNAPSHOT_ENTRY.iter_unpack(
+                memoryview(data)[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + count * SNAPSHOT_ENTRY.size]):
+            state.setdefault(plate_id, {})[user_id] = (bid_id, amount, created_at)
+        return state, offset, seq
+
+    def _write_snapshot(self, state: State, offset: int, seq: int):
+        rows = [SNAPSHOT_ENTRY.pack(bid_id, user_id, plate_id, amount, created_at)
+                for plate_id, bids in state.items() for user_id, (bid_id, amount, created_at) in bids.items()]
+        data = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, VERSION, offset, seq, len(rows)) + b"".join(rows)
+        temp = self.snapshot_path + ".tmp"
+        with open(temp, "wb") as handle:
+            handle.write(data + CRC.pack(zlib.crc32(data)))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp, self.snapshot_path)
+        self.snapshots += 1
+
+    @staticmethod
+    def _load_table(db: Session) -> State:
+        state: State = {}
+        for row in _keyed(db.query(models.Bid.id, models.Bid.user_id, models.Bid.plate_id,
+                                   models.Bid.amount, models.Bid.created_at)):
+            state.setdefault(row.plate_id, {})[row.user_id] = (row.id, row.amount, _micros(row.created_at))
+        return state
+
+
+bid_ledger = BidLedger()
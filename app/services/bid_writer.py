@@ -0,0 +1,251 @@
+# app/services/bid_writer.py
+"""
+Group-commit ingestion for new bids.
+
+When `Settings.BID_GROUP_COMMIT` is on, `create_bid` hands the bid to an
+in-process queue instead of committing it itself. A single writer thread
+drains the queue, validates each bid against the order book, and commits up to
+`BID_BATCH_SIZE` bids (or whatever arrived within `BID_BATCH_LINGER_MS`) in one
+transaction. Every request waits on its own future and gets either the stored
+bid or the same HTTPException the synchronous path would raise. Once `stop`
+has been called, `submit` answers 503 instead of queueing.
+
+A request waits at most `BID_WRITER_WAIT_SECONDS` (`result`, `result_async`)
+and then gets 503; its bid may still be committed afterwards. If the writer
+thread dies, or `stop` times out, every request still queued gets 503 too, so
+no request waits on a future nobody will resolve.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import response_cache
+from app.services.bid_hub import BID_PLACED, bid_hub, bid_payload
+from app.services.bid_ledger import bid_ledger
+from app.services.order_book import BookEntry, OrderBook, PlateBook, order_book
+from app.services.plate_stats import refresh_plate_stats
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def stage_bid(db: Session, book: PlateBook, user_id: int, amount: float) -> BookEntry:
+    """Validate a new bid and flush it. Caller holds `book.lock` and commits."""
+    book.check_new_bid(user_id, amount)
+    order_book.confirm(db, book, user_id, amount)
+    db_bid = models.Bid(amount=amount, user_id=user_id, plate_id=book.plate_id)
+    db.add(db_bid)
+    db.flush()
+    return BookEntry(id=db_bid.id, user_id=user_id, plate_id=book.plate_id,
+                     amount=amount, created_at=db_bid.created_at)
+
+
+def _unavailable(detail: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+
+@dataclass
+class BidRequest:
+    user_id: int
+    plate_id: int
+    amount: float
+    future: Future = field(default_factory=Future)
+
+
+class BidWriter:
+    def __init__(self, book_index: OrderBook):
+        self._book = book_index
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._accepting = False
+        self._thread = None
+        self._session_factory = None
+        self.batch_size = 100
+        self.linger = 0.002
+        self.wait_seconds = 10.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory, batch_size: int, linger_ms: float, wait_seconds: float = 10.0):
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.linger = max(0.0, linger_ms) / 1000
+        self.wait_seconds = wait_seconds
+        self._thread = threading.Thread(target=self._run, name="bid-writer", daemon=True)
+        self._thread.start()
+        with self._lock:
+            self._accepting = True
+
+    def stop(self, timeout: float = 5.0):
+        """Commit whatever is still queued, then stop the writer thread."""
+        if not self.running:
+            return
+        # Qabul qilingan har bir so'rov _STOP dan oldin navbatda bo'ladi
+        with self._lock:
+            self._accepting = False
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Bid writer did not stop within %.1f s, failing the queued bids", timeout)
+            self._fail_queued("Bid writer is stopping, try again shortly")
+            # Oqim joriy partiyani tugatib chiqib ketishi uchun
+            self._queue.put(_STOP)
+        self._thread = None
+
+    def submit(self, user_id: int, plate_id: int, amount: float) -> Future:
+        request = BidRequest(user_id=user_id, plate_id=plate_id, amount=amount)
+        with self._lock:
+            if not self._accepting:
+                    raise _unavailable("Bid writer is stopping, try again shortly")
+            self._queue.put(request)
+        return request.future
+
+    def result(self, future: Future) -> BookEntry:
+        try:
+            return future.result(timeout=self.wait_seconds)
+        except FutureTimeoutError:
+            raise _unavailable("Bid writer is busy, try again shortly")
+
+    async def result_async(self, future: Future) -> BookEntry:
+        # shield: kutish tugasa ham yozuvchining future i bekor qilinmaydi
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.wait_seconds)
+        except asyncio.TimeoutError:
+            raise _unavailable("Bid writer is busy, try again shortly")
+
+    def _run(self):
+        batch = []
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.linger
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._flush(batch)
+                batch = []
+        except BaseException:
+            logger.error("Bid writer crashed, failing the pending bids", exc_info=True)
+            _fail(batch, "Bid writer failed, try again shortly")
+            self._fail_queued("Bid writer failed, try again shortly")
+
+    def _fail_queued(self, detail: str):
+        with self._lock:
+            self._accepting = False
+            pending = []
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        _fail([item for item in pending if item is not _STOP], detail)
+
+    def _flush(self, batch: List[BidRequest]):
+        db = None
+        try:
+            db = self._session_factory()
+            try:
+                outcomes = self._commit(db, batch)
+            except Exception:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+                # Bitta yomon yozuv butun guruhni buzmasligi uchun alohida qayta urinamiz
+                logger.warning("Bid batch of %d failed, retrying one by one", len(batch), exc_info=True)
+                outcomes = []
+                for request in batch:
+                    try:
+                        outcomes.extend(self._commit(db, [request]))
+                    except Exception as exc:
+                        db.rollback()
+                        outcomes.append((request, exc))
+        except Exception as exc:
+            outcomes = [(request, exc) for request in batch]
+        finally:
+            if db is not None:
+                db.close()
+        for request, result in outcomes:
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+
+    def _commit(self, db: Session, batch: List[BidRequest]):
+        books = {}
+        for request in batch:
+            if request.plate_id not in books:
+                books[request.plate_id] = self._book.get(db, request.plate_id)
+        # Qulflarni doim bir xil tartibda olamiz (plate_id bo'yicha)
+        locks = [books[plate_id].lock for plate_id in sorted(books) if books[plate_id] is not None]
+        for lock in locks:
+            lock.acquire()
+        try:
+            outcomes, placed = [], []
+            try:
+                for request in batch:
+                    book = books[request.plate_id]
+                    try:
+                        if book is None:
+                            raise HTTPException(status_code=400, detail="Bidding is closed")
+                        entry = stage_bid(db, book, request.user_id, request.amount)
+                    except HTTPException as exc:
+                        outcomes.append((request, exc))
+                        continue
+                    entry = self._book.place(book, entry)
+                    # Hodisa shu bid qo'yilgan paytdagi lider va bidlar sonini ko'rsatadi, partiya oxiridagini emas
+                    placed.append((book, entry, bid_payload(book, entry)))
+                    outcomes.append((request, entry))
+                touched = {book.plate_id for book, _, _ in placed}
+                for plate_id in touched:
+                    refresh_plate_stats(db, plate_id)
+                db.commit()
+            except Exception:
+                for book, entry, _ in reversed(placed):
+                    self._book.withdraw(book, entry)
+                raise
+            for plate_id in touched:
+                response_cache.invalidate_plate(plate_id)
+            for book, entry, payload in placed:
+                bid_ledger.append(BID_PLACED, entry)
+                bid_hub.publish(book.plate_id, BID_PLACED, payload)
+            return outcomes
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+def _fail(requests: List[BidRequest], detail: str):
+    for request in requests:
+        try:
+            request.future.set_exception(_unavailable(detail))
+        except InvalidStateError:
+            # Yozuvchi shu orada natijani qo'ygan
+            pass
+
+
+bid_writer = BidWriter(order_book)
@@ -0,0 +1,193 @@
+# app/services/idempotency.py
+"""
+`Idempotency-Key` support for create_bid, update_bid and create_plate.
+
+The first request with a given key runs the route. Its outcome, the
+serialized body or a 4xx HTTPException, is kept for
+`IDEMPOTENCY_TTL_SECONDS`. A retry with the same key gets that outcome back
+(with `Idempotent-Replayed: true`) without validating or writing anything. A
+duplicate that arrives while the first one is still running waits for it
+instead of running again, for at most `IDEMPOTENCY_WAIT_SECONDS`; after that
+it gets 409 with Retry-After and the first request carries on. Keys are
+scoped by user and route. Reusing a key with a different request body is a
+422.
+
+A 5xx or an unexpected error is not stored: the requests already waiting get
+the same error, and the key is released so a later retry runs the route again.
+At most `IDEMPOTENCY_MAX_KEYS` keys are kept; the oldest go first.
+
+The store is per process. A retry that lands on another worker runs the route
+again, and the database decides: a repeated create_bid fails on the one bid
+per user per plate rule, and a repeated update_bid sets the same amount.
+"""
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+from app.cache import serialize
+from app.config import settings
+
+KEY_MAX_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@dataclass(frozen=True)
+class Outcome:
+    status_code: int
+    body: Optional[bytes] = None
+    error: Optional[HTTPException] = None
+
+    def replay(self):
+        if self.error is not None:
+            raise HTTPException(self.error.status_code, self.error.detail, self.error.headers)
+        return Response(self.body, status_code=self.status_code, media_type="application/json",
+                        headers={REPLAYED_HEADER: "true"})
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    future: Future
+    expires: float
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True, wait_seconds: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        # Hammasi bir xil TTL bilan qo'shiladi, shuning uchun tartib muddat tartibi ham
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+        self.conflicts = 0
+        self.in_progress = 0
+
+    def claim(self, key: tuple, fingerprint: str) -> Tuple[Future, bool]:
+        """The future for `key`, and whether the caller must run the request and `settle` it."""
+        now = time.monotonic()
+        with self._lock:
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if oldest.expires > now:
+                    break
+                self._entries.popitem(last=False)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    self.conflicts += 1
+                    raise HTTPException(status_code=422,
+                                        detail="Idempotency-Key was already used with a different request")
+                if entry.future.done():
+                    self.replayed += 1
+                else:
+                    self.joined += 1
+                return entry.future, False
+            entry = self._entries[key] = _Entry(fingerprint, Future(), now + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.executed += 1
+            return entry.future, True
+
+    def settle(self, key: tuple, future: Future, outcome: Optional[Outcome] = None,
+               error: Optional[BaseException] = None):
+        """Store `outcome`, or fail the waiters with `error` and release the key."""
+        if outcome is not None:
+            future.set_result(outcome)
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.future is future:
+                del self._entries[key]
+        future.set_exception(error)
+
+    def busy(self) -> HTTPException:
+        """The 409 for a duplicate that waited `wait_seconds` and the first request is still running."""
+        with self._lock:
+            self.in_progress += 1
+        return HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                             headers={"Retry-After": str(max(1, math.ceil(self.wait_seconds)))})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._entries), "executed": self.executed, "replayed": self.replayed,
+                "joined": self.joined, "conflicts": self.conflicts, "in_progress": self.in_progress}
+
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_MAX_KEYS, settings.IDEMPOTENCY_TTL_SECONDS,
+                                     settings.IDEMPOTENCY_ENABLED, settings.IDEMPOTENCY_WAIT_SECONDS)
+
+
+def _outcome(error: BaseException) -> Optional[Outcome]:
+    if isinstance(error, HTTPException) and error.status_code < 500:
+        return Outcome(error.status_code, error=error)
+    return None
+
+
+def _claim(idempotency_key: Optional[str], user_id: int, route: str, request: str):
+    if idempotency_key is None or not idempotency_store.enabled:
+        return None, None, True
+    key = (user_id, route, idempotency_key)
+    fingerprint = hashlib.blake2b(request.encode(), digest_size=16).hexdigest()
+    future, owner = idempotency_store.claim(key, fingerprint)
+    return key, future, owner
+
+
+def run(idempotency_key: Optional[str], user_id: int, route: str, request: str, schema,
+        call: Callable[[], Any], status_code: int = 200):
+    """Run `call` once per key; `request` identifies the payload, `schema` renders the result."""
+    key, future, owner = _claim(idempotency_key, user_id, route, request)
+    if not owner:
+        try:
+            outcome = future.result(timeout=idempotency_store.wait_seconds)
+        except FutureTimeoutError:
+            raise idempotency_store.busy()
+        return outcome.replay()
+    if key is None:
+        return call()
+    try:
+        result = call()
+        body = serialize(schema, result)
+    except BaseException as exc:
+        idempotency_store.settle(key, future, _outcome(exc), exc)
+        raise
+    idempotency_store.settle(key, future, Outcome(status_code, body))
+    return result
+
+
+async def run_async(idempotency_key: Optional[str], user_id: int, route: str, request: str, schema,
+                    call: Callable[[], Awaitable[Any]], status_code: int = 200):
+    """`run` for the async routes; `call` returns a coroutine."""
+    key, future, owner = _claim(idempotency_key, user_id, route, request)
+    if not owner:
+        # shield: kutish bekor qilinsa ham birinchi so'rovning future i bekor bo'lmaydi
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                             idempotency_store.wait_seconds)
+        except asyncio.TimeoutError:
+            raise idempotency_store.busy()
+        return outcome.replay()
+    if key is None:
+        return await call()
+    try:
+        result = await call()
+        body = serialize(schema, result)
+    except BaseException as exc:
+        idempotency_store.settle(key, future, _outcome(exc), exc)
+        raise
+    idempotency_store.settle(key, future, Outcome(status_code, body))
+    return result
@@ -0,0 +1,242 @@
+# app/services/order_book.py
+"""
+In-memory order book for every active plate.
+
+Keeps the current leader, its amount and the set of bidders per plate so that
+bid validation does not need to query the database. The book is warmed from
+the `bids` table at startup (or from the bid ledger, app/services/bid_ledger.py)
+and updated by the bid routes after each commit.
+Writers for the same plate are serialized on `PlateBook.lock`, which makes
+"validate, write, apply" atomic per plate within one process.
+
+The book only sees the bids of its own process. With several workers the
+database has the final say: `confirm` runs in the write transaction and moves
+`auto_plates.highest_bid` only if the bid still beats it and the plate is still
+open. When it does not, another worker got there first, so the stale book is
+dropped (the next request reloads it) and the bid is rejected. A withdrawal
+in another worker can leave this book's leader too high until it is reloaded;
+such bids are rejected, never wrongly accepted.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+@dataclass(frozen=True)
+class BookEntry:
+    id: int
+    user_id: int
+    plate_id: int
+    amount: float
+    created_at: datetime
+
+
+@dataclass
+class PlateBook:
+    plate_id: int
+    deadline: datetime
+    is_active: bool
+    bids: Dict[int, BookEntry] = field(default_factory=dict)  # user_id -> entry
+    leader: Optional[BookEntry] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        return self.is_active and self.deadline > (now or datetime.utcnow())
+
+    def check_new_bid(self, user_id: int, amount: float):
+        if not self.is_open():
+            raise HTTPException(status_code=400, detail="Bidding is closed")
+        if user_id in self.bids:
+            raise HTTPException(status_code=400, detail="You already have a bid on this plate")
+        if amount <= 0:
+            raise HTTPException(status_code=400, detail="Bid amount must be positive")
+        if self.leader and amount <= self.leader.amount:
+            raise HTTPException(status_code=400, detail="Bid must exceed current highest bid")
+
+    def check_raise(self, entry: BookEntry, amount: float):
+        if not self.is_open():
+            raise HTTPException(status_code=403, detail="Bidding period has ended")
+        if amount <= 0:
+            raise HTTPException(status_code=400, detail="Bid amount must be positive")
+        if self.leader and amount <= self.leader.amount and entry.id != self.leader.id:
+            raise HTTPException(status_code=400, detail="Bid must exceed current highest bid")
+
+    def check_withdraw(self):
+        if not self.is_open():
+            raise HTTPException(status_code=403, detail="Bidding period has ended")
+
+    def _elect(self):
+        # Eng yuqori summa, teng bo'lsa eng birinchi qo'yilgan taklif
+        self.leader = max(self.bids.values(), key=lambda e: (e.amount, -e.id), default=None)
+
+
+class OrderBook:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plates: Dict[int, PlateBook] = {}
+        self._bid_plate: Dict[int, int] = {}  # bid_id -> plate_id
+
+    def clear(self):
+        with self._lock:
+            self._plates.clear()
+            self._bid_plate.clear()
+
+    def warm(self, db: Session, load_bids: Optional[Callable[[Session, set], Iterable[BookEntry]]] = None):
+        """Load every active plate and its bids in two queries, or the entries from `load_bids(db, plate_ids)`."""
+        plates = {
+            row.id: PlateBook(plate_id=row.id, deadline=row.deadline, is_active=bool(row.is_active))
+            for row in db.query(models.AutoPlate.id, models.AutoPlate.deadline, models.AutoPlate.is_active)
+            .filter(models.AutoPlate.is_active == True)
+        }
+        bid_plate = {}
+        if load_bids is not None:
+            entries = load_bids(db, set(plates))
+        else:
+            active_ids = db.query(models.AutoPlate.id).filter(models.AutoPlate.is_active == True)
+            entries = map(_entry, self._bid_rows(db).filter(models.Bid.plate_id.in_(active_ids.scalar_subquery())))
+        for entry in entries:
+            plates[entry.plate_id].bids[entry.user_id] = entry
+            bid_plate[entry.id] = entry.plate_id
+        for book in plates.values():
+            book._elect()
+        with self._lock:
+            self._plates = plates
+            self._bid_plate = bid_plate
+
+    def get(self, db: Session, plate_id: int) -> Optional[PlateBook]:
+        book = self._plates.get(plate_id)
+        if book is None:
+            book = self._load(db, plate_id)
+        return book
+
+    def find_bid(self, db: Session, bid_id: int, user_id: int) -> Tuple[Optional[PlateBook], Optional[BookEntry]]:
+        plate_id = self._bid_plate.get(bid_id)
+        if plate_id is None:
+            plate_id = db.query(models.Bid.plate_id).filter(models.Bid.id == bid_id).scalar()
+            if plate_id is None:
+                return None, None
+        book = self.get(db, plate_id)
+        if book is None:
+            return None, None
+        entry = book.bids.get(user_id)
+        if entry is None or entry.id != bid_id:
+            return book, None
+        return book, entry
+
+    def place(self, book: PlateBook, entry: BookEntry) -> BookEntry:
+        """Record a committed bid. Caller holds `book.lock`."""
+        previous = book.bids.get(entry.user_id)
+        book.bids[entry.user_id] = entry
+        self._bid_plate[entry.id] = book.plate_id
+        if book.leader is None or entry.amount > book.leader.amount:
+            book.leader = entry
+        elif previous is not None and book.leader.id == previous.id:
+            book._elect()
+        return entry
+
+    def raise_bid(self, book: PlateBook, entry: BookEntry, amount: float) -> BookEntry:
+        return self.place(book, replace(entry, amount=amount))
+
+    def withdraw(self, book: PlateBook, entry: BookEntry):
+        book.bids.pop(entry.user_id, None)
+        self._bid_plate.pop(entry.id, None)
+        if book.leader is not None and book.leader.id == entry.id:
+            book._elect()
+
+    def confirm(self, db: Session, book: PlateBook, user_id: int, amount: float, raising: bool = False):
+        """Check the bid against the plate row in the write transaction. Caller holds `book.lock`."""
+        plate = models.AutoPlate
+        now = datetime.utcnow()
+        beats = or_(plate.highest_bid.is_(None), plate.highest_bid < amount)
+        if raising:
+            # Yetakchi o'z taklifini o'zgartira oladi
+            beats = or_(beats, plate.leader_user_id == user_id)
+        # highest_bid darhol yoziladi: shu tranzaksiyadagi keyingi bidlar (bid_writer partiyasi) undan oshishi kerak
+        claimed = db.execute(
+            update(plate).where(plate.id == book.plate_id, plate.is_active == True, plate.deadline > now, beats)
+            .values(highest_bid=amount).execution_options(synchronize_session=False)).rowcount
+        if claimed:
+            return
+        # Boshqa worker yozgan yoki yopgan: kitob eskirgan, keyingi so'rov bazadan qayta yuklaydi
+        self.drop_plate(book.plate_id)
+        row = db.query(plate.is_active, plate.deadline).filter(plate.id == book.plate_id).first()
+        if row is None or not row.is_active or row.deadline <= now:
+            if raising:
+                raise HTTPException(status_code=403, detail="Bidding period has ended")
+            raise HTTPException(status_code=400, detail="Bidding is closed")
+        raise HTTPException(status_code=400, detail="Bid must exceed current highest bid")
+
+    def upsert_plate(self, plate: models.AutoPlate):
+        book = self._plates.get(plate.id)
+        if book is None:
+            with self._lock:
+                book = self._plates.setdefault(
+                    plate.id, PlateBook(plate_id=plate.id, deadline=plate.deadline, is_active=bool(plate.is_active)))
+        with book.lock:
+            book.deadline = plate.deadline
+            book.is_active = bool(plate.is_active)
+
+    def drop_plate(self, plate_id: int):
+        with self._lock:
+            book = self._plates.pop(plate_id, None)
+            if book is not None:
+                for entry in book.bids.values():
+                    self._bid_plate.pop(entry.id, None)
+
+    def _load(self, db: Session, plate_id: int) -> Optional[PlateBook]:
+        row = db.query(models.AutoPlate.id, models.AutoPlate.deadline, models.AutoPlate.is_active) \
+            .filter(models.AutoPlate.id == plate_id).first()
+        if row is None:
+            return None
+        book = PlateBook(plate_id=row.id, deadline=row.deadline, is_active=bool(row.is_active))
+        for bid_row in self._bid_rows(db).filter(models.Bid.plate_id == plate_id):
+            book.bids[bid_row.user_id] = _entry(bid_row)
+        book._elect()
+        with self._lock:
+            existing = self._plates.get(plate_id)
+            if existing is not None:
+                return existing
+            self._plates[plate_id] = book
+            for entry in book.bids.values():
+                self._bid_plate[entry.id] = plate_id
+        return book
+
+    @staticmethod
+    def _bid_rows(db: Session):
+        return db.query(models.Bid.id, models.Bid.user_id, models.Bid.plate_id,
+                        models.Bid.amount, models.Bid.created_at)
+
+
+@asynccontextmanager
+async def hold(lock: threading.Lock):
+    """`with book.lock:` for async routes; waits in a worker thread, not on the event loop."""
+    if not lock.acquire(blocking=False):
+        acquiring = asyncio.ensure_future(run_in_threadpool(lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # Oqim baribir qulfni oladi: so'rov bekor qilingan bo'lsa, olgan zahoti bo'shatiladi
+            acquiring.add_done_callback(lambda done: done.cancelled() or done.exception() or lock.release())
+            raise
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def _entry(row) -> BookEntry:
+    return BookEntry(id=row.id, user_id=row.user_id, plate_id=row.plate_id,
+                     amount=row.amount, created_at=row.created_at)
+
+
+order_book = OrderBook()
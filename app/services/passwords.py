@@ -0,0 +1,127 @@
+# app/services/passwords.py
+"""
+bcrypt hashing and verification off the request workers.
+
+bcrypt is deliberately slow and holds the CPU (and the GIL) for the whole
+call, so a burst of logins run inline starves every other route. `hasher`
+runs it in a small process pool instead. At most `PASSWORD_POOL_MAX_PENDING`
+calls may be running or queued at once; past that a login or register is
+refused with 503 and Retry-After. The auth routes await `hash_async` and
+`verify_async`, so a login waiting on the pool holds no threadpool thread
+that bids need.
+
+`start()` is called from the app's startup hook; until then, or with
+`PASSWORD_POOL_WORKERS=0`, hashing runs inline as before.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def _noop():
+    return None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.max_pending = 0
+        self.workers = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self, workers: int, max_pending: int):
+        if self._pool is not None or workers <= 0:
+            return
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        # Jarayonlar hozir ishga tushsin (fork), boshqa oqimlar paydo bo'lishidan oldin
+        self._pool.submit(_noop).result()
+        logger.info("Password pool started with %d workers, %d max pending", workers, self.max_pending)
+
+    def stop(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def submit(self, fn, *args) -> Future:
+        """Run `fn(*args)` in the pool; 503 when `max_pending` calls are already in flight."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Too many authentication requests, try again shortly",
+                                    headers={"Retry-After": "1"})
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._done(started)
+            raise
+        future.add_done_callback(lambda _: self._done(started))
+        return future
+
+    def hash(self, password: str) -> str:
+        if self._pool is None:
+            return _hash(password)
+        return self.submit(_hash, password).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        if self._pool is None:
+            return _verify(password, hashed_password)
+        return self.submit(_verify, password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        if self._pool is None:
+            return await run_in_threadpool(_hash, password)
+        return await asyncio.wrap_future(self.submit(_hash, password))
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        if self._pool is None:
+            return await run_in_threadpool(_verify, password, hashed_password)
+        return await asyncio.wrap_future(self.submit(_verify, password, hashed_password))
+
+    def stats(self) -> dict:
+        # pending - workers dan oshgani navbatda kutayotganlar
+        return {"workers": self.workers, "max_pending": self.max_pending, "pending": self.pending,
+                "queued": max(0, self.pending - self.workers), "peak_pending": self.peak_pending,
+                "completed": self.completed, "rejected": self.rejected,
+                "avg_ms": self.busy_seconds / self.completed * 1000 if self.completed else 0.0}
+
+    def _done(self, started: float):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.busy_seconds += time.perf_counter() - started
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,172 @@
+# app/services/plate_import.py
+"""
+Bulk plate import from a streamed CSV or NDJSON upload.
+
+The upload is read and split into lines as it arrives; each line is validated
+on its own (plate_number, description, deadline, the same rules as
+`POST /plates/`) and valid rows collect into a batch of `IMPORT_BATCH_SIZE`.
+A full batch costs one `plate_number IN (...)` lookup against the unique index
+and one multi-row INSERT in its own transaction. Only the current batch and
+the first `IMPORT_MAX_ERRORS` row errors are held in memory, so the footprint
+does not depend on the file size.
+
+CSV input needs a header line naming the columns. A quoted field cannot
+contain a newline, because every line is parsed on its own.
+"""
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.api.auto_plate import parse_deadline
+from app.cache import LISTING_TAG, response_cache
+from app.services.auction_scheduler import auction_scheduler
+from app.services.plate_search import plate_index
+
+PLATE_NUMBER_MAX_LENGTH = models.AutoPlate.plate_number.type.length
+MAX_LINE_BYTES = 64 * 1024
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 and yield it line by line without reading it whole."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise LineTooLong(f"line longer than {MAX_LINE_BYTES} bytes")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+class CsvRows:
+    """Turns CSV lines into dicts keyed by the header line."""
+
+    def __init__(self):
+        self.header: Optional[List[str]] = None
+
+    def parse(self, line: str) -> Optional[dict]:
+        values = next(csv.reader([line]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            raise ValueError(f"expected {len(self.header)} columns, got {len(values)}")
+        return dict(zip(self.header, values))
+
+
+def parse_ndjson(line: str) -> dict:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid JSON: {exc.msg}")
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    return record
+
+
+class PlateImporter:
+    def __init__(self, session_factory, created_by_id: int, batch_size: int, max_errors: int):
+        self._session_factory = session_factory
+        self.created_by_id = created_by_id
+        self.batch_size = max(1, batch_size)
+        self.max_errors = max_errors
+        self._batch: List[dict] = []
+        self._lines: Dict[str, int] = {}  # plate_number -> qator raqami, joriy partiya uchun
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, message: str, plate_number: Optional[str] = None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "plate_number": plate_number, "error": message})
+
+    def reject(self, line: int, message: str):
+        """A line that could not even be parsed into a record."""
+        self.received += 1
+        self.error(line, message)
+
+    def add(self, line: int, record: dict) -> bool:
+        """Validate one record; True when the batch is full and `flush` should run."""
+        self.received += 1
+        plate_number = record.get("plate_number")
+        if not isinstance(plate_number, str) or not plate_number.strip():
+            self.error(line, "plate_number is required")
+            return False
+        plate_number = plate_number.strip()
+        if len(plate_number) > PLATE_NUMBER_MAX_LENGTH:
+            self.error(line, f"plate_number longer than {PLATE_NUMBER_MAX_LENGTH} characters", plate_number)
+            return False
+        description = record.get("description") or ""
+        if not isinstance(description, str):
+            self.error(line, "description must be a string", plate_number)
+            return False
+        try:
+            deadline = parse_deadline(record.get("deadline"))
+        except (TypeError, ValueError, AttributeError):
+            self.error(line, "Invalid deadline format", plate_number)
+            return False
+        if deadline <= datetime.utcnow():
+            self.error(line, "Deadline must be in the future", plate_number)
+            return False
+        if plate_number in self._lines:
+            self.error(line, f"Plate number duplicates line {self._lines[plate_number]}", plate_number)
+            return False
+        self._lines[plate_number] = line
+        self._batch.append({"plate_number": plate_number, "description": description, "deadline": deadline,
+                            "created_by_id": self.created_by_id, "is_active": True})
+        return len(self._batch) >= self.batch_size
+
+    def flush(self):
+        """Insert the current batch in one transaction, skipping numbers that already exist."""
+        batch, lines = self._batch, self._lines
+        self._batch, self._lines = [], {}
+        if not batch:
+            return
+        db = self._session_factory()
+        try:
+            existing = set(db.scalars(select(models.AutoPlate.plate_number)
+                                      .where(models.AutoPlate.plate_number.in_(lines))))
+            for plate_number in sorted(existing, key=lines.get):
+                self.error(lines[plate_number], "Plate number already exists", plate_number)
+            rows = [row for row in batch if row["plate_number"] not in existing]
+            if not rows:
+                return
+            created = db.execute(insert(models.AutoPlate).returning(
+                models.AutoPlate.id, models.AutoPlate.plate_number, models.AutoPlate.deadline), rows).all()
+            db.commit()
+        except IntegrityError as exc:
+            # Parallel POST /plates/ bilan poyga: partiya butunlay rad etiladi, qatorlar hisobotda
+            db.rollback()
+            for row in rows:
+                self.error(lines[row["plate_number"]], f"Database error: {exc.orig}", row["plate_number"])
+            return
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.inserted += len(created)
+        response_cache.invalidate(LISTING_TAG)
+        for plate_id, plate_number, deadline in created:
+            plate_index.upsert(plate_id, plate_number)
+            auction_scheduler.schedule(plate_id, deadline)
+
+    def report(self) -> dict:
+        return {"received": self.received, "inserted": self.inserted, "failed": self.failed,
+                "errors": sorted(self.errors, key=lambda error: error["line"]), "errors_truncated": self.failed > len(self.errors)}
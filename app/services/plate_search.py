@@ -0,0 +1,140 @@
+# app/services/plate_search.py
+"""
+In-memory trigram index over the plate numbers of active plates.
+
+Every number is indexed as "^" + number + "$", so a two-character prefix
+still yields a trigram ("^01"). A query is a pattern over the plate number:
+
+    #   any digit
+    ?   any single character
+    *   any run of characters
+
+`mode=contains` (default) matches anywhere, `prefix` only at the start, and
+`exact` the whole number. The literal runs between wildcards supply
+trigrams. Their posting sets are intersected, smallest first, and the few
+surviving candidates are checked against a compiled regex. A pattern with no
+usable trigram (e.g. "7" or "#7#") falls back to scanning every indexed number.
+
+Results are ranked: exact match, then prefix match, then earlier match
+position, then shorter number, then alphabetical. The index is rebuilt at
+startup in one query, and plate writes keep it current.
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+MODES = ("contains", "prefix", "exact")
+# Harf, raqam va wildcardlar; kamida bitta "*" bo'lmagan belgi
+QUERY_PATTERN = r"^[0-9A-Za-z#?* ]*[0-9A-Za-z#?][0-9A-Za-z#?* ]*$"
+_WILDCARDS = {"#": r"\d", "?": ".", "*": ".*"}
+
+
+def normalize(plate_number: str) -> str:
+    return "".join(plate_number.split()).upper()
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def compile_pattern(pattern: str, mode: str) -> Tuple["re.Pattern", Set[str]]:
+    """Regex for `pattern` in `mode` and the trigrams every match must contain."""
+    parts, literals, literal = [], [], ""
+    for char in pattern:
+        if char in _WILDCARDS:
+            parts.append(_WILDCARDS[char])
+            literals.append(literal)
+            literal = ""
+        else:
+            parts.append(re.escape(char))
+            literal += char
+    literals.append(literal)
+    # Chegaradagi literal "^"/"$" bilan kengaytiriladi: qisqa prefiks ham trigramma beradi
+    if mode in ("prefix", "exact"):
+        literals[0] = "^" + literals[0]
+    if mode == "exact":
+        literals[-1] = literals[-1] + "$"
+    grams = set()
+    for run in literals:
+        grams |= trigrams(run)
+    body = "".join(parts)
+    regex = {"contains": body, "prefix": "^" + body, "exact": "^" + body + "$"}[mode]
+    return re.compile(regex), grams
+
+
+class PlateIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._numbers: Dict[int, str] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+
+    def rebuild(self, db: Session):
+        numbers = {
+            row.id: normalize(row.plate_number)
+            for row in db.query(models.AutoPlate.id, models.AutoPlate.plate_number)
+            .filter(models.AutoPlate.is_active == True)
+        }
+        grams = defaultdict(set)
+        for plate_id, number in numbers.items():
+            for gram in trigrams(f"^{number}$"):
+                grams[gram].add(plate_id)
+        with self._lock:
+            self._numbers, self._grams = numbers, grams
+
+    def upsert(self, plate_id: int, plate_number: str, is_active: bool = True):
+        if not is_active:
+            self.remove(plate_id)
+            return
+        number = normalize(plate_number)
+        with self._lock:
+            if self._numbers.get(plate_id) == number:
+                return
+            self._remove(plate_id)
+            self._numbers[plate_id] = number
+            for gram in trigrams(f"^{number}$"):
+                self._grams[gram].add(plate_id)
+
+    def remove(self, plate_id: int):
+        with self._lock:
+            self._remove(plate_id)
+
+    def search(self, pattern: str, mode: str = "contains") -> List[int]:
+        """Ids of the active plates matching `pattern`, best match first."""
+        regex, grams = compile_pattern(normalize(pattern), mode)
+        with self._lock:
+            if grams:
+                postings = sorted((self._grams.get(gram, ()) for gram in grams), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+                numbers = [(plate_id, self._numbers[plate_id]) for plate_id in candidates]
+            else:
+                numbers = list(self._numbers.items())
+        ranked = []
+        for plate_id, number in numbers:
+            match = regex.search(number)
+            if match is not None:
+                ranked.append(((match.group() != number, match.start() != 0, match.start(), len(number), number),
+                               plate_id))
+        ranked.sort()
+        return [plate_id for _, plate_id in ranked]
+
+    def stats(self) -> dict:
+        return {"plates": len(self._numbers), "trigrams": len(self._grams)}
+
+    def _remove(self, plate_id: int):
+        number = self._numbers.pop(plate_id, None)
+        if number is None:
+            return
+        for gram in trigrams(f"^{number}$"):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(plate_id)
+                if not postings:
+                    del self._grams[gram]
+
+
+plate_index = PlateIndex()
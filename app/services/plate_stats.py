@@ -0,0 +1,44 @@
+# app/services/plate_stats.py
+"""
+Keeps AutoPlate.highest_bid, bid_count and leader_user_id in step with `bids`.
+
+The bid routes run `plate_stats_update(plate_id)` in the same transaction as
+the bid insert, update or delete. The repair command recomputes every plate in
+one set-based statement:
+
+    python -m app.cli repair-plate-stats
+"""
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def plate_stats_update(plate_id: Optional[int] = None):
+    """UPDATE recomputing the denormalized columns for one plate, or for all plates."""
+    bids = models.Bid
+    plate = models.AutoPlate
+    per_plate = bids.plate_id == plate.id
+    statement = update(plate).values(
+        highest_bid=select(func.max(bids.amount)).where(per_plate).scalar_subquery(),
+        bid_count=select(func.count(bids.id)).where(per_plate).scalar_subquery(),
+        # Yetakchi: eng yuqori summa, teng bo'lsa eng birinchi taklif (OrderBook._elect bilan bir xil)
+        leader_user_id=select(bids.user_id).where(per_plate)
+        .order_by(bids.amount.desc(), bids.id).limit(1).scalar_subquery(),
+    )
+    if plate_id is not None:
+        statement = statement.where(plate.id == plate_id)
+    return statement.execution_options(synchronize_session=False)
+
+
+def refresh_plate_stats(db: Session, plate_id: int):
+    db.execute(plate_stats_update(plate_id))
+
+
+def repair_plate_stats(db: Session) -> int:
+    """Recompute the columns for every plate; returns the number of plates touched."""
+    updated = db.execute(plate_stats_update()).rowcount
+    db.commit()
+    return updated
@@ -0,0 +1,180 @@
+# app/services/principals.py
+"""
+Cache of authenticated principals for `get_current_user`.
+
+A verified bearer token maps to a `Principal` snapshot (id, username,
+is_staff), so repeat requests with the same token skip both the JWT decode and
+the `User` query. Entries live for at most `PRINCIPAL_CACHE_TTL_SECONDS` and
+never past the token's own `exp`; the least recently used token is evicted
+once `PRINCIPAL_CACHE_SIZE` is reached.
+
+Any ORM update or delete of a `User` drops that user's tokens. A lookup that
+raced such a change (the version moved while it was querying) is returned but
+not stored, the same rule app/cache.py uses for responses.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from sqlalchemy import event
+
+from app import config, models
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    is_staff: bool
+
+    @classmethod
+    def of(cls, user: models.User) -> "Principal":
+        return cls(id=user.id, username=user.username, is_staff=bool(user.is_staff))
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_token(token: str) -> dict:
+    """JWT payload with a `sub`; 401 if the token is invalid, expired or has no subject."""
+    try:
+        payload = jwt.decode(token, config.settings.SECRET_KEY, algorithms=[config.settings.ALGORITHM])
+    except JWTError:
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user = {}
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def version(self) -> int:
+        return self._version
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is not None and cached[1] > time.monotonic():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return cached[0]
+            if cached is not None:
+                self._remove(token)
+            self.misses += 1
+            return None
+
+    def peek(self, token: str) -> Optional[Principal]:
+        """Cached principal without touching the LRU order or the hit counters."""
+        cached = self._entries.get(token)
+        return cached[0] if cached is not None and cached[1] > time.monotonic() else None
+
+    def put(self, token: str, principal: Principal, payload: dict, since: int, elapsed: float):
+        """Remember `principal` for `token`; `elapsed` is what the uncached lookup cost."""
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += elapsed
+            if not self.enabled or self._version != since:
+                return
+            ttl = self.ttl_seconds
+            if "exp" in payload:
+                ttl = min(ttl, payload["exp"] - time.time())
+            if ttl <= 0:
+                return
+            self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._version += 1
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_load = self.load_seconds / self.loads if self.loads else 0.0
+        # Har bir hit o'rtacha bitta yuklash (JWT + User so'rovi) narxini tejaydi
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_load_ms": avg_load * 1000, "saved_seconds": self.hits * avg_load}
+
+    def _remove(self, token: str):
+        cached = self._entries.pop(token, None)
+        if cached is None:
+            return
+        tokens = self._tokens_by_user.get(cached[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[cached[0].id]
+
+
+def resolve(token: str, load_user: Callable[[str], Optional[models.User]]) -> Principal:
+    """Principal for `token`, from the cache or by decoding it and calling `load_user(username)`."""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    started = time.perf_counter()
+    since = principal_cache.version()
+    payload = decode_token(token)
+    user = load_user(payload["sub"])
+    if user is None:
+        raise credentials_exception()
+    principal = Principal.of(user)
+    principal_cache.put(token, principal, payload, since, time.perf_counter() - started)
+    return principal
+
+
+async def resolve_async(token: str, load_user: Callable[[str], Awaitable[Optional[models.User]]]) -> Principal:
+    """`resolve` for the async routes; `load_user` is a coroutine function."""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    started = time.perf_counter()
+    since = principal_cache.version()
+    payload = decode_token(token)
+    user = await load_user(payload["sub"])
+    if user is None:
+        raise credentials_exception()
+    principal = Principal.of(user)
+    principal_cache.put(token, principal, payload, since, time.perf_counter() - started)
+    return principal
+
+
+principal_cache = PrincipalCache(config.settings.PRINCIPAL_CACHE_SIZE, config.settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                                 config.settings.PRINCIPAL_CACHE_ENABLED)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
@@ -0,0 +1,110 @@
+# benchmarks/async_load.py
+"""
+Load comparison of the sync and async (Settings.ASYNC_MODE) route sets.
+
+    python -m benchmarks.async_load --clients 500 --requests 10
+
+For each mode a seeded SQLite database is created in a temporary directory
+and the app is started under uvicorn with that directory as the working
+directory. `--clients` concurrent clients then browse plates and list their
+own bids. Requires httpx.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from app import models
+from app.api.auth import create_access_token
+from benchmarks.common import (create_database, default_deadline, insert_rows, percentiles, plate_rows, user_rows,
+                               wait_ready)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(path: str, plates: int, users: int):
+    engine = create_database(path)
+    rng = random.Random(1)
+    # uq_bids_user_id_plate_id: bitta foydalanuvchi - bitta raqamga bitta taklif
+    pairs = {(rng.randint(1, users), rng.randint(1, plates)) for _ in range(plates * 5)}
+    with engine.begin() as connection:
+        insert_rows(connection, models.User, user_rows(users))
+        insert_rows(connection, models.AutoPlate, plate_rows(plates, default_deadline()))
+        insert_rows(connection, models.Bid, [
+            {"amount": float(i + 1), "user_id": user_id, "plate_id": plate_id, "created_at": datetime.utcnow()}
+            for i, (user_id, plate_id) in enumerate(sorted(pairs))])
+    engine.dispose()
+
+
+async def drive(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await wait_ready(client)
+        latencies, errors = [], 0
+
+        async def one_client(n: int):
+            nonlocal errors
+            rng = random.Random(n)
+            headers = {"Authorization": "Bearer " + create_access_token({"sub": f"user{n % args.users}"})}
+            for _ in range(args.requests):
+                roll = rng.random()
+                if roll < 0.4:
+                    url, req_headers = "/plates/plates/", None
+                elif roll < 0.7:
+                    url, req_headers = f"/plates/plates/{rng.randint(1, args.plates)}", None
+                else:
+                    url, req_headers = "/bids/bids/", headers
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url, headers=req_headers)
+                    errors += response.status_code >= 400
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_client(n) for n in range(args.clients)))
+        elapsed = time.perf_counter() - started
+    return {"requests": len(latencies), "errors": errors, "seconds": round(elapsed, 2),
+            "req_per_sec": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1), **percentiles(latencies, digits=1)}
+
+
+def run(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "Auto.db"), args.plates, args.users)
+        env = dict(os.environ, PYTHONPATH=ROOT, ASYNC_MODE=str(mode == "async"))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            result = asyncio.run(drive(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            server.terminate()
+            server.wait()
+    return {"mode": mode, "clients": args.clients, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--plates", type=int, default=200)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout, counted as an error")
+    args = parser.parse_args()
+    for mode in ("sync", "async"):
+        print(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
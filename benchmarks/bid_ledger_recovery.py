@@ -0,0 +1,103 @@
+# benchmarks/bid_ledger_recovery.py
+"""
+Order book warm-up from the bids table versus the ledger snapshot plus tail.
+
+    python -m benchmarks.bid_ledger_recovery --bids 10000 100000 1000000 --tail 1000
+
+For each size a temporary SQLite database gets that many bids (spread over
+`--plates` active plates), the ledger is seeded from it once, and `--tail`
+raises are appended after the snapshot, as if the process had stopped without
+a final one. The best of `--repeat` runs is printed for `OrderBook.warm` with
+its full `bids` query and for `warm` fed by `BidLedger.recover`. Both must
+give the same books.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services.bid_hub import BID_RAISED
+from app.services.bid_ledger import BidLedger
+from app.services.order_book import BookEntry, OrderBook
+from benchmarks.common import best, create_database, default_deadline, insert_rows, plate_rows, user_rows
+
+
+def seed(path: str, bids: int, plates: int):
+    engine = create_database(path)
+    deadline = default_deadline()
+    with engine.begin() as connection:
+        insert_rows(connection, models.User, user_rows(bids // plates + 1))
+        insert_rows(connection, models.AutoPlate, plate_rows(plates, deadline, digits=7))
+        insert_rows(connection, models.Bid, [
+            {"user_id": i // plates + 1, "plate_id": i % plates + 1, "amount": 100.0 + i,
+             "created_at": deadline - timedelta(seconds=i)} for i in range(bids)])
+    return engine
+
+
+def books(book: OrderBook) -> dict:
+    return {plate_id: sorted(plate.bids.values(), key=lambda entry: entry.id) for plate_id, plate in book._plates.items()}
+
+
+def measure(tmp: str, args, bids: int) -> dict:
+    engine = seed(os.path.join(tmp, "bench.db"), bids, args.plates)
+    db = sessionmaker(bind=engine)()
+    ledger = BidLedger()
+    ledger.open(os.path.join(tmp, "bids.ledger"), snapshot_every=0)
+    OrderBook().warm(db, ledger.recover)  # birinchi marta: jadvaldan snapshot yoziladi
+    for i in range(args.tail):
+        bid_id, amount = i + 1, 1e9 + i
+        db.execute(update(models.Bid).where(models.Bid.id == bid_id).values(amount=amount))
+        row = db.get(models.Bid, bid_id)
+        ledger.append(BID_RAISED, BookEntry(id=row.id, user_id=row.user_id, plate_id=row.plate_id,
+                                            amount=amount, created_at=row.created_at))
+    db.commit()
+    path = ledger.path
+    ledger.close()
+
+    table, recovered = [], []
+    for _ in range(args.repeat):
+        db.expunge_all()
+        book = OrderBook()
+        started = time.perf_counter()
+        book.warm(db)
+        table.append(time.perf_counter() - started)
+        expected = books(book)
+
+        # Snapshot yangilanmasin: har safar o'sha dum qayta o'ynaladi
+        os.replace(path + ".snap", path + ".snap.keep")
+        os.link(path + ".snap.keep", path + ".snap")
+        ledger = BidLedger()
+        ledger.open(path, snapshot_every=0)
+        book = OrderBook()
+        started = time.perf_counter()
+        book.warm(db, ledger.recover)
+        recovered.append(time.perf_counter() - started)
+        assert books(book) == expected, "ledger recovery differs from the table"
+        replayed, source = ledger.replayed, ledger.recovered_from
+        ledger.close()
+        os.replace(path + ".snap.keep", path + ".snap")
+    db.close()
+    engine.dispose()
+    return {"bids": bids, "table_ms": best(table), "ledger_ms": best(recovered), "source": source,
+            "tail_replayed": replayed, "speedup": round(min(table) / min(recovered), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bids", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--plates", type=int, default=1000)
+    parser.add_argument("--tail", type=int, default=1000, help="ledger records after the snapshot")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for bids in args.bids:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(measure(tmp, args, bids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/common.py
+"""
+Helpers shared by the benchmarks: a seeded SQLite database, latency
+percentiles and waiting for a server to come up.
+
+`app` is imported inside the functions: benchmarks that configure the app
+through the environment (suite, logging_pipeline) must set it first.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Union
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+
+def create_database(path: str) -> Engine:
+    from app.database import Base
+    import app.models  # noqa: F401  jadvallar metadata ga ro'yxatdan o'tishi uchun
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def default_deadline() -> datetime:
+    return datetime.utcnow() + timedelta(days=1)
+
+
+def user_rows(count: int, hashed_password: str = "x", staff: int = 0) -> list:
+    """`user0`..`user<count-1>`; the first `staff` of them are admins."""
+    return [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": hashed_password,
+             "is_staff": i < staff} for i in range(count)]
+
+
+def plate_rows(count: int, deadline: Union[datetime, Callable[[int], datetime]], digits: int = 6) -> list:
+    """Active plates `P000000`..; `deadline` may be a function of the row number."""
+    return [{"plate_number": f"P{i:0{digits}d}", "description": "", "created_by_id": 1, "is_active": True,
+             "deadline": deadline(i) if callable(deadline) else deadline} for i in range(count)]
+
+
+def insert_rows(target, model, rows: Iterable[dict]):
+    """Bulk insert through a Connection or Session; an empty list inserts nothing."""
+    rows = list(rows)
+    # Bo'sh ro'yxat bilan insert() standart qiymatli bitta qator qo'shadi
+    if rows:
+        target.execute(model.__table__.insert(), rows)
+
+
+def seed_users_and_plates(session_factory, plates: int, users: int):
+    from app import models
+
+    db = session_factory()
+    try:
+        insert_rows(db, models.User, user_rows(users))
+        insert_rows(db, models.AutoPlate, plate_rows(plates, default_deadline()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentiles(samples: list, digits: int = 2) -> dict:
+    """p50/p95/p99/max of `samples` (seconds) in milliseconds."""
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda p: round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, digits)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": round(samples[-1] * 1000, digits)}
+
+
+def best(runs: list) -> float:
+    return round(min(runs) * 1000, 1)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0, path: str = "/openapi.json"):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(path)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
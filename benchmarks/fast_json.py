@@ -0,0 +1,86 @@
+# benchmarks/fast_json.py
+"""
+ORM + pydantic page rendering versus column tuples + orjson (app/fastjson.py).
+
+    python -m benchmarks.fast_json --rows 1000 10000 100000 --repeat 5
+
+For each row count a temporary SQLite database gets that many plates and
+bids. Both list bodies are then built the old way (ORM entities, validated
+through AutoPlatePage/BidPage and dumped by pydantic) and the new way (column
+tuples encoded by RowEncoder). The bodies are checked to be byte-identical,
+and the best of `--repeat` runs is printed, split into query and encode time.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models, pagination, schemas
+from app.cache import serialize
+from app.fastjson import bid_rows, plate_rows
+from benchmarks.common import best, create_database, insert_rows, user_rows
+
+
+def seed(path: str, rows: int):
+    engine = create_database(path)
+    deadline = datetime.utcnow() + timedelta(days=1)
+    with engine.begin() as connection:
+        insert_rows(connection, models.User, user_rows(1))
+        connection.execute(models.AutoPlate.__table__.insert(), [
+            {"plate_number": f"P{i:07d}", "description": f"plate {i}", "created_by_id": 1, "is_active": True,
+             "deadline": deadline + timedelta(seconds=i), "highest_bid": i * 1.5 if i % 3 else None,
+             "bid_count": i % 7} for i in range(rows)])
+        connection.execute(models.Bid.__table__.insert(), [
+            {"user_id": 1, "plate_id": i + 1, "amount": 100.0 + i * 0.25,
+             "created_at": deadline - timedelta(seconds=i, microseconds=i % 1000)} for i in range(rows)])
+    return engine
+
+
+def measure(db, rows: int, repeat: int, model, page_schema, encoder, ordering, sort_column) -> dict:
+    old_query, old_encode, new_query, new_encode = [], [], [], []
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        entities = pagination.keyset(db.query(model), sort_column, model.id, False).limit(rows + 1).all()
+        result = pagination.page(entities, rows, ordering, sort_column.key)
+        encoded = time.perf_counter()
+        old_body = serialize(page_schema, result)
+        old_query.append(encoded - started)
+        old_encode.append(time.perf_counter() - encoded)
+
+        started = time.perf_counter()
+        tuples = pagination.keyset(db.query(*encoder.columns), sort_column, model.id, False).limit(rows + 1).all()
+        result = pagination.page(tuples, rows, ordering, sort_column.key)
+        encoded = time.perf_counter()
+        new_body = encoder.page(result)
+        new_query.append(encoded - started)
+        new_encode.append(time.perf_counter() - encoded)
+        assert new_body == old_body, "fast path output differs from the schema"
+    return {"orm_query_ms": best(old_query), "pydantic_ms": best(old_encode),
+            "tuple_query_ms": best(new_query), "orjson_ms": best(new_encode),
+            "speedup": round((min(old_query) + min(old_encode)) / (min(new_query) + min(new_encode)), 2),
+            "bytes": len(new_body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = seed(os.path.join(tmp, "bench.db"), rows)
+            db = sessionmaker(bind=engine)()
+            print({"rows": rows, "plates": measure(db, rows, args.repeat, models.AutoPlate, schemas.AutoPlatePage,
+                                                   plate_rows, "deadline", models.AutoPlate.deadline)})
+            print({"rows": rows, "bids": measure(db, rows, args.repeat, models.Bid, schemas.BidPage,
+                                                 bid_rows, "id", models.Bid.id)})
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
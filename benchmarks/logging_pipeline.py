@@ -0,0 +1,131 @@
+# benchmarks/logging_pipeline.py
+"""
+Request latency with synchronous logging versus the queued JSON pipeline.
+
+    python -m benchmarks.logging_pipeline --clients 20 --requests 200 --sink-delay-ms 1
+
+Each setting runs in a fresh process against the same seeded database, in
+process behind httpx's ASGI transport. The "before" setting mirrors the old
+`logging.basicConfig` setup: text lines written on the request thread
+(LOG_QUEUE_SIZE=0, no rate limit). "queued" hands JSON lines to the writer
+thread through the bounded queue, and "after", the default settings, adds the
+per-template rate limit. The log sink is a file whose every write sleeps for
+`--sink-delay-ms`, the way a slow disk, pipe or container log driver does.
+Clients hit routes that log on every request (search and a missing plate)
+and each setting prints p50/p95/p99, the records written and the logging stats.
+Requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTINGS = {
+    "before": {"LOG_QUEUE_SIZE": "0", "LOG_FORMAT": "text", "LOG_RATE_LIMIT_PER_SECOND": "0"},
+    "queued": {"LOG_RATE_LIMIT_PER_SECOND": "0"},
+    "after": {},
+}
+
+
+class SlowStream:
+    def __init__(self, path: str, delay: float):
+        self._file = open(path, "a", encoding="utf-8")
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str):
+        time.sleep(self.delay)
+        self.writes += 1
+        self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+
+async def drive(app, args) -> list:
+    import httpx
+
+    latencies = []
+
+    async def one_client(n: int):
+        rng = random.Random(n)
+        for _ in range(args.requests):
+            if rng.random() < 0.5:
+                url = f"/plates/plates/search?q={rng.randint(0, 999):03d}"
+            else:
+                url = f"/plates/plates/{args.plates + rng.randint(1, 1000)}"  # 404 va warning
+            started = time.perf_counter()
+            await client.get(url)
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await asyncio.gather(*(one_client(n) for n in range(args.clients)))
+    return latencies
+
+
+def child(args):
+    """One setting in this process; environment is already set by `run`."""
+    from app.config import settings
+    from app.logs import configure_logging, log_pipeline
+
+    stream = SlowStream(os.path.join(os.getcwd(), "app.log"), args.sink_delay_ms / 1000)
+    from app.main import app
+
+    configure_logging(settings, stream=stream)
+
+    async def serve():
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        latencies = await drive(app, args)
+        stats = log_pipeline.stats()
+        drain_started = time.perf_counter()
+        await lifespan.__aexit__(None, None, None)
+        return latencies, stats, time.perf_counter() - drain_started
+
+    latencies, stats, drain = asyncio.run(serve())
+    print(json.dumps({"requests": len(latencies), **percentiles(latencies), "log_writes": stream.writes,
+                      "drain_s": round(drain, 2), **stats}))
+
+
+def run(name: str, args) -> dict:
+    from benchmarks.suite import seed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Auto.db")
+        env = dict(os.environ, PYTHONPATH=ROOT, SECRET_KEY="benchmark-secret", DATABASE_URL=f"sqlite:///{path}",
+                   AUCTION_SCHEDULER_ENABLED="false", RESPONSE_CACHE_ENABLED="false", **SETTINGS[name])
+        os.environ.update(DATABASE_URL=env["DATABASE_URL"])
+        seed(path, argparse.Namespace(seed=1, users=10, plates=args.plates, bids=0, hot=1, bidders=1))
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.logging_pipeline", "--child", "--clients", str(args.clients),
+             "--requests", str(args.requests), "--plates", str(args.plates),
+             "--sink-delay-ms", str(args.sink_delay_ms)],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+    return {"setting": name, **json.loads(output.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--plates", type=int, default=2000)
+    parser.add_argument("--sink-delay-ms", type=float, default=1.0, help="sleep per log write")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+    for name in SETTINGS:
+        print(run(name, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/login_storm.py
+"""
+Bid latency while a login storm is running, with bcrypt inline and in the pool.
+
+    python -m benchmarks.login_storm --bidders 20 --bids 20 --storm 50
+
+For each setting (PASSWORD_POOL_WORKERS=0 and the pool) the app is started
+under uvicorn on a seeded database. `--bidders` clients place bids, first on
+a quiet server and then while `--storm` clients log in as fast as they can;
+the p50/p95/p99 of the bids in both phases are printed side by side.
+Requires httpx.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.api.auth import create_access_token
+from app.services.passwords import pwd_context
+from benchmarks.async_load import ROOT, seed
+from benchmarks.common import percentiles, wait_ready
+
+PASSWORD = "storm-password"
+
+
+async def place_bids(client: httpx.AsyncClient, args, first_plate: int) -> tuple:
+    latencies, errors = [], 0
+
+    async def bidder(n: int):
+        nonlocal errors
+        headers = {"Authorization": "Bearer " + create_access_token({"sub": f"user{n}"})}
+        # Har bir mijoz o'z raqamlariga taklif beradi, shunda takliflar bir-biriga xalaqit bermaydi
+        for i in range(args.bids):
+            plate_id = first_plate + n * args.bids + i
+            started = time.perf_counter()
+            try:
+                response = await client.post("/bids/bids/", json={"plate_id": plate_id, "amount": 1e9},
+                                              headers=headers)
+                errors += response.status_code >= 400
+            except httpx.TransportError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(bidder(n) for n in range(args.bidders)))
+    return latencies, errors
+
+
+async def drive(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.bidders + args.storm)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await wait_ready(client)
+        quiet, quiet_errors = await place_bids(client, args, 1)
+
+        stop = asyncio.Event()
+        logins, refused = 0, 0
+
+        async def storm(n: int):
+            nonlocal logins, refused
+            form = {"username": f"user{args.bidders + n}", "password": PASSWORD}
+            while not stop.is_set():
+                try:
+                    response = await client.post("/auth/login/", data=form)
+                    logins += response.status_code == 200
+                    refused += response.status_code == 503
+                except httpx.TransportError:
+                    refused += 1
+
+        storms = [asyncio.create_task(storm(n)) for n in range(args.storm)]
+        await asyncio.sleep(1.0)
+        loaded, loaded_errors = await place_bids(client, args, 1 + args.bidders * args.bids)
+        stop.set()
+        await asyncio.gather(*storms)
+    return {"quiet": {"bids": len(quiet), **percentiles(quiet, digits=1), "errors": quiet_errors},
+            "storm": {"bids": len(loaded), **percentiles(loaded, digits=1), "errors": loaded_errors,
+                      "logins": logins, "refused": refused}}
+
+
+def run(workers: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Auto.db")
+        seed(path, args.bidders * args.bids * 2, args.bidders + args.storm)
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE users SET hashed_password = :hashed"),
+                               {"hashed": pwd_context.hash(PASSWORD)})
+            connection.execute(text("DELETE FROM bids WHERE user_id <= :bidders"), {"bidders": args.bidders})
+        engine.dispose()
+        env = dict(os.environ, PYTHONPATH=ROOT, PASSWORD_POOL_WORKERS=str(workers))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            result = asyncio.run(drive(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            server.terminate()
+            server.wait()
+    return {"password_pool_workers": workers, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bidders", type=int, default=20)
+    parser.add_argument("--bids", type=int, default=20, help="bids per bidder in each phase")
+    parser.add_argument("--storm", type=int, default=50, help="concurrent login loops")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_POOL_WORKERS for the pooled run")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    for workers in (0, args.workers):
+        print(run(workers, args))
+
+
+if __name__ == "__main__":
+    main()
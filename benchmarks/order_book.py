@@ -0,0 +1,104 @@
+# benchmarks/order_book.py
+"""
+Bids/sec with and without the in-memory order book.
+
+    python -m benchmarks.order_book --plates 50 --bids 5000
+
+Both paths run against a fresh SQLite file and perform the same final write;
+the "database" path validates with the original three queries (plate, existing
+bid, highest bid), the "order book" path validates in memory.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.services.bid_writer import stage_bid
+from app.services.order_book import OrderBook
+from benchmarks.common import seed_users_and_plates
+
+
+def workload(plates: int, users: int, bids: int, rng: random.Random):
+    # Har bir plate uchun o'suvchi summa, foydalanuvchilar takrorlanishi mumkin
+    price = {}
+    for _ in range(bids):
+        plate_id = rng.randint(1, plates)
+        price[plate_id] = price.get(plate_id, 0) + rng.randint(1, 100)
+        yield plate_id, rng.randint(1, users), float(price[plate_id])
+
+
+def place_with_database(db, plate_id: int, user_id: int, amount: float) -> bool:
+    plate = db.query(models.AutoPlate).filter(models.AutoPlate.id == plate_id).first()
+    if not plate or not plate.is_active or plate.deadline <= datetime.utcnow():
+        return False
+    if db.query(models.Bid).filter(models.Bid.user_id == user_id, models.Bid.plate_id == plate_id).first():
+        return False
+    highest_bid = db.query(models.Bid).filter(models.Bid.plate_id == plate_id).order_by(models.Bid.amount.desc()).first()
+    if highest_bid and amount <= highest_bid.amount:
+        return False
+    db.add(models.Bid(amount=amount, user_id=user_id, plate_id=plate_id))
+    db.commit()
+    return True
+
+
+def place_with_order_book(book_index: OrderBook, db, plate_id: int, user_id: int, amount: float) -> bool:
+    book = book_index.get(db, plate_id)
+    if book is None:
+        return False
+    with book.lock:
+        try:
+            entry = stage_bid(db, book, user_id, amount)
+        except HTTPException:
+            return False
+        db.commit()
+        book_index.place(book, entry)
+    return True
+
+
+def run(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed_users_and_plates(session_factory, args.plates, args.users)
+
+        db = session_factory()
+        book_index = OrderBook()
+        if mode == "order_book":
+            book_index.warm(db)
+        accepted = 0
+        started = time.perf_counter()
+        for plate_id, user_id, amount in workload(args.plates, args.users, args.bids, random.Random(args.seed)):
+            if mode == "order_book":
+                accepted += place_with_order_book(book_index, db, plate_id, user_id, amount)
+            else:
+                accepted += place_with_database(db, plate_id, user_id, amount)
+        elapsed = time.perf_counter() - started
+        db.close()
+        engine.dispose()
+    return {"mode": mode, "bids": args.bids, "accepted": accepted,
+            "seconds": round(elapsed, 3), "bids_per_sec": round(args.bids / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plates", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--bids", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for mode in ("database", "order_book"):
+        print(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
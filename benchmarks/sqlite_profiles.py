@@ -0,0 +1,90 @@
+# benchmarks/sqlite_profiles.py
+"""
+Mixed read/write latency under each SQLite profile (app.database.SQLITE_PROFILES).
+
+    python -m benchmarks.sqlite_profiles --readers 8 --writers 2 --seconds 5
+
+Reader threads run the `GET /plates/` query while writer threads insert and
+commit bids, all through engines built by `app.database.create_db_engine`.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config import settings
+from app.database import Base, SQLITE_PROFILES, create_db_engine
+from benchmarks.common import percentiles, seed_users_and_plates
+
+
+def run(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                                  pragmas=SQLITE_PROFILES[profile])
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed_users_and_plates(session_factory, args.plates, args.users)
+
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+
+        def reader():
+            db = session_factory()
+            while not stop.is_set():
+                started = time.perf_counter()
+                db.query(models.AutoPlate).filter(models.AutoPlate.is_active == True) \
+                    .order_by(models.AutoPlate.deadline).all()
+                db.rollback()
+                reads.append(time.perf_counter() - started)
+            db.close()
+
+        def writer(seed_value: int):
+            rng = random.Random(seed_value)
+            db = session_factory()
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.add(models.Bid(amount=rng.random() * 1000, user_id=rng.randint(1, args.users),
+                                      plate_id=rng.randint(1, args.plates)))
+                    db.commit()
+                    writes.append(time.perf_counter() - started)
+                except Exception as exc:
+                    db.rollback()
+                    errors.append(type(exc).__name__)
+            db.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return {"profile": profile, "reads": {"ops": len(reads), **percentiles(reads)},
+            "writes": {"ops": len(writes), **percentiles(writes)}, "write_errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="*", default=list(SQLITE_PROFILES))
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--plates", type=int, default=500)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    if args.readers + args.writers > settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW:
+        parser.error("readers + writers must fit in DB_POOL_SIZE + DB_MAX_OVERFLOW")
+    for profile in args.profiles:
+        print(run(profile, args))
+
+
+if __name__ == "__main__":
+    main()
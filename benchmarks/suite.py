@@ -0,0 +1,308 @@
+# benchmarks/suite.py
+"""
+Reproducible load test of the API with per-route throughput and latency.
+
+    python -m benchmarks.suite run --target uvicorn --out before.json
+    python -m benchmarks.suite run --target inprocess --scenario browse --clients 50
+    python -m benchmarks.suite compare before.json after.json
+
+`run` seeds a fresh SQLite database in a temporary directory (`--users`,
+`--plates`, `--bids`, all from `--seed`, so two runs see the same data and the
+same request sequence) and boots `app.main:app` either under a local uvicorn
+process or in this process behind httpx's ASGI transport. It then drives the
+scenarios one after another:
+
+    browse      read-heavy: plate listings (with ETag revalidation and a
+                second page), single plates, search and the caller's bids
+    bid_storm   `--bidders` users fight over `--hot` plates at the end of an
+                auction: read the plate, bid or raise above the leader
+    login       bursts of POST /auth/login/, one in ten with a wrong password
+
+Every request is recorded under its route template ("GET /plates/plates/{plate_id}")
+and the report, written as JSON to `--out` (or stdout), holds requests/s,
+mean/p50/p95/p99/max latency and the status code counts per route and per
+scenario, plus the git commit and settings of the run. Expected rejections
+(an outbid raise, a wrong password) are counted by status, not as transport
+errors. Settings.* can be overridden for the app with `--env NAME=VALUE`.
+Requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks.common import (create_database, default_deadline, insert_rows, percentiles, plate_rows, user_rows,
+                               wait_ready)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("browse", "bid_storm", "login")
+PASSWORD = "bench-password"
+ORDERINGS = ("deadline", "-deadline", "plate_number", "-plate_number")
+
+
+def seed(path: str, args):
+    """Users user0..N-1 (user0 is staff), plates P000000.., and random bids outside the storm."""
+    from app import migrations, models
+    from app.services.passwords import pwd_context
+    from app.services.plate_stats import plate_stats_update
+
+    engine = create_database(path)
+    migrations.upgrade(engine)
+    rng = random.Random(args.seed)
+    deadline = default_deadline()
+    with engine.begin() as connection:
+        insert_rows(connection, models.User, user_rows(args.users, pwd_context.hash(PASSWORD), staff=1))
+        insert_rows(connection, models.AutoPlate, plate_rows(
+            args.plates, lambda i: deadline + timedelta(seconds=rng.randint(0, 86400))))
+        # Storm qatnashchilari (oxirgi --bidders foydalanuvchi) va issiq raqamlar toza qoladi
+        bidders = max(1, args.users - args.bidders)
+        pairs = {(rng.randint(1, bidders), rng.randint(args.hot + 1, args.plates)) for _ in range(args.bids)}
+        insert_rows(connection, models.Bid, [
+            {"user_id": user_id, "plate_id": plate_id, "amount": float(rng.randint(1, 10000)),
+             "created_at": datetime.utcnow()} for user_id, plate_id in sorted(pairs)])
+        connection.execute(plate_stats_update())
+    engine.dispose()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, route: str, url: str, **kwargs):
+        method = route.split(" ", 1)[0]
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except httpx.TransportError:
+            response, status = None, "transport_error"
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][status] += 1
+        return response
+
+    def report(self, seconds: float) -> dict:
+        def summary(latencies: list, statuses: Counter) -> dict:
+            return {"requests": len(latencies), "req_per_sec": round(len(latencies) / seconds, 1),
+                    "mean_ms": round(statistics.mean(latencies) * 1000, 2), **percentiles(latencies),
+                    "statuses": dict(sorted(statuses.items()))}
+
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {"seconds": round(seconds, 3), **summary(everything, sum(self.statuses.values(), Counter())),
+                "routes": {route: summary(self.latencies[route], self.statuses[route])
+                           for route in sorted(self.latencies)}}
+
+
+def bearer(username: str) -> dict:
+    from app.api.auth import create_access_token
+
+    return {"Authorization": "Bearer " + create_access_token({"sub": username})}
+
+
+async def browse(client: httpx.AsyncClient, recorder: Recorder, args, n: int):
+    rng = random.Random(args.seed * 1000 + n)
+    headers = bearer(f"user{n % args.users}")
+    etags = {}
+    for _ in range(args.requests):
+        roll = rng.random()
+        if roll < 0.35:
+            params = {"ordering": rng.choice(ORDERINGS)}
+            key = params["ordering"]
+            response = await recorder.request(
+                client, "GET /plates/plates/", "/plates/plates/", params=params,
+                headers={"If-None-Match": etags[key]} if key in etags else None)
+            if response is not None and response.status_code == 200:
+                etags[key] = response.headers.get("etag")
+                cursor = response.json().get("next_cursor")
+                if cursor and rng.random() < 0.3:
+                    await recorder.request(client, "GET /plates/plates/?cursor", "/plates/plates/",
+                                           params={**params, "cursor": cursor})
+        elif roll < 0.65:
+            plate_id = rng.randint(1, args.plates)
+            await recorder.request(client, "GET /plates/plates/{plate_id}", f"/plates/plates/{plate_id}")
+        elif roll < 0.8:
+            await recorder.request(client, "GET /plates/plates/search", "/plates/plates/search",
+                                   params={"q": f"{rng.randint(0, 999):03d}", "mode": "contains"})
+        else:
+            await recorder.request(client, "GET /bids/bids/", "/bids/bids/", headers=headers)
+
+
+async def bid_storm(client: httpx.AsyncClient, recorder: Recorder, args, n: int):
+    rng = random.Random(args.seed * 2000 + n)
+    headers = bearer(f"user{args.users - 1 - n % args.bidders}")
+    own = {}  # plate_id -> o'z taklifimiz id si
+    for _ in range(args.requests):
+        plate_id = rng.randint(1, args.hot)
+        response = await recorder.request(client, "GET /plates/plates/{plate_id}", f"/plates/plates/{plate_id}")
+        leader = (response.json().get("highest_bid") if response is not None and response.status_code == 200
+                  else None) or 0
+        amount = float(leader + rng.randint(1, 100))
+        if plate_id in own:
+            await recorder.request(client, "PUT /bids/bids/{bid_id}", f"/bids/bids/{own[plate_id]}",
+                                   json={"plate_id": plate_id, "amount": amount}, headers=headers)
+        else:
+            response = await recorder.request(client, "POST /bids/bids/", "/bids/bids/",
+                                              json={"plate_id": plate_id, "amount": amount}, headers=headers)
+            if response is not None and response.status_code in (200, 201):
+                own[plate_id] = response.json()["id"]
+
+
+async def login(client: httpx.AsyncClient, recorder: Recorder, args, n: int):
+    rng = random.Random(args.seed * 3000 + n)
+    for _ in range(args.login_requests):
+        password = PASSWORD if rng.random() >= 0.1 else "wrong-password"
+        await recorder.request(client, "POST /auth/login/", "/auth/login/",
+                               data={"username": f"user{rng.randrange(args.users)}", "password": password})
+
+
+async def drive(client: httpx.AsyncClient, args) -> dict:
+    results = {}
+    for name in args.scenario:
+        clients = args.bidders if name == "bid_storm" else args.clients
+        recorder = Recorder()
+        scenario = {"browse": browse, "bid_storm": bid_storm, "login": login}[name]
+        started = time.perf_counter()
+        await asyncio.gather(*(scenario(client, recorder, args, n) for n in range(clients)))
+        results[name] = {"clients": clients, **recorder.report(time.perf_counter() - started)}
+    return results
+
+
+async def run_uvicorn(tmp: str, env: dict, args) -> dict:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=tmp, env=dict(os.environ, PYTHONPATH=ROOT, **env),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limits = httpx.Limits(max_connections=max(args.clients, args.bidders))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits,
+                                     timeout=args.timeout) as client:
+            await wait_ready(client)
+            return await drive(client, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def run_inprocess(tmp: str, env: dict, args) -> dict:
+    # Settings import paytida o'qiladi: muhit app dan oldin o'rnatilishi kerak
+    os.environ.update(env)
+    os.chdir(tmp)
+    from app.main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=args.timeout) as client:
+            return await drive(client, args)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args):
+    if args.users <= args.bidders:
+        raise SystemExit("--users must be larger than --bidders")
+    env = dict(item.split("=", 1) for item in args.env)
+    env.setdefault("SECRET_KEY", os.environ.get("SECRET_KEY") or "benchmark-secret")
+    env.setdefault("AUCTION_SCHEDULER_ENABLED", "false")
+    started_at = datetime.utcnow().isoformat(timespec="seconds")
+    with tempfile.TemporaryDirectory() as tmp:
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'Auto.db')}"
+        # create_access_token va seed ham app bilan bir xil SECRET_KEY/DATABASE_URL ni ko'rishi uchun
+        os.environ.update(env)
+        seed(os.path.join(tmp, "Auto.db"), args)
+        runner = run_uvicorn if args.target == "uvicorn" else run_inprocess
+        cwd = os.getcwd()
+        try:
+            scenarios = asyncio.run(runner(tmp, env, args))
+        finally:
+            os.chdir(cwd)
+    env.pop("DATABASE_URL")
+    env.pop("SECRET_KEY")
+    report = {
+        "meta": {"commit": git_commit(), "started_at": started_at, "target": args.target,
+                 "python": platform.python_version(), "platform": platform.platform(), "env": env,
+                 "params": {name: getattr(args, name) for name in (
+                     "seed", "users", "plates", "bids", "hot", "clients", "bidders", "requests", "login_requests")}},
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(text + "\n")
+        for name, result in scenarios.items():
+            print(f"{name}: {result['req_per_sec']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+    else:
+        print(text)
+
+
+def compare(args):
+    """Per-route throughput and p95/p99 of `new` relative to `old`."""
+    with open(args.old) as old_file, open(args.new) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    for name, scenario in new["scenarios"].items():
+        before = old["scenarios"].get(name, {}).get("routes", {})
+        print(f"\n{name}")
+        for route, result in scenario["routes"].items():
+            if route not in before:
+                print(f"  {route:36} new")
+                continue
+            ratio = lambda key: f"{result[key] / before[route][key]:.2f}x" if before[route][key] else "-"
+            print(f"  {route:36} req/s {ratio('req_per_sec'):>7}  p95 {ratio('p95_ms'):>7}  p99 {ratio('p99_ms'):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed, boot the app and run the scenarios")
+    run_parser.add_argument("--target", choices=("uvicorn", "inprocess"), default="uvicorn")
+    run_parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                            help="may be repeated; default: all, in order")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--users", type=int, default=500)
+    run_parser.add_argument("--plates", type=int, default=2000)
+    run_parser.add_argument("--bids", type=int, default=10000, help="seeded bids (duplicate pairs are dropped)")
+    run_parser.add_argument("--hot", type=int, default=5, help="plates fought over in bid_storm")
+    run_parser.add_argument("--clients", type=int, default=100, help="concurrent clients in browse and login")
+    run_parser.add_argument("--bidders", type=int, default=50, help="concurrent clients in bid_storm")
+    run_parser.add_argument("--requests", type=int, default=20, help="iterations per browse/bid_storm client")
+    run_parser.add_argument("--login-requests", type=int, default=3, help="logins per login client")
+    run_parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                            help="Settings override for the app, e.g. ASYNC_MODE=true")
+    run_parser.add_argument("--port", type=int, default=8767)
+    run_parser.add_argument("--timeout", type=float, default=60.0)
+    run_parser.add_argument("--out", help="JSON report path; stdout when omitted")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        args.scenario = args.scenario or list(SCENARIOS)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# tests/conftest.py
+import os
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+# Settings import paytida o'qiladi: app ishdagi Auto.db va .env ga tegmasligi uchun oldinroq o'rnatiladi
+_TMP = tempfile.mkdtemp(prefix="auto-plate-tests-")
+os.environ.update(APP_ENV_FILE="", SECRET_KEY="test-secret", DATABASE_URL=f"sqlite:///{_TMP}/test.db",
+                  BID_LEDGER_ENABLED="1",
+                  # Fon xizmatlari va rate limit so'rovlar sonini o'zgartirmasligi uchun o'chiriladi
+                  ADMISSION_ENABLED="0", PASSWORD_POOL_WORKERS="0", AUCTION_SCHEDULER_ENABLED="0")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import create_app
+
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def login(client, username: str, is_staff: bool = False) -> dict:
+    client.post("/auth/register/", json={"username": username, "email": f"{username}@example.com",
+                                         "password": "pw", "is_staff": is_staff})
+    token = client.post("/auth/login/", data={"username": username, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": "Bearer " + token}
+    # Birinchi so'rov foydalanuvchini principal keshiga yuklaydi
+    assert client.get("/bids/bids/", headers=headers).status_code == 200
+    return headers
+
+
+@pytest.fixture(scope="session")
+def users(client) -> dict:
+    return {name: login(client, name, name == "admin") for name in ("admin", "bidder1", "bidder2", "bidder3")}
+
+
+_plate_numbers = count(1)
+
+
+@pytest.fixture
+def plate_id(client, users) -> int:
+    deadline = (datetime.utcnow() + timedelta(hours=1)).isoformat()
+    response = client.post("/plates/plates/", json={"plate_number": f"01Q{next(_plate_numbers):03d}QQ",
+                                                     "description": "", "deadline": deadline},
+                           headers=users["admin"])
+    assert response.status_code == 201
+    return response.json()["id"]
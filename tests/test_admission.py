@@ -0,0 +1,70 @@
+# tests/test_admission.py
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.admission import AdmissionController, AdmissionMiddleware
+from app.api.auth import create_access_token
+
+
+@pytest.fixture
+def controller() -> AdmissionController:
+    controller = AdmissionController()
+    # Sekinroq to'ldiriladi: test davomida bucketlar qayta to'lmaydi
+    controller.configure(user_rate=0.01, user_burst=2, plate_rate=0.01, plate_burst=3, max_keys=1000)
+    return controller
+
+
+@pytest.fixture
+def admitted(client, controller) -> TestClient:
+    return TestClient(AdmissionMiddleware(client.app, controller))
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": "Bearer " + token}
+
+
+def bid(admitted, plate_id: int, headers: dict, amount: float = 100):
+    return admitted.post("/bids/bids/", json={"amount": amount, "plate_id": plate_id}, headers=headers)
+
+
+def test_user_bucket_sheds_with_retry_after(admitted, users, plate_id):
+    assert [bid(admitted, plate_id, users["bidder1"], 100 + n).status_code for n in range(2)] == [200, 400]
+    response = bid(admitted, plate_id, users["bidder1"], 500)
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too many requests"}
+    assert response.headers["retry-after"] == "100"
+    # Boshqa foydalanuvchining bucketi alohida
+    assert bid(admitted, plate_id, users["bidder2"], 600).status_code == 200
+
+
+def test_every_token_of_a_user_shares_one_bucket(admitted, controller, users, plate_id):
+    tokens = [create_access_token({"sub": "bidder1"}, timedelta(minutes=minutes)) for minutes in (5, 6, 7)]
+    statuses = [bid(admitted, plate_id, bearer(token), 100 + n).status_code for n, token in enumerate(tokens)]
+    assert statuses[-1] == 429
+    assert len(controller.users) == 1
+
+
+def test_forged_token_does_not_use_the_victims_bucket(admitted, controller, plate_id):
+    forged = jwt.encode({"sub": "bidder2"}, "not-the-secret-key", algorithm="HS256")
+    statuses = {bid(admitted, plate_id, bearer(forged)).status_code for _ in range(10)}
+    assert statuses == {401, 429}
+    assert len(controller.users) == 0
+    # Keshga tushmagan yangi token bilan ham haqiqiy foydalanuvchi o'tadi
+    assert bid(admitted, plate_id, bearer(create_access_token({"sub": "bidder2"}))).status_code == 200
+
+
+def test_anonymous_writes_do_not_use_the_plate_bucket(admitted, controller, users, plate_id):
+    statuses = {bid(admitted, plate_id, {}).status_code for _ in range(20)}
+    assert statuses == {401, 429}
+    assert len(controller.plates) == 0
+    assert controller.stats()["shed_anonymous"] == 18
+    assert bid(admitted, plate_id, users["bidder1"], 100).status_code == 200
+
+
+def test_plate_bucket_is_shared_by_bidders(admitted, users, plate_id):
+    statuses = [bid(admitted, plate_id, users[name], amount).status_code
+                for name, amount in (("bidder1", 100), ("bidder2", 200), ("bidder3", 300), ("admin", 400))]
+    assert statuses == [200, 200, 200, 429]
@@ -0,0 +1,32 @@
+# tests/test_auth.py
+import asyncio
+
+from app.api import auth
+from app.services.passwords import _hash, hasher
+
+
+def test_register_and_login(client):
+    user = {"username": "carol", "email": "carol@example.com", "password": "secret"}
+    assert client.post("/auth/register/", json=user).status_code == 200
+    assert client.post("/auth/register/", json=user).json()["detail"] == "Username already exists"
+    assert client.post("/auth/login/", data={"username": "carol", "password": "wrong"}).status_code == 401
+    response = client.post("/auth/login/", data={"username": "carol", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+
+
+def test_auth_routes_do_not_hold_a_thread_for_bcrypt():
+    assert asyncio.iscoroutinefunction(auth.login)
+    assert asyncio.iscoroutinefunction(auth.register)
+
+
+def test_login_refused_when_password_pool_is_full(client, users):
+    hasher.start(1, 1)
+    try:
+        busy = hasher.submit(_hash, "x")
+        response = client.post("/auth/login/", data={"username": "bidder1", "password": "pw"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        busy.result()
+    finally:
+        hasher.stop()
@@ -0,0 +1,133 @@
+# tests/test_bid_ledger.py
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.services.bid_hub import BID_PLACED, BID_RAISED
+from app.services.bid_ledger import RECORD_SIZE, BidLedger, bid_ledger, ledger_path
+from app.services.order_book import BookEntry, OrderBook
+
+
+def test_ledger_path_defaults_to_the_database_directory():
+    config = lambda url, path=None: SimpleNamespace(DATABASE_URL=url, BID_LEDGER_PATH=path)
+    assert ledger_path(config("sqlite:///./Auto.db")) == "./Auto.ledger"
+    assert ledger_path(config("sqlite:////var/lib/auto/main.db")) == "/var/lib/auto/main.ledger"
+    assert ledger_path(config("sqlite:///./Auto.db", "/tmp/bids.ledger")) == "/tmp/bids.ledger"
+    assert ledger_path(config("sqlite://")) is None
+    assert ledger_path(config("postgresql://user@host/auto")) is None
+
+
+def test_app_ledger_lives_next_to_the_database(client, users, plate_id):
+    assert bid_ledger.path == os.path.splitext(os.environ["DATABASE_URL"][len("sqlite:///"):])[0] + ".ledger"
+    seq = bid_ledger.seq
+    assert client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"]) \
+        .status_code == 200
+    assert bid_ledger.seq == seq + 1
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/ledger.db")
+    Base.metadata.create_all(bind=engine)
+    deadline = datetime.utcnow() + timedelta(hours=1)
+    with engine.begin() as connection:
+        connection.execute(models.User.__table__.insert(), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x", "is_staff": False}
+            for i in range(1, 4)])
+        connection.execute(models.AutoPlate.__table__.insert(), [
+            {"plate_number": f"01L{i:03d}LL", "description": "", "created_by_id": 1, "is_active": True,
+             "deadline": deadline} for i in range(1, 3)])
+        connection.execute(models.Bid.__table__.insert(), [
+            {"user_id": user_id, "plate_id": plate_id, "amount": 100.0 * user_id + plate_id, "created_at": deadline}
+            for user_id in range(1, 4) for plate_id in range(1, 3)])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def books(book: OrderBook) -> dict:
+    return {plate_id: sorted((entry.id, entry.user_id, entry.amount) for entry in plate.bids.values())
+            for plate_id, plate in book._plates.items()}
+
+
+def recover(db, path: str) -> tuple:
+    ledger = BidLedger()
+    ledger.open(path, snapshot_every=0)
+    book = OrderBook()
+    book.warm(db, ledger.recover)
+    return ledger, book
+
+
+def raise_bid(db, ledger, bid_id: int, amount: float):
+    db.execute(update(models.Bid).where(models.Bid.id == bid_id).values(amount=amount))
+    db.commit()
+    if ledger is not None:
+        ledger.append(BID_RAISED, entry(db, bid_id))
+
+
+def entry(db, bid_id: int) -> BookEntry:
+    row = db.get(models.Bid, bid_id)
+    return BookEntry(id=row.id, user_id=row.user_id, plate_id=row.plate_id, amount=row.amount,
+                     created_at=row.created_at)
+
+
+def test_recovery_replays_the_tail_after_the_snapshot(db, tmp_path):
+    path = str(tmp_path / "bids.ledger")
+    ledger, _ = recover(db, path)
+    # Snapshot yo'q: jadvaldan yuklanadi va snapshot yoziladi
+    assert ledger.recovered_from == "database" and os.path.exists(path + ".snap")
+    raise_bid(db, ledger, 1, 1000.0)
+    raise_bid(db, ledger, 2, 2000.0)
+    ledger.close()
+
+    ledger, book = recover(db, path)
+    assert (ledger.recovered_from, ledger.replayed) == ("snapshot", 2)
+    ledger.close()
+    table = OrderBook()
+    table.warm(db)
+    assert books(book) == books(table)
+    assert book.get(db, 1).leader.amount == 1000.0
+
+
+def test_recovery_falls_back_to_the_table_when_a_raise_is_missing(db, tmp_path):
+    path = str(tmp_path / "bids.ledger")
+    recover(db, path)[0].close()
+    # Commit bo'ldi, lekin append gacha jarayon quladi
+    raise_bid(db, None, 3, 5000.0)
+    ledger, book = recover(db, path)
+    assert ledger.recovered_from == "database"
+    ledger.close()
+    assert book.get(db, 1).leader.amount == 5000.0
+
+
+def test_torn_record_ends_the_ledger(db, tmp_path):
+    path = str(tmp_path / "bids.ledger")
+    ledger, _ = recover(db, path)
+    ledger.append(BID_PLACED, entry(db, 1))
+    end = ledger._end
+    ledger.close()
+    with open(path, "r+b") as handle:
+        handle.seek(end)
+        handle.write(b"\x01" * (RECORD_SIZE // 2))
+    ledger = BidLedger()
+    ledger.open(path, snapshot_every=0)
+    assert ledger.scan() == 1 and ledger.seq == 1
+    ledger.close()
+
+
+def test_ledger_works_without_fcntl(db, tmp_path, monkeypatch):
+    # Windows: fcntl import qilinmaydi, ledger qulfsiz ishlaydi
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    ledger, _ = recover(db, str(tmp_path / "bids.ledger"))
+    assert ledger.owner
+    ledger.append(BID_PLACED, entry(db, 1))
+    assert ledger.seq == 1
+    ledger.close()
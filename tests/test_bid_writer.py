@@ -0,0 +1,57 @@
+# tests/test_bid_writer.py
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.bid_writer import BidWriter
+from app.services.order_book import OrderBook
+
+
+def failing_session_factory():
+    raise RuntimeError("database is gone")
+
+
+def test_session_error_fails_the_batch_and_writer_keeps_running():
+    writer = BidWriter(OrderBook())
+    writer.start(failing_session_factory, batch_size=10, linger_ms=0, wait_seconds=5)
+    try:
+        with pytest.raises(RuntimeError, match="database is gone"):
+            writer.result(writer.submit(1, 1, 100.0))
+        assert writer.running
+    finally:
+        writer.stop()
+
+
+def broken_flush(batch):
+    raise SystemError("writer bug")
+
+
+def test_crashed_writer_fails_queued_bids():
+    writer = BidWriter(OrderBook())
+    writer._flush = broken_flush
+    writer.start(failing_session_factory, batch_size=1, linger_ms=0, wait_seconds=5)
+    with pytest.raises(HTTPException) as error:
+        writer.result(writer.submit(1, 1, 100.0))
+    assert error.value.status_code == 503
+    writer._thread.join(5)
+    assert not writer.running
+    with pytest.raises(HTTPException) as error:
+        writer.submit(1, 1, 100.0)
+    assert error.value.status_code == 503
+
+
+def test_stop_timeout_fails_queued_bids_and_result_times_out():
+    writer = BidWriter(OrderBook())
+    release = threading.Event()
+    writer._flush = lambda batch: release.wait(10)
+    writer.start(failing_session_factory, batch_size=1, linger_ms=0, wait_seconds=0.2)
+    stuck, queued = writer.submit(1, 1, 100.0), writer.submit(2, 1, 200.0)
+    with pytest.raises(HTTPException) as error:
+        writer.result(stuck)
+    assert error.value.status_code == 503
+    writer.stop(timeout=0.2)
+    with pytest.raises(HTTPException) as error:
+        queued.result(timeout=1)
+    assert error.value.status_code == 503
+    release.set()
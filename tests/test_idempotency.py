@@ -0,0 +1,75 @@
+# tests/test_idempotency.py
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.services import idempotency
+from app.services.idempotency import idempotency_store
+
+
+class Result(BaseModel):
+    value: int
+
+
+def keyed(headers: dict, key: str) -> dict:
+    return {**headers, "Idempotency-Key": key}
+
+
+def test_retry_replays_the_first_response(client, users, plate_id):
+    headers = keyed(users["bidder1"], f"bid-{plate_id}")
+    first = client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=headers)
+    retry = client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert client.get(f"/plates/plates/{plate_id}").json()["bid_count"] == 1
+
+
+def test_rejected_request_is_replayed(client, users, plate_id):
+    client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"])
+    headers = keyed(users["bidder2"], f"low-{plate_id}")
+    for _ in range(2):
+        response = client.post("/bids/bids/", json={"amount": 50, "plate_id": plate_id}, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Bid must exceed current highest bid"
+    assert idempotency_store.stats()["replayed"] >= 1
+
+
+def test_key_reused_with_another_body_is_422(client, users, plate_id):
+    headers = keyed(users["bidder1"], f"reused-{plate_id}")
+    assert client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=headers) \
+        .status_code == 200
+    response = client.post("/bids/bids/", json={"amount": 200, "plate_id": plate_id}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Idempotency-Key was already used with a different request"
+
+
+def test_keys_are_scoped_by_user(client, users, plate_id):
+    for name, amount in (("bidder1", 100), ("bidder2", 200)):
+        response = client.post("/bids/bids/", json={"amount": amount, "plate_id": plate_id},
+                               headers=keyed(users[name], f"shared-{plate_id}"))
+        assert response.status_code == 200
+        assert "idempotent-replayed" not in response.headers
+
+
+def test_duplicate_of_a_running_request_gets_409(monkeypatch):
+    monkeypatch.setattr(idempotency_store, "wait_seconds", 0.05)
+    key, future, owner = idempotency._claim("running", -1, "test", "{}")
+    assert owner
+    with pytest.raises(HTTPException) as error:
+        idempotency.run("running", -1, "test", "{}", Result, lambda: {"value": 1})
+    assert error.value.status_code == 409
+    assert error.value.headers == {"Retry-After": "1"}
+    # Birinchi so'rov tugagach takror uning natijasini oladi
+    idempotency_store.settle(key, future, idempotency.Outcome(200, b'{"value":2}'))
+    assert idempotency.run("running", -1, "test", "{}", Result, lambda: {"value": 1}).body == b'{"value":2}'
+
+
+def test_server_error_is_not_stored():
+    def unavailable():
+        raise HTTPException(status_code=503, detail="Bid writer is not available")
+
+    with pytest.raises(HTTPException, match="not available"):
+        idempotency.run("retry", -1, "test", "{}", Result, unavailable)
+    # Kalit bo'shatilgan: keyingi urinish route ni qayta bajaradi
+    assert idempotency.run("retry", -1, "test", "{}", Result, lambda: {"value": 3}) == {"value": 3}
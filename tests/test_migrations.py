@@ -0,0 +1,60 @@
+# tests/test_migrations.py
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import migrations
+from app.database import Base
+
+MIGRATION_INDEXES = ("uq_bids_user_id_plate_id", "ix_bids_plate_id_amount", "ix_bids_user_id_id",
+                     "ix_auto_plates_deadline")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    yield engine
+    engine.dispose()
+
+
+def assert_plans(engine):
+    with engine.connect() as connection:
+        for label, sql, index in migrations.HOT_QUERIES:
+            plan = migrations.explain(connection, sql)
+            assert any(index in detail for detail in plan), f"{label}: expected {index}, got {plan}"
+            assert not any("TEMP B-TREE" in detail for detail in plan), f"{label}: sorts in a temp b-tree: {plan}"
+
+
+def test_init_db_hot_queries_use_indexes(engine):
+    assert migrations.init_db(engine) == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.check_schema(engine) == []
+    assert_plans(engine)
+
+
+def test_upgrade_adds_indexes_to_old_database(engine):
+    import app.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for index in MIGRATION_INDEXES:
+            connection.execute(text(f"DROP INDEX {index}"))
+    assert migrations.check_schema(engine)
+
+    migrations.upgrade(engine)
+    assert migrations.check_schema(engine) == []
+    assert_plans(engine)
+    assert migrations.upgrade(engine) == []
+
+
+def test_duplicate_bids_are_kept_aside(engine):
+    migrations.init_db(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX uq_bids_user_id_plate_id"))
+        connection.execute(text("DELETE FROM schema_migrations WHERE version = 1"))
+        for amount in (100.0, 300.0, 200.0):
+            connection.execute(text("INSERT INTO bids (user_id, plate_id, amount) VALUES (1, 1, :amount)"),
+                               {"amount": amount})
+
+    assert migrations.upgrade(engine) == [1]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT amount FROM bids")).scalars().all() == [300.0]
+        assert sorted(connection.execute(text("SELECT amount FROM bids_removed_duplicates")).scalars()) == [100.0, 200.0]
@@ -0,0 +1,93 @@
+# tests/test_order_book.py
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import database, models
+from app.services.order_book import BookEntry, OrderBook, PlateBook
+from app.services.plate_stats import refresh_plate_stats
+
+
+def entry(bid_id: int, user_id: int, amount: float) -> BookEntry:
+    return BookEntry(id=bid_id, user_id=user_id, plate_id=1, amount=amount, created_at=datetime.utcnow())
+
+
+def open_book() -> PlateBook:
+    return PlateBook(plate_id=1, deadline=datetime.utcnow() + timedelta(hours=1), is_active=True)
+
+
+def test_check_new_bid():
+    book = open_book()
+    OrderBook().place(book, entry(1, 1, 100.0))
+    for user_id, amount, detail in ((1, 200.0, "You already have a bid on this plate"),
+                                    (2, 0.0, "Bid amount must be positive"),
+                                    (2, 100.0, "Bid must exceed current highest bid")):
+        with pytest.raises(HTTPException) as error:
+            book.check_new_bid(user_id, amount)
+        assert error.value.detail == detail
+    book.check_new_bid(2, 100.5)
+    book.deadline = datetime.utcnow() - timedelta(seconds=1)
+    with pytest.raises(HTTPException, match="Bidding is closed"):
+        book.check_new_bid(2, 500.0)
+
+
+def test_leader_is_reelected_on_withdraw_and_lowered_raise():
+    index, book = OrderBook(), open_book()
+    first, second = index.place(book, entry(1, 1, 100.0)), index.place(book, entry(2, 2, 150.0))
+    assert book.leader == second
+    index.raise_bid(book, second, 100.0)
+    # Teng summada birinchi qo'yilgan taklif yetakchi
+    assert book.leader == first
+    index.withdraw(book, first)
+    assert book.leader.id == 2
+
+
+def user_id(username: str) -> int:
+    db = database.SessionLocal()
+    try:
+        return db.query(models.User.id).filter(models.User.username == username).scalar()
+    finally:
+        db.close()
+
+
+def write_in_other_worker(change):
+    # Boshqa worker: bazaga yozadi, bu jarayonning order book iga tegmaydi
+    db = database.SessionLocal()
+    try:
+        change(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_bid_below_other_workers_bid_is_rejected(client, users, plate_id):
+    assert client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"]) \
+        .status_code == 200
+
+    def outbid(db):
+        db.add(models.Bid(amount=500.0, user_id=user_id("bidder2"), plate_id=plate_id))
+        db.flush()
+        refresh_plate_stats(db, plate_id)
+
+    write_in_other_worker(outbid)
+    response = client.post("/bids/bids/", json={"amount": 200, "plate_id": plate_id}, headers=users["bidder3"])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Bid must exceed current highest bid"
+    # Kitob bazadan qayta yuklangan: boshqa workerning taklifi endi ko'rinadi
+    response = client.post("/bids/bids/", json={"amount": 400, "plate_id": plate_id}, headers=users["bidder3"])
+    assert response.status_code == 400
+    response = client.post("/bids/bids/", json={"amount": 600, "plate_id": plate_id}, headers=users["bidder3"])
+    assert response.status_code == 200
+    plate = client.get(f"/plates/plates/{plate_id}").json()
+    assert (plate["highest_bid"], plate["bid_count"]) == (600.0, 3)
+
+
+def test_raise_after_other_worker_closed_the_plate(client, users, plate_id):
+    bid = client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"]).json()
+    write_in_other_worker(lambda db: db.query(models.AutoPlate).filter(models.AutoPlate.id == plate_id)
+                          .update({models.AutoPlate.is_active: False}, synchronize_session=False))
+    response = client.put(f"/bids/bids/{bid['id']}", json={"amount": 300, "plate_id": plate_id},
+                          headers=users["bidder1"])
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Bidding period has ended"
@@ -0,0 +1,28 @@
+# tests/test_query_counts.py
+from app.profiler import assert_max_queries
+
+
+def test_create_bid_queries(client, users, plate_id):
+    # highest_bid tekshiruvi, INSERT bid va plate statistikasi; qolgan tekshiruvlar order book da
+    with assert_max_queries(3):
+        response = client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"])
+    assert response.status_code == 200
+
+
+def test_update_bid_queries(client, users, plate_id):
+    bid = client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"]).json()
+    with assert_max_queries(3):
+        response = client.put(f"/bids/bids/{bid['id']}", json={"amount": 150, "plate_id": plate_id},
+                              headers=users["bidder1"])
+    assert response.status_code == 200
+    assert response.json()["amount"] == 150
+
+
+def test_get_plates_queries(client, plate_id):
+    with assert_max_queries(1):
+        response = client.get("/plates/plates/")
+    assert response.status_code == 200
+    assert plate_id in [plate["id"] for plate in response.json()["items"]]
+    # Takroriy so'rov response_cache dan
+    with assert_max_queries(0):
+        assert client.get("/plates/plates/").status_code == 200
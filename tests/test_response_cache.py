@@ -0,0 +1,73 @@
+# tests/test_response_cache.py
+import time
+
+from app.cache import LISTING_TAG, ResponseCache, plate_tag
+
+LISTING = "/plates/plates/?ordering=-deadline&limit=100"
+
+
+def listed(response, plate_id: int) -> dict:
+    return next(plate for plate in response.json()["items"] if plate["id"] == plate_id)
+
+
+def test_if_none_match_gets_304(client, plate_id):
+    response = client.get(f"/plates/plates/{plate_id}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+    for header in (etag, "W/" + etag, f'"other", {etag}'):
+        cached = client.get(f"/plates/plates/{plate_id}", headers={"If-None-Match": header})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+    assert client.get(f"/plates/plates/{plate_id}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_bid_invalidates_the_plate_and_its_listing_pages(client, users, plate_id):
+    detail = client.get(f"/plates/plates/{plate_id}")
+    assert listed(client.get(LISTING), plate_id)["highest_bid"] is None
+    assert client.post("/bids/bids/", json={"amount": 100, "plate_id": plate_id}, headers=users["bidder1"]) \
+        .status_code == 200
+
+    response = client.get(f"/plates/plates/{plate_id}", headers={"If-None-Match": detail.headers["etag"]})
+    assert response.status_code == 200
+    assert response.headers["etag"] != detail.headers["etag"]
+    assert response.json()["highest_bid"] == 100.0
+    assert listed(client.get(LISTING), plate_id)["highest_bid"] == 100.0
+
+
+def test_put_after_invalidation_is_not_stored():
+    cache = ResponseCache(1024)
+    since = cache.version()
+    # O'qish davomida yozuvchi shu plate ni o'zgartirdi
+    cache.invalidate_plate(1)
+    entry = cache.put(("plate", 1), b'{"id":1}', [plate_tag(1)], since)
+    assert entry.etag and cache.get(("plate", 1)) is None
+    cache.put(("plate", 1), b'{"id":1}', [plate_tag(1)], cache.version())
+    assert cache.get(("plate", 1)) is not None
+
+
+def test_bid_keeps_listing_pages_without_the_plate():
+    cache = ResponseCache(1024)
+    cache.put(("plates", 1), b"[1]", [LISTING_TAG, plate_tag(1)], cache.version())
+    cache.put(("plates", 2), b"[2]", [LISTING_TAG, plate_tag(2)], cache.version())
+    cache.invalidate_plate(1)
+    assert cache.get(("plates", 1)) is None and cache.get(("plates", 2)) is not None
+    cache.invalidate_plate(2, listing=True)
+    assert cache.get(("plates", 2)) is None
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(1024, ttl_seconds=0.05)
+    cache.put(("plate", 1), b"{}", [plate_tag(1)], cache.version())
+    assert cache.get(("plate", 1)) is not None
+    time.sleep(0.06)
+    assert cache.get(("plate", 1)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_entries_are_evicted_over_max_bytes():
+    cache = ResponseCache(10)
+    for plate_id in range(1, 4):
+        cache.put(("plate", plate_id), b"12345", [plate_tag(plate_id)], cache.version())
+    assert cache.get(("plate", 1)) is None
+    assert cache.stats()["bytes"] == 10